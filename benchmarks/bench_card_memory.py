@@ -0,0 +1,64 @@
+"""
+Card memory benchmark - footprint of 100k parsed cards
+
+Usage:
+    python benchmarks/bench_card_memory.py [n_cards]
+
+Half the cards are Q&A, half cloze, spread over 100 decks; every
+card's hash is computed once, as the loader does.
+"""
+
+import sys
+import time
+import tracemalloc
+
+from hashcards.parser import Card, CardParser
+
+
+def make_deck(n: int, deck: int) -> str:
+    return "\n".join(
+        f"Q: Deck {deck} question {i}?\nA: Answer {i}\n\nC: Deck {deck} cloze [{i}] and [{i + 1}].\n"
+        for i in range(n)
+    )
+
+
+def load(decks):
+    cards = []
+    for d, content in enumerate(decks):
+        # Deck names built at runtime, like paths from os.walk
+        deck_name = "/".join(["decks", f"deck{d:03d}"])
+        cards.extend(CardParser.parse_content(content, deck_name))
+    Card.hash_all(cards, 'sha256')
+    return cards
+
+
+def main():
+    n_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_decks = 100
+    per_deck = n_cards // n_decks // 2
+    decks = [make_deck(per_deck, d) for d in range(n_decks)]
+
+    start = time.perf_counter()
+    cards = load(decks)
+    parse_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for card in cards:
+        card.get_hash()
+    rehash_s = time.perf_counter() - start
+    del cards
+
+    tracemalloc.start()
+    cards = load(decks)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"cards:              {len(cards):,}")
+    print(f"memory:             {current / 1024 / 1024:.1f} MiB "
+          f"({current / len(cards):.0f} B/card)")
+    print(f"parse + hash:       {parse_s * 1000:.0f} ms")
+    print(f"get_hash() again:   {rehash_s * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
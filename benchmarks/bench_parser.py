@@ -0,0 +1,64 @@
+"""
+Parser benchmark - well-formed and pathological decks
+
+Usage:
+    python benchmarks/bench_parser.py
+
+Doubling the input should roughly double the time; a quadratic
+parser shows up as ~4x growth per row.
+"""
+
+import time
+
+from hashcards.parser import CardParser
+
+
+def well_formed(n: int) -> str:
+    """n Q&A cards interleaved with n cloze cards"""
+    return "\n".join(
+        f"Q: Question number {i}?\nA: Answer {i}\n\nC: Cloze [{i}] text.\n"
+        for i in range(n)
+    )
+
+
+def unmatched_questions(n: int) -> str:
+    """n `Q:` lines that never get an `A:`"""
+    return "\n".join(f"Q: Dangling question {i}?" for i in range(n))
+
+
+def unmatched_then_answer(n: int) -> str:
+    """n `Q:` lines with a single `A:` at the very end"""
+    return unmatched_questions(n) + "\nA: finally\n"
+
+
+def long_question(n: int) -> str:
+    """One question spanning n lines"""
+    body = "\n".join(f"line {i} of the question" for i in range(n))
+    return f"Q: start\n{body}\nA: end\n"
+
+
+CASES = [
+    ("well-formed", well_formed),
+    ("unmatched Q:", unmatched_questions),
+    ("unmatched Q: + final A:", unmatched_then_answer),
+    ("one long question", long_question),
+]
+
+
+def bench(make, n: int) -> float:
+    content = make(n)
+    start = time.perf_counter()
+    CardParser.parse_content(content)
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [5_000, 10_000, 20_000, 40_000]
+    print(f"{'case':28s}" + "".join(f"{n:>12,d}" for n in sizes))
+    for name, make in CASES:
+        row = "".join(f"{bench(make, n) * 1000:>10.1f}ms" for n in sizes)
+        print(f"{name:28s}{row}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Review write benchmark - reviews/sec for the ways of recording a review
+
+Usage:
+    python benchmarks/bench_reviews.py [threads] [reviews_per_thread]
+
+Each thread reviews its own cards against one on-disk database, like
+concurrent Flask request threads.
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from hashcards.scheduler import FSRSScheduler, Rating
+from hashcards.storage import CardStorage
+
+
+def separate_commits(storage, schedule, log):
+    """What /review used to do: two statements, two commits"""
+    storage.save_schedule(schedule, "deck")
+    storage.log_review(log)
+
+
+def one_transaction(storage, schedule, log):
+    storage.record_review(schedule, "deck", log)
+
+
+def run(write, threads: int, per_thread: int, group_commit=None) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = CardStorage(str(Path(tmp) / "bench.db"), group_commit=group_commit)
+        scheduler = FSRSScheduler()
+        storage.bootstrap_schedules([(f"h{i}", "deck") for i in range(threads)], scheduler.init_card)
+
+        def worker(i: int):
+            schedule = storage.get_schedule(f"h{i}")
+            for _ in range(per_thread):
+                schedule, log = scheduler.review_card(schedule, Rating.GOOD)
+                write(storage, schedule, log)
+
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        start = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - start
+        storage.close()
+    return threads * per_thread / elapsed
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print(f"{threads} threads x {per_thread} reviews")
+    print(f"save_schedule + log_review:   {run(separate_commits, threads, per_thread):8.0f} reviews/s")
+    print(f"record_review:                {run(one_transaction, threads, per_thread):8.0f} reviews/s")
+    for window in (0, 0.002):
+        rate = run(one_transaction, threads, per_thread, group_commit=window)
+        print(f"record_review, group +{window * 1000:g} ms:  {rate:8.0f} reviews/s")
+
+
+if __name__ == '__main__':
+    main()
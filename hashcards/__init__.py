@@ -8,12 +8,14 @@ __author__ = "Your Name"
 
 from .parser import CardParser
 from .scheduler import FSRSScheduler
-from .storage import CardStorage
+from .storage import CardStorage, Storage, open_storage
 from .hasher import CardHasher
 
 __all__ = [
     "CardParser",
     "FSRSScheduler", 
     "CardStorage",
+    "Storage",
+    "open_storage",
     "CardHasher"
 ]
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Backup - Verified, rotated snapshots of a live database
+Safe while `drill` is running: copies go through SQLite's backup API
+
+A snapshot is written under a temporary name, checked with
+PRAGMA integrity_check and only then renamed into place, so every
+hashcards-*.db in the backup directory is a complete, consistent copy.
+The oldest snapshots beyond `keep` are deleted after each new one.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from .storage import CardStorage
+
+# Snapshots kept by default
+DEFAULT_KEEP = 7
+
+SNAPSHOT_PREFIX = 'hashcards-'
+
+
+def default_backup_dir(db_path: str) -> Path:
+    """Backups go in a hidden directory next to the database (decks skip it)"""
+    return Path(db_path).resolve().parent / '.hashcards-backups'
+
+
+def _archive_of(path: Path) -> Path:
+    return path.with_suffix('.archive.db')
+
+
+def list_snapshots(backup_dir: str) -> List[Path]:
+    """Snapshots in a backup directory, oldest first"""
+    backup_dir = Path(backup_dir)
+    if not backup_dir.is_dir():
+        return []
+    return sorted(
+        path for path in backup_dir.glob(f'{SNAPSHOT_PREFIX}*.db')
+        if not path.name.endswith('.archive.db')
+    )
+
+
+def verify_backup(path: str) -> List[str]:
+    """
+    Check a copy's integrity (and that of its archive, if any)
+
+    Returns:
+        Problems reported by PRAGMA integrity_check (empty = intact)
+    """
+    problems = []
+    for db_path in (Path(path), _archive_of(Path(path))):
+        if db_path != Path(path) and not db_path.exists():
+            continue
+        try:
+            conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                rows = conn.execute("PRAGMA integrity_check").fetchall()
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError as exc:
+            problems.append(f"{db_path.name}: {exc}")
+            continue
+        problems.extend(f"{db_path.name}: {row[0]}" for row in rows if row[0] != 'ok')
+    return problems
+
+
+def prune_snapshots(backup_dir: str, keep: int) -> List[Path]:
+    """
+    Delete all but the newest `keep` snapshots
+
+    Returns:
+        Snapshots deleted
+    """
+    snapshots = list_snapshots(backup_dir)
+    stale = snapshots[:max(len(snapshots) - keep, 0)]
+    for path in stale:
+        for file in (path, _archive_of(path)):
+            if file.exists():
+                file.unlink()
+    return stale
+
+
+def create_snapshot(storage: CardStorage, backup_dir: Optional[str] = None,
+                    keep: int = DEFAULT_KEEP, verify: bool = True) -> Path:
+    """
+    Back up a collection into a new timestamped snapshot
+
+    Args:
+        storage: Collection to copy (may be in use by other threads)
+        backup_dir: Directory for snapshots (default: default_backup_dir())
+        keep: Snapshots to keep, this one included (0 = keep all)
+        verify: Run an integrity check on the copy before keeping it
+
+    Returns:
+        Path of the new snapshot
+
+    Raises:
+        RuntimeError: The copy failed verification (it is discarded)
+    """
+    backup_dir = Path(backup_dir) if backup_dir else default_backup_dir(storage.db_path)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+
+    # Microseconds keep names unique and in order when snapshots are frequent
+    name = f"{SNAPSHOT_PREFIX}{datetime.now():%Y%m%d-%H%M%S-%f}.db"
+    path = backup_dir / name
+    partial = backup_dir / f".partial-{name}"
+    try:
+        storage.backup(str(partial))
+        if verify:
+            problems = verify_backup(str(partial))
+            if problems:
+                raise RuntimeError(f"Backup failed verification: {'; '.join(problems[:5])}")
+        # Archive first: a snapshot that has a name is always complete
+        if _archive_of(partial).exists():
+            os.replace(_archive_of(partial), _archive_of(path))
+        os.replace(partial, path)
+    finally:
+        for file in (partial, _archive_of(partial)):
+            if file.exists():
+                file.unlink()
+
+    if keep:
+        prune_snapshots(str(backup_dir), keep)
+    return path
+
+
+class PeriodicBackup:
+    """
+    Background thread that snapshots a collection at a fixed interval
+
+    Failures are reported on stderr and retried at the next interval;
+    they never interrupt the session.
+    """
+
+    def __init__(self, storage: CardStorage, interval: float,
+                 backup_dir: Optional[str] = None, keep: int = DEFAULT_KEEP):
+        """
+        Initialize periodic backups
+
+        Args:
+            storage: Collection to copy
+            interval: Seconds between snapshots (the first one after a full interval)
+            backup_dir: Directory for snapshots (default: default_backup_dir())
+            keep: Snapshots to keep
+        """
+        self.storage = storage
+        self.interval = interval
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.last_snapshot: Optional[Path] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start backing up in a daemon thread"""
+        self._thread = threading.Thread(target=self._run, name="hashcards-backup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop backing up (waits for a snapshot in progress)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.last_snapshot = create_snapshot(self.storage, self.backup_dir, self.keep)
+            except Exception as exc:
+                print(f"hashcards: backup failed: {exc}", file=sys.stderr)
@@ -0,0 +1,337 @@
+"""
+Batch Scheduler - FSRS over whole collections with NumPy
+Same formulas as FSRSScheduler, applied to column arrays
+
+Schedules are held as a ScheduleBatch: one array per CardSchedule
+field, one entry per card. Retrievability, next intervals and the
+result of a review are computed for every card at once, with the
+operations in the same order as the scalar code.
+
+NumPy's exp and pow are vectorized differently from the C library the
+math module uses and differ from it in the last bit for a few percent
+of inputs, so results agree with FSRSScheduler.review_card() to within
+a unit in the last place. `exact=True` evaluates those two functions
+through the math module instead, card by card: bit-identical to the
+scalar scheduler, for the parity tests.
+
+Timestamps are Unix seconds, as in storage. Elapsed days and due dates
+follow the local calendar, as the scalar scheduler's naive datetimes
+do: across a daylight-saving change a day is not 86400 seconds.
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import repeat
+from typing import Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .scheduler import CardSchedule, FSRSScheduler, Rating, State
+
+SECONDS_PER_DAY = 86400
+
+
+# UTC offsets change at most a few times a year, never twice this close together
+OFFSET_PROBE = 7 * SECONDS_PER_DAY
+
+
+def _utc_offset(timestamp: float) -> int:
+    """Local UTC offset in seconds at a Unix time"""
+    return time.localtime(timestamp).tm_gmtoff
+
+
+def _local_seconds(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Unix seconds to local wall-clock seconds (the clock datetime.fromtimestamp()
+    reads), so that differences count days like naive datetimes do
+
+    The offset changes in the range are located once, by probing weekly
+    and bisecting to the second; each timestamp is then one binary search.
+    """
+    known = timestamps[~np.isnan(timestamps)]
+    if not known.size:
+        return timestamps.copy()
+    start, end = math.floor(known.min()), math.ceil(known.max())
+    probes = list(range(start, end, OFFSET_PROBE)) + [end]
+    offsets = [_utc_offset(probe) for probe in probes]
+    changes, values = [start], [offsets[0]]
+    for i in range(1, len(probes)):
+        if offsets[i] != offsets[i - 1]:
+            low, high = probes[i - 1], probes[i]
+            while high - low > 1:
+                middle = (low + high) // 2
+                if _utc_offset(middle) == offsets[i - 1]:
+                    low = middle
+                else:
+                    high = middle
+            changes.append(high)
+            values.append(offsets[i])
+    index = np.searchsorted(np.array(changes, dtype=np.float64), timestamps, side='right') - 1
+    return timestamps + np.array(values, dtype=np.float64)[np.maximum(index, 0)]
+
+
+def _epoch_or_nan(moment: Optional[datetime]) -> float:
+    return math.nan if moment is None else moment.timestamp()
+
+
+def _math_exp(x: np.ndarray) -> np.ndarray:
+    """Elementwise math.exp"""
+    return np.fromiter(map(math.exp, x.tolist()), np.float64, x.size)
+
+
+def _math_pow(x: np.ndarray, y: Union[float, np.ndarray]) -> np.ndarray:
+    """Elementwise math.pow"""
+    exponents = y.tolist() if isinstance(y, np.ndarray) else repeat(float(y))
+    return np.fromiter(map(math.pow, x.tolist(), exponents), np.float64, x.size)
+
+
+@dataclass
+class ScheduleBatch:
+    """
+    Column arrays for many card schedules
+
+    last_review is NaN for cards never reviewed. due and last_review
+    are float Unix seconds, so sub-second times round-trip exactly.
+    """
+    card_hash: np.ndarray       # object, str (or any ids, for simulations)
+    state: np.ndarray           # int8, State values
+    stability: np.ndarray       # float64
+    difficulty: np.ndarray      # float64
+    elapsed_days: np.ndarray    # int64
+    scheduled_days: np.ndarray  # int64
+    reps: np.ndarray            # int64
+    lapses: np.ndarray          # int64
+    last_review: np.ndarray     # float64
+    due: np.ndarray             # float64
+
+    def __len__(self) -> int:
+        return len(self.card_hash)
+
+    def take(self, index: np.ndarray) -> 'ScheduleBatch':
+        """The schedules at `index` (integer positions or a boolean mask)"""
+        return ScheduleBatch(**{name: getattr(self, name)[index] for name in self.__dataclass_fields__})
+
+    def put(self, index: np.ndarray, other: 'ScheduleBatch'):
+        """Overwrite the schedules at `index` with those of `other`, in place"""
+        for name in self.__dataclass_fields__:
+            getattr(self, name)[index] = getattr(other, name)
+
+    @classmethod
+    def from_schedules(cls, schedules: Sequence[CardSchedule]) -> 'ScheduleBatch':
+        """Columns from CardSchedule objects"""
+        return cls(
+            card_hash=np.array([s.card_hash for s in schedules], dtype=object),
+            state=np.fromiter((s.state for s in schedules), np.int8, len(schedules)),
+            stability=np.fromiter((s.stability for s in schedules), np.float64, len(schedules)),
+            difficulty=np.fromiter((s.difficulty for s in schedules), np.float64, len(schedules)),
+            elapsed_days=np.fromiter((s.elapsed_days for s in schedules), np.int64, len(schedules)),
+            scheduled_days=np.fromiter((s.scheduled_days for s in schedules), np.int64, len(schedules)),
+            reps=np.fromiter((s.reps for s in schedules), np.int64, len(schedules)),
+            lapses=np.fromiter((s.lapses for s in schedules), np.int64, len(schedules)),
+            last_review=np.fromiter((_epoch_or_nan(s.last_review) for s in schedules),
+                                    np.float64, len(schedules)),
+            due=np.fromiter((s.due.timestamp() for s in schedules), np.float64, len(schedules)),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> 'ScheduleBatch':
+        """
+        Columns from schedule rows in CardStorage.TABLE_COLUMNS order,
+        as streamed by CardStorage.iter_rows('schedules')
+        """
+        (card_hash, _deck, state, stability, difficulty, elapsed_days, scheduled_days,
+         reps, lapses, last_review, due, _created, _updated) = list(zip(*rows)) or [()] * 13
+        return cls(
+            card_hash=np.array(card_hash, dtype=object),
+            state=np.array(state, dtype=np.int8),
+            stability=np.array(stability, dtype=np.float64),
+            difficulty=np.array(difficulty, dtype=np.float64),
+            elapsed_days=np.array(elapsed_days, dtype=np.int64),
+            scheduled_days=np.array(scheduled_days, dtype=np.int64),
+            reps=np.array(reps, dtype=np.int64),
+            lapses=np.array(lapses, dtype=np.int64),
+            # None becomes NaN
+            last_review=np.array(last_review, dtype=np.float64),
+            due=np.array(due, dtype=np.float64),
+        )
+
+    def to_schedules(self) -> List[CardSchedule]:
+        """CardSchedule objects, one per card"""
+        return [
+            CardSchedule(
+                card_hash=card_hash,
+                state=State(int(state)),
+                stability=float(stability),
+                difficulty=float(difficulty),
+                elapsed_days=int(elapsed_days),
+                scheduled_days=int(scheduled_days),
+                reps=int(reps),
+                lapses=int(lapses),
+                last_review=None if math.isnan(last_review) else datetime.fromtimestamp(last_review),
+                due=datetime.fromtimestamp(due)
+            )
+            for card_hash, state, stability, difficulty, elapsed_days, scheduled_days,
+            reps, lapses, last_review, due in zip(
+                self.card_hash.tolist(), self.state.tolist(), self.stability.tolist(),
+                self.difficulty.tolist(), self.elapsed_days.tolist(),
+                self.scheduled_days.tolist(), self.reps.tolist(), self.lapses.tolist(),
+                self.last_review.tolist(), self.due.tolist())
+        ]
+
+    def days_since_review(self, now: float) -> np.ndarray:
+        """Whole days from each card's last review to `now` (0 if never reviewed)"""
+        with np.errstate(invalid='ignore'):
+            days = np.floor((now + _utc_offset(now) - _local_seconds(self.last_review))
+                            / SECONDS_PER_DAY)
+        return np.nan_to_num(days, nan=0.0).astype(np.int64)
+
+
+class BatchScheduler:
+    """
+    Vectorized counterpart of FSRSScheduler
+
+    Takes the same parameter dict and returns what the scalar scheduler
+    would for every card, up to rounding (see the module docstring on
+    `exact`).
+    """
+
+    def __init__(self, params: Optional[dict] = None, exact: bool = False):
+        """
+        Initialize scheduler with parameters
+
+        Args:
+            params: FSRS parameters (default: FSRSScheduler.DEFAULT_PARAMS)
+            exact: Evaluate exp and pow with the math module, bit-identical
+                   to FSRSScheduler (not vectorized, so slower); False
+                   uses NumPy's, equal to within a unit in the last place
+        """
+        self.params = params or FSRSScheduler.DEFAULT_PARAMS.copy()
+        self.w = np.array(self.params['w'], dtype=np.float64)
+        self.exact = exact
+        self._exp = _math_exp if exact else np.exp
+        self._pow = _math_pow if exact else np.power
+        self._interval_factor = (
+            math.log(self.params['request_retention']) / math.log(0.9)
+        )
+
+    def retrievability(self, stability: np.ndarray, elapsed_days: np.ndarray) -> np.ndarray:
+        """Probability of recall after `elapsed_days`, for each stability (> 0)"""
+        stability = np.asarray(stability, dtype=np.float64)
+        return self._pow(1 + elapsed_days / (9 * stability), -1.0)
+
+    def next_interval(self, stability: np.ndarray) -> np.ndarray:
+        """Next review interval in days, for each stability"""
+        interval = stability * self._interval_factor
+        interval = np.minimum(interval, self.params['maximum_interval'])
+        # np.rint rounds half to even, like round()
+        return np.maximum(1, np.rint(interval)).astype(np.int64)
+
+    def collection_retrievability(self, batch: ScheduleBatch, now: Optional[float] = None) -> np.ndarray:
+        """Current retrievability of every card (NaN for cards with no stability yet)"""
+        now = datetime.now().timestamp() if now is None else now
+        result = np.full(len(batch), np.nan)
+        known = batch.stability > 0
+        result[known] = self.retrievability(batch.stability[known],
+                                            batch.days_since_review(now)[known])
+        return result
+
+    def _stability_after_success(self, stability, difficulty, retrievability, ratings):
+        w = self.w
+        hard_penalty = np.where(ratings == Rating.HARD, w[15], 1)
+        easy_bonus = np.where(ratings == Rating.EASY, w[16], 1)
+        return stability * (
+            1 + math.exp(w[8]) *
+            (11 - difficulty) *
+            self._pow(stability, -w[9]) *
+            (self._exp((1 - retrievability) * w[10]) - 1) *
+            hard_penalty *
+            easy_bonus
+        )
+
+    def _stability_after_failure(self, stability, difficulty, retrievability):
+        w = self.w
+        return np.maximum(0.1, (
+            w[11] *
+            self._pow(difficulty, -w[12]) *
+            (self._pow(stability + 1, w[13]) - 1) *
+            self._exp((1 - retrievability) * w[14])
+        ))
+
+    def review(self, batch: ScheduleBatch, ratings: np.ndarray,
+               now: Optional[datetime] = None) -> ScheduleBatch:
+        """
+        Review every card of a batch at once
+
+        Args:
+            batch: Current schedules
+            ratings: One Rating value per card
+            now: Review time (default: the current time)
+
+        Returns:
+            Updated schedules, as FSRSScheduler.review_card() would return them
+        """
+        now = now or datetime.now()
+        now_ts = now.timestamp()
+        w = self.w
+        ratings = np.asarray(ratings, dtype=np.int64)
+        elapsed = batch.days_since_review(now_ts)
+
+        is_new = batch.state == State.NEW
+        is_review = batch.state == State.REVIEW
+        again = ratings == Rating.AGAIN
+
+        state = batch.state.copy()
+        stability = batch.stability.copy()
+        difficulty = batch.difficulty.copy()
+        scheduled_days = np.zeros(len(batch), dtype=np.int64)
+        lapses = batch.lapses.copy()
+        due_minutes = np.zeros(len(batch), dtype=np.float64)
+
+        # New cards: difficulty from the first rating
+        difficulty[is_new] = w[4] - (ratings[is_new] - 3) * w[5]
+        state[is_new & again] = State.LEARNING
+
+        # New and learning cards: AGAIN repeats the first step, anything else graduates
+        due_minutes[~is_review & again] = self.params['learning_steps'][0]
+        graduate = ~is_review & ~again
+        stability[graduate] = w[ratings[graduate] - 1]
+        state[graduate] = State.REVIEW
+
+        # Review cards: new stability from the retrievability at review time
+        forgot = is_review & again
+        recalled = is_review & ~again
+        retrievability = self.retrievability(batch.stability[is_review], elapsed[is_review])
+        forgot_r = again[is_review]
+        stability[forgot] = self._stability_after_failure(
+            batch.stability[forgot], batch.difficulty[forgot], retrievability[forgot_r])
+        stability[recalled] = self._stability_after_success(
+            batch.stability[recalled], batch.difficulty[recalled],
+            retrievability[~forgot_r], ratings[recalled])
+        difficulty[recalled] = np.maximum(1, np.minimum(
+            10, batch.difficulty[recalled] - w[6] * (ratings[recalled] - 3)))
+        state[forgot] = State.RELEARNING
+        lapses[forgot] += 1
+        due_minutes[forgot] = self.params['relearning_steps'][0]
+
+        passed = graduate | recalled
+        scheduled_days[passed] = self.next_interval(stability[passed])
+        due_seconds = np.where(passed, scheduled_days * SECONDS_PER_DAY, due_minutes * 60)
+        # Added to the naive `now` like the scalar code does: a few distinct steps
+        steps, step_of = np.unique(due_seconds, return_inverse=True)
+        due = np.array([(now + timedelta(seconds=step)).timestamp() for step in steps.tolist()],
+                       dtype=np.float64)[np.asarray(step_of).reshape(-1)]
+
+        return ScheduleBatch(
+            card_hash=batch.card_hash.copy(),
+            state=state,
+            stability=stability,
+            difficulty=difficulty,
+            elapsed_days=np.where(is_new, batch.elapsed_days, elapsed),
+            scheduled_days=scheduled_days,
+            reps=np.where(is_new, 1, batch.reps + 1),
+            lapses=lapses,
+            last_review=np.full(len(batch), now_ts),
+            due=due,
+        )
@@ -0,0 +1,123 @@
+"""
+Card Cache - Parsed, hashed cards on disk, keyed by deck file content
+A warm start deserializes cards instead of parsing and hashing them
+
+Entries are marshal-encoded tuples of plain strings and ints: compact,
+fast to load, and unable to execute code when read back. Deck names are
+not stored (they come from the path), so identical files share an entry.
+"""
+
+import marshal
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from .hasher import DEFAULT_ALGORITHM
+from .parser import Card, CardType, PARSER_VERSION
+
+
+class CardCache:
+    """
+    Directory of `<file digest>.cards` entries
+
+    Every entry carries a version key; entries written by a different
+    cache format, parser version, card hash algorithm or Python version
+    (marshal is not stable across versions) are treated as misses.
+    """
+
+    FORMAT = 1
+    SUFFIX = '.cards'
+
+    _TYPES = {t.value: t for t in CardType}
+
+    def __init__(self, cache_dir: str, algorithm: str = DEFAULT_ALGORITHM):
+        """
+        Initialize cache
+
+        Args:
+            cache_dir: Directory holding cache entries (created on first write)
+            algorithm: Card hash algorithm of the stored hashes
+        """
+        self.cache_dir = Path(cache_dir)
+        self.version = (self.FORMAT, PARSER_VERSION, algorithm, tuple(sys.version_info[:2]))
+
+    def _entry_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}{self.SUFFIX}"
+
+    def get(self, digest: str, deck_name: str) -> Optional[List[Tuple[str, Card]]]:
+        """
+        Load the cards of a deck file from the cache
+
+        Args:
+            digest: CardHasher.hash_file digest of the deck file
+            deck_name: Deck name to give the loaded cards
+
+        Returns:
+            (card_hash, Card) pairs in document order, or None on a miss
+        """
+        try:
+            with open(self._entry_path(digest), 'rb') as f:
+                version, rows = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if version != self.version:
+            return None
+
+        deck_name = sys.intern(deck_name)
+        types = self._TYPES
+        cards = []
+        for card_type, line_number, raw_text, question, answer, text, deletions, card_hash in rows:
+            card = Card.__new__(Card)
+            card.__setstate__((types[card_type], deck_name, line_number, raw_text,
+                               question, answer, text, deletions, card_hash))
+            cards.append((card_hash, card))
+        return cards
+
+    def put(self, digest: str, cards: Iterable[Tuple[str, Card]]):
+        """
+        Store the cards of a deck file
+
+        Written to a temporary file and renamed into place, so readers
+        never see a partially written entry.
+        """
+        rows = tuple(
+            (card.card_type.value, card.line_number, card.raw_text, card.question,
+             card.answer, card.text, card.deletions, card_hash)
+            for card_hash, card in cards
+        )
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.cache_dir), prefix='.tmp-')
+        except OSError:
+            # A read-only collection simply runs without a cache
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(marshal.dumps((self.version, rows)))
+            os.replace(tmp_path, self._entry_path(digest))
+        except OSError:
+            os.unlink(tmp_path)
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """
+        Delete entries whose digest is not in `keep`
+
+        Returns:
+            Number of entries removed
+        """
+        keep = set(keep)
+        removed = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return 0
+        for name in names:
+            if name.endswith(self.SUFFIX) and name[:-len(self.SUFFIX)] not in keep:
+                try:
+                    os.unlink(self.cache_dir / name)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
@@ -1,19 +1,23 @@
 """
 Command-line interface for hashcards
 Unix philosophy: simple, composable commands
+
+Each subcommand imports what it needs when it runs, so commands that
+never serve HTTP do not pay for importing Flask and Jinja.
 """
 
 import argparse
 import sys
 from pathlib import Path
 
-from .web.app import HashcardsApp
-from .parser import CardParser
-from .storage import CardStorage
+from .hasher import ALGORITHMS, DEFAULT_ALGORITHM
 
 
 def cmd_drill(args):
     """Start drill/study session with web interface"""
+    from .loader import find_deck_files
+    from .web.app import HashcardsApp
+
     cards_dir = Path(args.cards_dir).resolve()
     
     if not cards_dir.exists():
@@ -21,8 +25,7 @@ def cmd_drill(args):
         sys.exit(1)
     
     # Count markdown files (recursive, skip hidden dirs)
-    md_files = [f for f in cards_dir.rglob("*.md")
-                if not any(part.startswith('.') for part in f.relative_to(cards_dir).parts)]
+    md_files = find_deck_files(cards_dir)
     if not md_files:
         print(f"Warning: No .md files found in {cards_dir}", file=sys.stderr)
         print("Create some card files first!", file=sys.stderr)
@@ -30,12 +33,27 @@ def cmd_drill(args):
     print(f"Loading cards from: {cards_dir}")
     print(f"Found {len(md_files)} deck file(s)")
     
-    app = HashcardsApp(str(cards_dir))
+    group_commit = None if args.group_commit is None else args.group_commit / 1000
+    app = HashcardsApp(str(cards_dir), db_path=args.db, jobs=args.jobs, group_commit=group_commit,
+                       order=args.order, load_balance=args.load_balance)
+    if args.watch:
+        app.start_watcher()
+        print("Watching for deck changes")
+    if args.backup_every:
+        try:
+            app.start_backups(args.backup_every * 60, keep=args.backup_keep)
+        except ValueError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Backing up every {args.backup_every:g} minute(s), keeping {args.backup_keep}")
     app.run(host=args.host, port=args.port, debug=args.debug)
 
 
 def cmd_stats(args):
     """Show statistics about card collection"""
+    from .loader import DeckLoader
+    from .storage import CardStorage
+
     cards_dir = Path(args.cards_dir).resolve()
     db_path = cards_dir / ".hashcards.db"
     
@@ -45,9 +63,16 @@ def cmd_stats(args):
     
     storage = CardStorage(str(db_path))
     stats = storage.get_stats()
+
+    # Only from a warm parsed-card cache: stats never parses decks
+    loader = DeckLoader(str(cards_dir),
+                        hash_algorithm=storage.get_meta('hash_algorithm', DEFAULT_ALGORITHM))
+    deck_cards = loader.cached_card_count()
     
     print("\n📊 hashcards Statistics")
     print("=" * 40)
+    if deck_cards is not None:
+        print(f"Cards in decks:   {deck_cards}")
     print(f"Total cards:      {stats['total_cards']}")
     print(f"Due for review:   {stats['due_cards']}")
     print(f"Reviewed today:   {stats['reviews_today']}")
@@ -63,27 +88,41 @@ def cmd_stats(args):
 
 def cmd_validate(args):
     """Validate card files for syntax errors"""
+    from .loader import DeckLoader, find_deck_files
+    from .storage import read_meta
+
     cards_dir = Path(args.cards_dir).resolve()
     
     if not cards_dir.exists():
         print(f"Error: Directory not found: {cards_dir}", file=sys.stderr)
         sys.exit(1)
     
-    md_files = [f for f in cards_dir.rglob("*.md")
-                if not any(part.startswith('.') for part in f.relative_to(cards_dir).parts)]
+    md_files = find_deck_files(cards_dir)
     total_cards = 0
     errors = []
 
     print(f"Validating {len(md_files)} file(s)...\n")
     
+    # Shares the parsed-card cache with 'drill' (same hash algorithm), so
+    # unchanged decks are not reparsed
+    hash_algorithm = DEFAULT_ALGORITHM
+    db_path = cards_dir / ".hashcards.db"
+    if db_path.exists():
+        # Read-only: validating must not migrate the user's database
+        hash_algorithm = read_meta(str(db_path), 'hash_algorithm', DEFAULT_ALGORITHM)
+    loader = DeckLoader(str(cards_dir), jobs=args.jobs, hash_algorithm=hash_algorithm)
+    failed = {}
+    loader.refresh(on_error=lambda rel_path, exc: failed.__setitem__(rel_path, exc))
+
     for md_file in md_files:
-        try:
-            cards = CardParser.parse_file(str(md_file))
+        rel_path = md_file.relative_to(cards_dir).as_posix()
+        if rel_path in failed:
+            errors.append((md_file.name, str(failed[rel_path])))
+            print(f"✗ {md_file.name}: ERROR - {failed[rel_path]}")
+        else:
+            cards = loader.file_cards(rel_path)
             total_cards += len(cards)
             print(f"✓ {md_file.name}: {len(cards)} cards")
-        except Exception as e:
-            errors.append((md_file.name, str(e)))
-            print(f"✗ {md_file.name}: ERROR - {e}")
     
     print(f"\nTotal: {total_cards} cards across {len(md_files)} files")
     
@@ -94,14 +133,276 @@ def cmd_validate(args):
         print("\n✅ All files valid!")
 
 
+def cmd_rehash(args):
+    """Switch the card hash algorithm, keeping schedules and review history"""
+    from .hasher import CardHasher
+    from .loader import DeckLoader
+    from .storage import CardStorage
+
+    cards_dir = Path(args.cards_dir).resolve()
+    db_path = cards_dir / ".hashcards.db"
+
+    if not db_path.exists():
+        print("No database found. Run 'hashcards drill' first to initialize.", file=sys.stderr)
+        sys.exit(1)
+
+    storage = CardStorage(str(db_path))
+    current = storage.get_meta('hash_algorithm', DEFAULT_ALGORITHM)
+    if args.algorithm == current:
+        print(f"Cards are already hashed with {current}")
+        storage.close()
+        return
+
+    # Old hashes must come from every deck, or their history would be orphaned
+    loader = DeckLoader(str(cards_dir), jobs=args.jobs, hash_algorithm=current)
+    failed = {}
+    cards = loader.refresh(on_error=lambda rel_path, exc: failed.__setitem__(rel_path, exc)).updated
+    if failed:
+        for rel_path, exc in failed.items():
+            print(f"✗ {rel_path}: ERROR - {exc}", file=sys.stderr)
+        print("Fix the decks above before rehashing.", file=sys.stderr)
+        storage.close()
+        sys.exit(1)
+
+    new_hashes = CardHasher.hash_cards((card.raw_text for card in cards.values()), args.algorithm)
+    moved = storage.rehash_cards(zip(cards, new_hashes), args.algorithm)
+    unmatched = storage.get_stats()['total_cards'] - moved
+
+    print(f"Rehashed {moved} card(s): {current} -> {args.algorithm}")
+    if unmatched:
+        print(f"{unmatched} schedule(s) match no card in the decks and keep their old hash")
+    storage.close()
+
+
+def cmd_gc(args):
+    """Archive or drop schedules of cards that are no longer in any deck"""
+    from .loader import DeckLoader
+    from .storage import CardStorage
+
+    cards_dir = Path(args.cards_dir).resolve()
+    db_path = cards_dir / ".hashcards.db"
+
+    if not db_path.exists():
+        print("No database found. Run 'hashcards drill' first to initialize.", file=sys.stderr)
+        sys.exit(1)
+
+    storage = CardStorage(str(db_path))
+    loader = DeckLoader(str(cards_dir), jobs=args.jobs,
+                        hash_algorithm=storage.get_meta('hash_algorithm', DEFAULT_ALGORITHM))
+    failed = {}
+    cards = loader.refresh(on_error=lambda rel_path, exc: failed.__setitem__(rel_path, exc)).updated
+    if failed:
+        # Cards of an unreadable deck would all look orphaned
+        for rel_path, exc in failed.items():
+            print(f"✗ {rel_path}: ERROR - {exc}", file=sys.stderr)
+        print("Fix the decks above before collecting orphans.", file=sys.stderr)
+        storage.close()
+        sys.exit(1)
+
+    report = storage.reconcile(cards, archive=not args.drop, dry_run=args.dry_run)
+    storage.close()
+
+    if not report['schedules']:
+        print("No orphaned schedules")
+        return
+    for deck_name, count in report['by_deck'].items():
+        print(f"  {deck_name}: {count}")
+    verb = "dropped" if args.drop else "archived"
+    if args.dry_run:
+        verb = f"would be {verb}"
+    print(f"{report['schedules']} orphaned schedule(s) and {report['reviews']} review(s) {verb}")
+
+
+def cmd_archive(args):
+    """Move old review logs to the archive database and shrink the live one"""
+    from .storage import CardStorage
+
+    cards_dir = Path(args.cards_dir).resolve()
+    db_path = cards_dir / ".hashcards.db"
+
+    if not db_path.exists():
+        print("No database found. Run 'hashcards drill' first to initialize.", file=sys.stderr)
+        sys.exit(1)
+
+    size_before = db_path.stat().st_size
+    storage = CardStorage(str(db_path))
+    archived = storage.archive_reviews(args.older_than, compact=not args.no_compact)
+    archive_path = storage.archive_path
+    storage.close()
+
+    print(f"Archived {archived} review(s) older than {args.older_than} days to {archive_path}")
+    if archived and not args.no_compact:
+        print(f"Database: {size_before // 1024} KiB -> {db_path.stat().st_size // 1024} KiB")
+
+
 def cmd_export(args):
-    """Export cards and schedules to different formats"""
-    print("Export functionality coming soon!")
-    print("For now, your cards are already in plain Markdown format.")
-    print("Use standard Unix tools to process them:")
-    print("  - grep: search cards")
-    print("  - wc: count cards")
-    print("  - cat: concatenate decks")
+    """Export schedules and review history"""
+    from .storage import CardStorage
+    from .transfer import export_collection
+
+    cards_dir = Path(args.cards_dir).resolve()
+    db_path = cards_dir / ".hashcards.db"
+
+    if not db_path.exists():
+        print("No database found. Run 'hashcards drill' first to initialize.", file=sys.stderr)
+        sys.exit(1)
+
+    storage = CardStorage(str(db_path))
+    try:
+        counts = export_collection(storage, args.output, args.format,
+                                   include_archive=args.include_archive)
+    except ImportError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        storage.close()
+
+    print(f"Exported {counts['schedules']} schedule(s) and {counts['reviews']} review(s) "
+          f"to {args.output} ({args.format})")
+    print("Cards themselves are already plain Markdown: copy the deck files as they are.")
+
+
+def cmd_import(args):
+    """Import schedules and review history from an export"""
+    from .storage import CardStorage
+    from .transfer import import_collection
+
+    cards_dir = Path(args.cards_dir).resolve()
+
+    if not cards_dir.exists():
+        print(f"Error: Directory not found: {cards_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    storage = CardStorage(str(cards_dir / ".hashcards.db"))
+    try:
+        schedules, reviews = import_collection(storage, args.input, args.format,
+                                               replace=args.replace)
+    except (ImportError, ValueError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        storage.close()
+
+    print(f"Imported {schedules} schedule(s) and {reviews} review(s) from {args.input}")
+
+
+def cmd_backup(args):
+    """Write a verified snapshot of the database, safe while drilling"""
+    from .backup import create_snapshot, list_snapshots
+    from .storage import CardStorage
+
+    cards_dir = Path(args.cards_dir).resolve()
+    db_path = cards_dir / ".hashcards.db"
+
+    if not db_path.exists():
+        print("No database found. Run 'hashcards drill' first to initialize.", file=sys.stderr)
+        sys.exit(1)
+
+    storage = CardStorage(str(db_path))
+    try:
+        path = create_snapshot(storage, args.dir, keep=args.keep, verify=not args.no_verify)
+    except RuntimeError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        storage.close()
+
+    print(f"Backed up to {path} ({path.stat().st_size // 1024} KiB"
+          f"{'' if args.no_verify else ', integrity verified'})")
+    print(f"{len(list_snapshots(str(path.parent)))} snapshot(s) in {path.parent}")
+
+
+def cmd_forecast(args):
+    """Forecast reviews per day by simulating the collection forward"""
+    from .forecast import forecast
+    from .optimizer import saved_weights
+    from .scheduler import FSRSScheduler
+    from .storage import CardStorage
+
+    cards_dir = Path(args.cards_dir).resolve()
+    db_path = cards_dir / ".hashcards.db"
+
+    if not db_path.exists():
+        print("No database found. Run 'hashcards drill' first to initialize.", file=sys.stderr)
+        sys.exit(1)
+
+    storage = CardStorage(str(db_path))
+    options = dict(days=args.days, runs=args.runs, new_per_day=args.new_per_day, seed=args.seed,
+                   params=FSRSScheduler.with_weights(saved_weights(storage)).params)
+    baseline = forecast(storage, **options)
+    scenario = None
+    if args.add_cards:
+        scenario = forecast(storage, add_cards=args.add_cards, add_deck=args.add_deck, **options)
+    storage.close()
+
+    # Weekly rows past two months, so a year fits on a screen
+    step = 7 if args.days > 60 else 1
+    print(f"\n📈 Review forecast, next {args.days} days "
+          f"({baseline.runs} runs, {args.new_per_day} new cards per deck per day)")
+    print("=" * 56)
+    header = f"{'Day' if step == 1 else 'Week of':12s} {'Reviews':>9s} {'10%-90%':>15s}"
+    if scenario:
+        header += f" {f'+{args.add_cards} cards':>13s}"
+    print(header)
+    for i in range(0, args.days, step):
+        span = slice(i, i + step)
+        row = (f"{baseline.days[i]:12s} {sum(baseline.reviews[span]):9.0f} "
+               f"{f'{sum(baseline.low[span]):.0f}-{sum(baseline.high[span]):.0f}':>15s}")
+        if scenario:
+            row += f" {sum(scenario.reviews[span]):13.0f}"
+        print(row)
+
+    print(f"\nTotal: {baseline.total:.0f} reviews, {baseline.total / args.days:.0f} a day on average")
+    if scenario:
+        extra = scenario.total - baseline.total
+        print(f"With {args.add_cards} new cards in '{args.add_deck}': "
+              f"{scenario.total:.0f} ({extra:+.0f}, {extra / args.days:+.0f} a day)")
+
+    if args.by_deck:
+        print("\nBy deck:")
+        for deck_name, reviews in (scenario or baseline).by_deck.items():
+            print(f"  {deck_name:24s} {sum(reviews):9.0f} total  {max(reviews):7.0f} busiest day")
+    print()
+
+
+def cmd_optimize(args):
+    """Fit the scheduler's weights to the collection's review history"""
+    from .optimizer import optimize
+    from .storage import CardStorage
+
+    cards_dir = Path(args.cards_dir).resolve()
+    db_path = cards_dir / ".hashcards.db"
+
+    if not db_path.exists():
+        print("No database found. Run 'hashcards drill' first to initialize.", file=sys.stderr)
+        sys.exit(1)
+
+    storage = CardStorage(str(db_path))
+    try:
+        result = optimize(storage, incremental=not args.full, iterations=args.iterations,
+                          save=not args.dry_run, seed=args.seed)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        if not args.full:
+            print("Saved weights are refined on reviews made since the last fit; "
+                  "--full refits on every review.", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        storage.close()
+
+    kind = "re-fit on new reviews" if result.incremental else "full fit"
+    print(f"\n⚙️  FSRS weights, {kind}: {result.reviews} review(s) of {result.cards} card(s), "
+          f"{result.iterations} steps")
+    change = (result.loss_after - result.loss_before) / result.loss_before
+    print(f"Log-loss: {result.loss_before:.4f} -> {result.loss_after:.4f} ({change:+.1%})")
+    print(f"Weights: {', '.join(f'{weight:g}' for weight in result.weights)}")
+    if args.dry_run:
+        print("Dry run: nothing saved.")
+    elif result.improved:
+        print("Saved: drill sessions and forecasts now schedule with these weights.")
+    else:
+        print("The current weights fit at least as well: kept them.")
+    print()
 
 
 def main():
@@ -113,8 +414,19 @@ def main():
         epilog="""
 Examples:
   hashcards drill ./Cards              # Start study session
+  hashcards drill ./Cards --db memory://  # Study without saving progress
+  hashcards drill ./Cards --order retrievability  # Weakest memories first
+  hashcards drill ./Cards --load-balance  # Spread reviews evenly over the days
   hashcards stats ./Cards              # Show statistics
   hashcards validate ./Cards           # Check card syntax
+  hashcards rehash ./Cards --algorithm blake2b  # Switch card hash algorithm
+  hashcards gc ./Cards --dry-run       # List schedules of deleted cards
+  hashcards archive ./Cards --older-than 365  # Move old review logs out of the live DB
+  hashcards export ./Cards -o backup --format csv  # Dump schedules and reviews
+  hashcards import ./Cards backup --replace     # Restore them
+  hashcards backup ./Cards --keep 7    # Snapshot the database, even mid-session
+  hashcards forecast ./Cards --days 90 --add-cards 5000  # Workload ahead, with a new deck
+  hashcards optimize ./Cards           # Fit the scheduler to your review history
   
 Your cards are plain Markdown files. Edit them with any text editor!
         """
@@ -128,6 +440,26 @@ Your cards are plain Markdown files. Edit them with any text editor!
     drill_parser.add_argument('--host', default='localhost', help='Host to bind to')
     drill_parser.add_argument('--port', type=int, default=8000, help='Port to bind to')
     drill_parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    drill_parser.add_argument('--watch', action='store_true',
+                              help='Reload edited decks automatically')
+    drill_parser.add_argument('--jobs', '-j', type=int, default=1,
+                              help='Worker processes for parsing decks (0 = one per CPU)')
+    drill_parser.add_argument('--db', metavar='URL',
+                              help='Storage: a database path, sqlite:///path, or memory:// '
+                                   'for a session that is not saved (default: .hashcards.db in cards_dir)')
+    drill_parser.add_argument('--group-commit', type=float, metavar='MS',
+                              help='Batch concurrent reviews into shared commits, '
+                                   'waiting up to MS milliseconds for more (0 = no wait)')
+    drill_parser.add_argument('--backup-every', type=float, metavar='MINUTES',
+                              help="Snapshot the database periodically (see 'hashcards backup')")
+    drill_parser.add_argument('--backup-keep', type=int, default=7, metavar='N',
+                              help='Periodic snapshots to keep (default: 7)')
+    drill_parser.add_argument('--order', choices=['due', 'retrievability'], default='due',
+                              help='Study order: earliest due first, or the cards you are '
+                                   'most likely to have forgotten first (default: due)')
+    drill_parser.add_argument('--load-balance', action='store_true',
+                              help='Schedule each review on the least busy day within a few '
+                                   'days of its ideal interval, flattening review peaks')
     drill_parser.set_defaults(func=cmd_drill)
     
     # stats command
@@ -138,13 +470,102 @@ Your cards are plain Markdown files. Edit them with any text editor!
     # validate command
     validate_parser = subparsers.add_parser('validate', help='Validate card files')
     validate_parser.add_argument('cards_dir', help='Directory containing .md card files')
+    validate_parser.add_argument('--jobs', '-j', type=int, default=1,
+                                 help='Worker processes for parsing decks (0 = one per CPU)')
     validate_parser.set_defaults(func=cmd_validate)
     
+    # rehash command
+    rehash_parser = subparsers.add_parser('rehash', help='Change the card hash algorithm')
+    rehash_parser.add_argument('cards_dir', help='Directory containing .md card files')
+    rehash_parser.add_argument('--algorithm', required=True, choices=sorted(ALGORITHMS),
+                               help='New card hash algorithm')
+    rehash_parser.add_argument('--jobs', '-j', type=int, default=1,
+                               help='Worker processes for parsing decks (0 = one per CPU)')
+    rehash_parser.set_defaults(func=cmd_rehash)
+    
+    # gc command
+    gc_parser = subparsers.add_parser('gc', help='Archive schedules of deleted cards')
+    gc_parser.add_argument('cards_dir', help='Directory containing .md card files')
+    gc_parser.add_argument('--drop', action='store_true',
+                           help='Delete orphaned schedules and reviews instead of archiving them')
+    gc_parser.add_argument('--dry-run', action='store_true',
+                           help='Report orphans without changing anything')
+    gc_parser.add_argument('--jobs', '-j', type=int, default=1,
+                           help='Worker processes for parsing decks (0 = one per CPU)')
+    gc_parser.set_defaults(func=cmd_gc)
+    
+    # archive command
+    archive_parser = subparsers.add_parser('archive', help='Archive old review logs')
+    archive_parser.add_argument('cards_dir', help='Directory containing .md card files')
+    archive_parser.add_argument('--older-than', type=int, default=365, metavar='DAYS',
+                                help='Archive reviews made more than DAYS days ago')
+    archive_parser.add_argument('--no-compact', action='store_true',
+                                help='Leave the freed space in the live database')
+    archive_parser.set_defaults(func=cmd_archive)
+    
     # export command
-    export_parser = subparsers.add_parser('export', help='Export cards (future)')
+    export_parser = subparsers.add_parser('export', help='Export schedules and reviews')
     export_parser.add_argument('cards_dir', help='Directory containing .md card files')
+    export_parser.add_argument('--output', '-o', default='hashcards-export', metavar='DIR',
+                               help='Directory to write, one file per table')
+    export_parser.add_argument('--format', default='jsonl', choices=['jsonl', 'csv', 'parquet'],
+                               help='File format (parquet needs pyarrow)')
+    export_parser.add_argument('--include-archive', action='store_true',
+                               help='Also export reviews moved to the archive')
     export_parser.set_defaults(func=cmd_export)
     
+    # import command
+    import_parser = subparsers.add_parser('import', help='Import schedules and reviews')
+    import_parser.add_argument('cards_dir', help='Directory containing .md card files')
+    import_parser.add_argument('input', metavar='DIR', help="Directory written by 'hashcards export'")
+    import_parser.add_argument('--format', choices=['jsonl', 'csv', 'parquet'],
+                               help='File format (default: detected)')
+    import_parser.add_argument('--replace', action='store_true',
+                               help='Drop existing schedules and reviews first')
+    import_parser.set_defaults(func=cmd_import)
+    
+    # backup command
+    backup_parser = subparsers.add_parser('backup', help='Snapshot the database')
+    backup_parser.add_argument('cards_dir', help='Directory containing .md card files')
+    backup_parser.add_argument('--dir', metavar='DIR',
+                               help='Directory for snapshots (default: .hashcards-backups in cards_dir)')
+    backup_parser.add_argument('--keep', type=int, default=7, metavar='N',
+                               help='Snapshots to keep, oldest deleted first (0 = all; default: 7)')
+    backup_parser.add_argument('--no-verify', action='store_true',
+                               help='Skip the integrity check of the copy')
+    backup_parser.set_defaults(func=cmd_backup)
+    
+    # forecast command
+    forecast_parser = subparsers.add_parser('forecast', help='Forecast reviews per day')
+    forecast_parser.add_argument('cards_dir', help='Directory containing .md card files')
+    forecast_parser.add_argument('--days', type=int, default=30,
+                                 help='Days to forecast (default: 30)')
+    forecast_parser.add_argument('--runs', type=int, default=5,
+                                 help='Monte-Carlo runs to average (default: 5)')
+    forecast_parser.add_argument('--new-per-day', type=int, default=20, metavar='N',
+                                 help='New cards studied per deck per day (default: 20)')
+    forecast_parser.add_argument('--add-cards', type=int, default=0, metavar='N',
+                                 help='Also forecast with a deck of N new cards added')
+    forecast_parser.add_argument('--add-deck', default='(new deck)', metavar='NAME',
+                                 help='Name for the added deck')
+    forecast_parser.add_argument('--by-deck', action='store_true',
+                                 help='Show a per-deck breakdown')
+    forecast_parser.add_argument('--seed', type=int, help='Random seed, for repeatable forecasts')
+    forecast_parser.set_defaults(func=cmd_forecast)
+    
+    # optimize command
+    optimize_parser = subparsers.add_parser('optimize', help='Fit scheduler weights to your reviews')
+    optimize_parser.add_argument('cards_dir', help='Directory containing .md card files')
+    optimize_parser.add_argument('--full', action='store_true',
+                                 help='Refit from the default weights on every review '
+                                      '(default: refine the saved weights on new reviews)')
+    optimize_parser.add_argument('--iterations', type=int, metavar='N',
+                                 help='Gradient steps (default: 200, or 50 for a refit)')
+    optimize_parser.add_argument('--dry-run', action='store_true',
+                                 help='Show the fit without saving it')
+    optimize_parser.add_argument('--seed', type=int, help='Random seed, for repeatable fits')
+    optimize_parser.set_defaults(func=cmd_optimize)
+    
     args = parser.parse_args()
     
     if not args.command:
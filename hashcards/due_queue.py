@@ -0,0 +1,253 @@
+"""
+Due Queue - In-process priority queue of the cards to study
+Picks a session's next card without a database query
+
+Each card of the session is in one of two kinds of heap:
+- waiting: (due, card_hash) of the cards not due yet, ordered by time
+- ready: due cards in study order, one heap per deck and one for all decks
+
+Asking for the next card first moves the waiting cards whose due time
+has passed into the ready heaps, then returns the top of the deck's
+ready heap: O(log n) per card, no SQL. A review puts the card back
+with its new schedule.
+
+Entries are never searched for and removed: each one carries the
+card's version at the time, and entries of an older version are
+dropped when they reach the top of their heap. A deck that is never
+studied on its own never pops its heap, so the heaps are also
+compacted once stale entries outnumber live ones.
+
+The queue also keeps each card's current schedule, so a review does not
+need to read it back from storage first.
+"""
+
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .scheduler import CardSchedule, FSRSScheduler, State
+
+# Study orders: earliest due first, or least likely to be recalled first
+ORDERS = ('due', 'retrievability')
+
+# Retrievability moves with the clock: ready cards are re-ranked this often (seconds)
+REKEY_INTERVAL = 3600
+
+# Stale heap entries tolerated beyond the live ones before compacting
+COMPACT_SLACK = 1024
+
+
+class DueQueue:
+    """
+    Due cards by deck, in study order
+
+    Safe to share between threads: every method runs under one lock.
+    """
+
+    def __init__(self, order: str = 'due', scheduler: Optional[FSRSScheduler] = None):
+        """
+        Initialize an empty queue
+
+        Args:
+            order: 'due' (earliest due first, as Storage.get_due_cards) or
+                   'retrievability' (lowest current retrievability first;
+                   learning cards before review cards, new cards last)
+            scheduler: Scheduler computing retrievability (default: FSRSScheduler())
+
+        Raises:
+            ValueError: Unknown order
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order: {order} (expected one of {', '.join(ORDERS)})")
+        self.order = order
+        self.scheduler = scheduler or FSRSScheduler()
+        self._lock = threading.Lock()
+        # card_hash -> (schedule, deck_name, version)
+        self._cards: Dict[str, Tuple[CardSchedule, str, int]] = {}
+        self._versions = itertools.count()
+        self._waiting: List[Tuple[float, str, int]] = []
+        # deck_name (None = all decks) -> heap of (key..., card_hash, version)
+        self._ready: Dict[Optional[str], list] = {}
+        # Entries in all heaps, live or stale
+        self._entries = 0
+        self._keyed_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def _key(self, schedule: CardSchedule, now: datetime) -> tuple:
+        """Sort key of a due card"""
+        due = schedule.due.timestamp()
+        if self.order == 'due':
+            return (due,)
+        if schedule.state == State.NEW:
+            retrievability = 1.0
+        elif schedule.state == State.REVIEW:
+            retrievability = self.scheduler.get_retrievability(schedule, now)
+        else:
+            # Learning steps are minutes apart: finish them first
+            retrievability = 0.0
+        return (retrievability, due)
+
+    def _push_all(self, heap: list, entries: list):
+        """Push entries onto a heap; large batches are merged in one heapify"""
+        self._entries += len(entries)
+        if len(entries) * 16 > len(heap):
+            heap.extend(entries)
+            heapq.heapify(heap)
+        else:
+            for entry in entries:
+                heapq.heappush(heap, entry)
+
+    def _make_ready(self, card_hashes: Iterable[str], now: datetime):
+        """Add cards to the ready heaps of their deck and of all decks"""
+        by_deck: Dict[Optional[str], list] = {None: []}
+        for card_hash in card_hashes:
+            schedule, deck_name, version = self._cards[card_hash]
+            entry = (*self._key(schedule, now), card_hash, version)
+            by_deck[None].append(entry)
+            by_deck.setdefault(deck_name, []).append(entry)
+        for deck_name, entries in by_deck.items():
+            self._push_all(self._ready.setdefault(deck_name, []), entries)
+
+    def _current(self, card_hash: str, version: int) -> bool:
+        entry = self._cards.get(card_hash)
+        return entry is not None and entry[2] == version
+
+    def _push_waiting(self, schedule: CardSchedule, deck_name: str):
+        """Queue one card until it is due, making any older entry of it stale"""
+        version = next(self._versions)
+        self._cards[schedule.card_hash] = (schedule, deck_name, version)
+        heapq.heappush(self._waiting, (schedule.due.timestamp(), schedule.card_hash, version))
+        self._entries += 1
+
+    def _compact(self):
+        """Drop stale entries once they outnumber the live ones (at most two per card)"""
+        if self._entries <= 4 * len(self._cards) + COMPACT_SLACK:
+            return
+        current = self._current
+        self._waiting = [entry for entry in self._waiting if current(entry[1], entry[2])]
+        heapq.heapify(self._waiting)
+        ready = {}
+        for deck_name, heap in self._ready.items():
+            live = [entry for entry in heap if current(entry[-2], entry[-1])]
+            if live:
+                heapq.heapify(live)
+                ready[deck_name] = live
+        self._ready = ready
+        self._entries = len(self._waiting) + sum(len(heap) for heap in ready.values())
+
+    def _promote(self, now: datetime):
+        """Move cards that have come due into the ready heaps"""
+        now_ts = now.timestamp()
+        promoted = []
+        if self.order == 'retrievability' and now_ts - self._keyed_at >= REKEY_INTERVAL:
+            # Re-rank the cards already due along with those coming due
+            promoted = [card_hash for *_, card_hash, version in self._ready.get(None, [])
+                        if self._current(card_hash, version)]
+            self._entries -= sum(len(heap) for heap in self._ready.values())
+            self._ready = {}
+            self._keyed_at = now_ts
+        while self._waiting and self._waiting[0][0] <= now_ts:
+            _, card_hash, version = heapq.heappop(self._waiting)
+            self._entries -= 1
+            if self._current(card_hash, version):
+                promoted.append(card_hash)
+        self._make_ready(promoted, now)
+
+    def _add(self, items: Iterable[Tuple[CardSchedule, str]], now: datetime):
+        """Queue cards; those already due go straight to the ready heaps"""
+        now_ts = now.timestamp()
+        due, waiting = [], []
+        for schedule, deck_name in items:
+            version = next(self._versions)
+            self._cards[schedule.card_hash] = (schedule, deck_name, version)
+            due_ts = schedule.due.timestamp()
+            if due_ts <= now_ts:
+                due.append(schedule.card_hash)
+            else:
+                waiting.append((due_ts, schedule.card_hash, version))
+        self._push_all(self._waiting, waiting)
+        self._make_ready(due, now)
+
+    def load(self, items: Iterable[Tuple[CardSchedule, str]], now: Optional[datetime] = None):
+        """Replace the queue's contents with these (schedule, deck_name) pairs"""
+        with self._lock:
+            self._cards = {}
+            self._ready = {}
+            self._waiting = []
+            self._entries = 0
+            self._add(items, now or datetime.now())
+
+    def put(self, schedule: CardSchedule, deck_name: str):
+        """Add a card, or reschedule it after a review (it is ready once due)"""
+        with self._lock:
+            self._push_waiting(schedule, deck_name)
+            self._compact()
+
+    def requeue(self, previous: CardSchedule, schedule: CardSchedule, deck_name: str) -> bool:
+        """
+        Reschedule a card after a review, unless it changed meanwhile
+
+        Args:
+            previous: The schedule the review started from (as returned by get())
+            schedule: Schedule after the review
+            deck_name: Deck of the card
+
+        Returns:
+            False if the card was removed or replaced since `previous` was
+            read (by a load or another review); the queue is left as it is
+        """
+        with self._lock:
+            entry = self._cards.get(schedule.card_hash)
+            if entry is None or entry[0] is not previous:
+                return False
+            self._push_waiting(schedule, deck_name)
+            self._compact()
+            return True
+
+    def put_many(self, items: Iterable[Tuple[CardSchedule, str]], now: Optional[datetime] = None):
+        """Add or reschedule many cards at once (`now` decides which are already due)"""
+        with self._lock:
+            self._add(items, now or datetime.now())
+            self._compact()
+
+    def remove(self, card_hashes: Iterable[str]):
+        """Drop cards from the queue (their heap entries go stale)"""
+        with self._lock:
+            for card_hash in card_hashes:
+                self._cards.pop(card_hash, None)
+            self._compact()
+
+    def get(self, card_hash: str) -> Optional[CardSchedule]:
+        """Current schedule of a queued card"""
+        with self._lock:
+            entry = self._cards.get(card_hash)
+        return entry[0] if entry else None
+
+    def next(self, deck_name: Optional[str] = None, now: Optional[datetime] = None) -> Optional[str]:
+        """
+        Hash of the card to study next
+
+        The card stays at the top until it is reviewed (see put()).
+
+        Args:
+            deck_name: Only this deck (None = all decks)
+            now: Current time (default: now)
+
+        Returns:
+            Card hash, or None if no card of the deck is due
+        """
+        now = now or datetime.now()
+        with self._lock:
+            self._promote(now)
+            heap = self._ready.get(deck_name or None)
+            while heap:
+                *_, card_hash, version = heap[0]
+                if self._current(card_hash, version):
+                    return card_hash
+                heapq.heappop(heap)
+                self._entries -= 1
+            return None
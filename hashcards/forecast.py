@@ -0,0 +1,262 @@
+"""
+Forecast - Expected review workload for the days ahead
+Monte-Carlo simulation on the batch FSRS engine
+
+Every run replays the collection day by day. Cards due that day are
+reviewed with a rating drawn at random: review cards are recalled with
+their retrievability at that moment, other cards follow the rating mix
+of the review history. The batch scheduler then moves each card to its
+next due day, and cards sent back to a learning step come up again
+later the same day. Runs are stacked along one axis, so a day costs a
+handful of array operations however many runs there are.
+
+New cards are not all due at once: each deck introduces `new_per_day`
+of them a day, oldest first, like a learner working through the decks.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .batch_scheduler import SECONDS_PER_DAY, BatchScheduler, ScheduleBatch
+from .scheduler import Rating, State
+from .storage import CardStorage, Storage, start_of_day
+
+# A card sent back to a learning step more often than this in one day
+# waits for the next day
+MAX_PASSES_PER_DAY = 10
+
+# Reviews needed before the history's rating mix replaces the default
+MIN_REVIEWS_FOR_MIX = 100
+
+
+@dataclass
+class RatingMix:
+    """How ratings are drawn in a simulation"""
+    # P(AGAIN) for new, learning and relearning cards
+    learn_again: float = 0.2
+    # P(HARD), P(GOOD), P(EASY) once a card is recalled
+    recalled: Tuple[float, float, float] = (0.15, 0.75, 0.10)
+
+    @classmethod
+    def from_counts(cls, counts: Mapping[Tuple[int, int], int]) -> 'RatingMix':
+        """
+        Mix observed in a review history (see Storage.get_rating_counts);
+        the default where there are too few reviews to tell
+        """
+        default = cls()
+        learn = [sum(count for (state, rating), count in counts.items()
+                     if state != State.REVIEW and (rating == Rating.AGAIN) == again)
+                 for again in (True, False)]
+        passed = [sum(count for (state, r), count in counts.items() if r == rating)
+                  for rating in (Rating.HARD, Rating.GOOD, Rating.EASY)]
+        return cls(
+            learn_again=learn[0] / sum(learn) if sum(learn) >= MIN_REVIEWS_FOR_MIX else default.learn_again,
+            recalled=(tuple(count / sum(passed) for count in passed)
+                      if sum(passed) >= MIN_REVIEWS_FOR_MIX else default.recalled),
+        )
+
+
+@dataclass
+class Forecast:
+    """Reviews expected per day, overall and by deck"""
+    days: List[str]
+    # Mean over runs, and the 10th-90th percentile band
+    reviews: List[float]
+    low: List[float]
+    high: List[float]
+    by_deck: Dict[str, List[float]] = field(default_factory=dict)
+    runs: int = 0
+
+    @property
+    def total(self) -> float:
+        return sum(self.reviews)
+
+    def to_dict(self) -> dict:
+        return {
+            'days': self.days,
+            'reviews': self.reviews,
+            'low': self.low,
+            'high': self.high,
+            'by_deck': self.by_deck,
+            'runs': self.runs,
+        }
+
+
+def load_collection(storage: Storage,
+                    cards: Optional[Mapping[str, str]] = None) -> Tuple[ScheduleBatch, List[str]]:
+    """
+    Schedules to forecast, with each card's deck
+
+    Args:
+        storage: Collection to read
+        cards: {card_hash: deck_name} of the cards to include (default:
+               every row of the schedules table; needs CardStorage)
+
+    Returns:
+        (schedules, deck names in the same order)
+    """
+    if cards is None:
+        if not isinstance(storage, CardStorage):
+            raise ValueError("Pass the cards to forecast for this storage backend")
+        rows = list(storage.iter_rows('schedules'))
+        return ScheduleBatch.from_rows(rows), [row[1] for row in rows]
+    schedules = storage.get_schedules(cards)
+    return (ScheduleBatch.from_schedules(list(schedules.values())),
+            [cards[card_hash] for card_hash in schedules])
+
+
+def add_new_cards(batch: ScheduleBatch, decks: Sequence[str], count: int,
+                  deck_name: str, now: Optional[datetime] = None) -> Tuple[ScheduleBatch, List[str]]:
+    """A collection with `count` more never-reviewed cards in `deck_name` (for what-if forecasts)"""
+    now = now or datetime.now()
+    extra = ScheduleBatch(
+        card_hash=np.array([f"{deck_name}:{i}" for i in range(count)], dtype=object),
+        state=np.full(count, State.NEW, dtype=np.int8),
+        stability=np.zeros(count),
+        difficulty=np.full(count, 5.0),
+        elapsed_days=np.zeros(count, dtype=np.int64),
+        scheduled_days=np.zeros(count, dtype=np.int64),
+        reps=np.zeros(count, dtype=np.int64),
+        lapses=np.zeros(count, dtype=np.int64),
+        last_review=np.full(count, np.nan),
+        due=np.full(count, now.timestamp()),
+    )
+    combined = ScheduleBatch(**{
+        name: np.concatenate([getattr(batch, name), getattr(extra, name)])
+        for name in ScheduleBatch.__dataclass_fields__
+    })
+    return combined, list(decks) + [deck_name] * count
+
+
+def _draw_ratings(engine: BatchScheduler, cards: ScheduleBatch, now: float,
+                  mix: RatingMix, rng: np.random.Generator) -> np.ndarray:
+    """One simulated rating per card"""
+    is_review = cards.state == State.REVIEW
+    p_recall = np.full(len(cards), 1 - mix.learn_again)
+    p_recall[is_review] = engine.retrievability(cards.stability[is_review],
+                                                cards.days_since_review(now)[is_review])
+    recalled = rng.random(len(cards)) < p_recall
+    ratings = rng.choice([Rating.HARD, Rating.GOOD, Rating.EASY], size=len(cards), p=mix.recalled)
+    return np.where(recalled, ratings, Rating.AGAIN)
+
+
+def simulate(batch: ScheduleBatch, decks: Sequence[str], days: int = 30, runs: int = 5,
+             new_per_day: int = 20, mix: Optional[RatingMix] = None,
+             params: Optional[dict] = None, seed: Optional[int] = None,
+             start: Optional[datetime] = None) -> Forecast:
+    """
+    Forecast the reviews of the next `days` days
+
+    Args:
+        batch: Current schedules (see load_collection)
+        decks: Deck of each card
+        days: Days to forecast, today included
+        runs: Monte-Carlo runs to average
+        new_per_day: New cards introduced per deck per day
+        mix: Rating probabilities (default: RatingMix())
+        params: FSRS parameters (default: the scheduler's)
+        seed: Random seed, for repeatable forecasts
+        start: Time the forecast starts (default: now)
+
+    Returns:
+        Expected reviews per day and per deck
+    """
+    start = start or datetime.now()
+    mix = mix or RatingMix()
+    engine = BatchScheduler(params)
+    rng = np.random.default_rng(seed)
+    n = len(batch)
+    deck_names, deck_codes = np.unique(np.array(decks, dtype=object), return_inverse=True)
+    deck_codes = np.asarray(deck_codes, dtype=np.int64).reshape(-1)
+    n_decks = max(len(deck_names), 1)
+
+    # Runs side by side: card i of run r is at r * n + i, which also serves
+    # as its id (an object array of hashes is slow to gather and scatter)
+    sim = ScheduleBatch(**{name: np.tile(getattr(batch, name), runs)
+                           for name in ScheduleBatch.__dataclass_fields__ if name != 'card_hash'},
+                        card_hash=np.arange(runs * n))
+    bins = np.tile(deck_codes, runs) + np.repeat(np.arange(runs), n) * n_decks
+    counts = np.zeros((days, runs * n_decks))
+
+    day_ends = np.array([start_of_day(start.date() + timedelta(days=d + 1)) for d in range(days)],
+                        dtype=np.float64)
+    calendar: List[List[np.ndarray]] = [[] for _ in range(days)]
+
+    def file_by_day(index: np.ndarray, day_of: np.ndarray):
+        keep = day_of < days
+        index, day_of = index[keep], day_of[keep]
+        order = np.argsort(day_of, kind='stable')
+        index, day_of = index[order], day_of[order]
+        bounds = np.searchsorted(day_of, np.arange(days + 1))
+        for day in np.unique(day_of):
+            calendar[day].append(index[bounds[day]:bounds[day + 1]])
+
+    def file_by_due_day(index: np.ndarray):
+        file_by_day(index, np.searchsorted(day_ends, sim.due[index], side='right'))
+
+    # New cards: the first new_per_day of each deck today, the next tomorrow, ...
+    is_new = batch.state == State.NEW
+    new_cards = np.flatnonzero(is_new)
+    new_cards = new_cards[np.lexsort((batch.due[new_cards], deck_codes[new_cards]))]
+    new_decks = deck_codes[new_cards]
+    rank = np.arange(len(new_cards)) - np.searchsorted(new_decks, new_decks)
+    intro_day = rank // new_per_day if new_per_day > 0 else np.full(len(new_cards), days)
+    run_offsets = np.arange(runs)[:, None] * n
+    file_by_day((run_offsets + new_cards).ravel(), np.tile(intro_day, runs))
+    file_by_due_day(np.flatnonzero(~np.tile(is_new, runs)))
+
+    for day in range(days):
+        index = np.concatenate(calendar[day]) if calendar[day] else np.empty(0, dtype=np.int64)
+        calendar[day] = []
+        now = start.timestamp() + day * SECONDS_PER_DAY
+
+        for _ in range(MAX_PASSES_PER_DAY):
+            if not index.size:
+                break
+            cards = sim.take(index)
+            reviewed = engine.review(cards, _draw_ratings(engine, cards, now, mix, rng),
+                                     now=datetime.fromtimestamp(now))
+            sim.put(index, reviewed)
+            counts[day] += np.bincount(bins[index], minlength=runs * n_decks)
+
+            # Learning steps end later today: review those cards again
+            again_today = reviewed.due < day_ends[day]
+            file_by_due_day(index[~again_today])
+            if again_today.any():
+                now = max(now, float(reviewed.due[again_today].max()))
+            index = index[again_today]
+        if index.size and day + 1 < days:
+            calendar[day + 1].append(index)
+
+    per_run = counts.reshape(days, runs, n_decks)
+    totals = per_run.sum(axis=2)
+    return Forecast(
+        days=[(start.date() + timedelta(days=d)).isoformat() for d in range(days)],
+        reviews=totals.mean(axis=1).round(1).tolist(),
+        low=np.percentile(totals, 10, axis=1).round(1).tolist(),
+        high=np.percentile(totals, 90, axis=1).round(1).tolist(),
+        by_deck={name: per_run[:, :, i].mean(axis=1).round(1).tolist()
+                 for i, name in enumerate(deck_names)},
+        runs=runs,
+    )
+
+
+def forecast(storage: Storage, days: int = 30, runs: int = 5, new_per_day: int = 20,
+             add_cards: int = 0, add_deck: str = "(new deck)",
+             cards: Optional[Mapping[str, str]] = None, seed: Optional[int] = None,
+             params: Optional[dict] = None) -> Forecast:
+    """
+    Forecast a collection's workload, optionally with a deck of new cards added
+
+    Ratings follow the collection's own history (see RatingMix.from_counts).
+    Other arguments are as for load_collection(), add_new_cards() and simulate().
+    """
+    batch, decks = load_collection(storage, cards)
+    if add_cards:
+        batch, decks = add_new_cards(batch, decks, add_cards, add_deck)
+    mix = RatingMix.from_counts(storage.get_rating_counts())
+    return simulate(batch, decks, days=days, runs=runs, new_per_day=new_per_day,
+                    mix=mix, params=params, seed=seed)
@@ -4,6 +4,33 @@ Cards are identified by their content hash, not arbitrary IDs
 """
 
 import hashlib
+from functools import partial
+from typing import Callable, Iterable, List
+
+
+DEFAULT_ALGORITHM = 'sha256'
+
+# Card hash algorithms by name; each digest is cut to 16 hex chars (64 bits)
+ALGORITHMS = {
+    'sha256': hashlib.sha256,
+    'blake2b': partial(hashlib.blake2b, digest_size=8),
+}
+
+
+def _normalize(content: str) -> str:
+    """
+    Collapse whitespace runs to single spaces and trim the ends
+
+    Same result as ' '.join(content.split()). Most cards only break
+    lines between single-spaced words, so those just have their
+    newlines replaced: a few C-level scans instead of splitting the
+    text into one string per word.
+    """
+    text = content.replace('\n', ' ')
+    # isprintable() is False for any other whitespace but ' '
+    if text.isprintable() and '  ' not in text and text[:1] != ' ' and text[-1:] != ' ':
+        return text
+    return ' '.join(content.split())
 
 
 class CardHasher:
@@ -18,24 +45,58 @@ class CardHasher:
     """
     
     @staticmethod
-    def hash_card(content: str) -> str:
+    def _factory(algorithm: str) -> Callable:
+        try:
+            return ALGORITHMS[algorithm]
+        except KeyError:
+            raise ValueError(
+                f"Unknown hash algorithm: {algorithm} (choose from {', '.join(ALGORITHMS)})"
+            ) from None
+
+    @staticmethod
+    def hash_card(content: str, algorithm: str = DEFAULT_ALGORITHM) -> str:
         """
         Generate a hash for card content
         
         Args:
             content: Raw card text (Q: ... A: ... or C: ...)
+            algorithm: Name of a hash in ALGORITHMS
             
         Returns:
-            SHA-256 hash as hex string (first 16 chars for brevity)
+            Hash as hex string (first 16 chars for brevity)
         """
         # Normalize whitespace to make hashing robust
-        normalized = ' '.join(content.split())
-        
-        # Use SHA-256 for cryptographic quality
-        hash_obj = hashlib.sha256(normalized.encode('utf-8'))
+        normalized = _normalize(content)
+        hash_obj = CardHasher._factory(algorithm)(normalized.encode('utf-8'))
         
         # Return first 16 characters (64 bits) - sufficient for collision resistance
         return hash_obj.hexdigest()[:16]
+
+    @staticmethod
+    def hash_cards(contents: Iterable[str], algorithm: str = DEFAULT_ALGORITHM) -> List[str]:
+        """
+        Hash many cards at once
+
+        Same result as calling hash_card on each item, without the
+        per-card lookups; the loop body is a few C-level calls.
+
+        Args:
+            contents: Raw card texts
+            algorithm: Name of a hash in ALGORITHMS
+
+        Returns:
+            Hashes in input order
+        """
+        new = CardHasher._factory(algorithm)
+        hashes = []
+        append = hashes.append
+        for content in contents:
+            # _normalize, inlined: a call per card costs as much as it saves
+            text = content.replace('\n', ' ')
+            if not (text.isprintable() and '  ' not in text and text[:1] != ' ' and text[-1:] != ' '):
+                text = ' '.join(content.split())
+            append(new(text.encode('utf-8')).hexdigest()[:16])
+        return hashes
     
     @staticmethod
     def hash_file(filepath: str) -> str:
@@ -43,6 +104,15 @@ class CardHasher:
         Generate hash for entire file
         Useful for detecting deck changes
         """
-        with open(filepath, 'rb') as f:
-            file_hash = hashlib.sha256(f.read())
-        return file_hash.hexdigest()[:16]
\ No newline at end of file
+        from .parser import CardParser
+        with CardParser.map_file(filepath) as buf:
+            return CardHasher.hash_buffer(buf)
+
+    @staticmethod
+    def hash_buffer(buf) -> str:
+        """
+        Hash raw file bytes (bytes or mmap) without copying them
+
+        Same digest as hash_file on a file with these contents.
+        """
+        return hashlib.sha256(buf).hexdigest()[:16]
\ No newline at end of file
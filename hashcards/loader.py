@@ -0,0 +1,343 @@
+"""
+Deck Loader - Turn a directory of Markdown decks into card cache deltas
+Only files that changed since the previous load are re-parsed
+
+Duplicate cards (same content hash in several places) resolve
+deterministically: the first occurrence in sorted path order wins.
+Each changed file is memory-mapped once: digested, then parsed from the
+same mapping. Parsing and hashing can fan out to a process pool; results
+are merged in path order, so the outcome is identical to a serial load.
+"""
+
+import bisect
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from .cache import CardCache
+from .hasher import ALGORITHMS, CardHasher, DEFAULT_ALGORITHM
+from .manifest import DeckManifest, ManifestEntry
+from .parser import CardParser, Card
+
+
+def find_deck_files(cards_dir: Path) -> List[Path]:
+    """
+    List deck files under a directory, sorted by relative path
+
+    Hidden directories (e.g. .git/, .hashcards/) are pruned rather
+    than walked and filtered afterwards.
+    """
+    cards_dir = Path(cards_dir)
+    found = []
+    for root, dirs, files in os.walk(cards_dir):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in files:
+            if name.endswith('.md') and not name.startswith('.'):
+                found.append(Path(root) / name)
+    found.sort(key=lambda p: p.relative_to(cards_dir).as_posix())
+    return found
+
+
+def deck_name_for(rel_path: str) -> str:
+    """Deck name = relative path without extension, forward slashes always"""
+    return rel_path[:-3] if rel_path.endswith('.md') else rel_path
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Number of worker processes to use (0 = one per CPU)"""
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+class DeckJob(NamedTuple):
+    """One deck file to ingest"""
+    filepath: str
+    deck_name: str
+    # Digest the file had when its cards were loaded; a match means unchanged
+    known_digest: Optional[str] = None
+    algorithm: str = DEFAULT_ALGORITHM
+
+
+@dataclass
+class ParseResult:
+    """Digest and parsed, hashed cards of one deck file"""
+    filepath: str
+    digest: Optional[str] = None
+    # None when the digest matched DeckJob.known_digest
+    cards: Optional[List[Tuple[str, Card]]] = None
+    from_cache: bool = False
+    error: Optional[Exception] = None
+
+
+def _ingest_deck(task: Tuple[DeckJob, Optional[CardCache]]) -> ParseResult:
+    """
+    Map a deck file once: digest the bytes, then reuse cached cards or
+    parse them from the same mapping (runs in worker processes)
+    """
+    job, cache = task
+    try:
+        with CardParser.map_file(job.filepath) as buf:
+            digest = CardHasher.hash_buffer(buf)
+            if digest == job.known_digest:
+                return ParseResult(job.filepath, digest)
+            if cache is not None:
+                cards = cache.get(digest, job.deck_name)
+                if cards is not None:
+                    return ParseResult(job.filepath, digest, cards, from_cache=True)
+            parsed = list(CardParser.iter_buffer_cards(buf, job.deck_name))
+        cards = list(zip(Card.hash_all(parsed, job.algorithm), parsed))
+    except Exception as exc:
+        return ParseResult(job.filepath, error=exc)
+    return ParseResult(job.filepath, digest, cards)
+
+
+def parse_decks(decks: List[DeckJob], jobs: int = 1,
+                cache: Optional[CardCache] = None) -> Iterator[ParseResult]:
+    """
+    Digest, parse and hash many deck files, optionally in parallel
+
+    Args:
+        decks: Deck files to ingest
+        jobs: Worker processes (1 = serial in this process, 0 = one per CPU)
+        cache: Parsed-card cache to consult before parsing
+
+    Yields:
+        ParseResult for each deck, in input order
+    """
+    tasks = [(deck, cache) for deck in decks]
+    jobs = min(resolve_jobs(jobs), len(tasks))
+    if jobs <= 1:
+        yield from map(_ingest_deck, tasks)
+        return
+
+    # Imported here: multiprocessing is costly to import and serial loads never need it
+    from concurrent.futures import ProcessPoolExecutor
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(_ingest_deck, tasks, chunksize=chunksize)
+
+
+@dataclass
+class LoadDelta:
+    """Changes to apply to a hash -> Card cache"""
+    updated: Dict[str, Card] = field(default_factory=dict)
+    removed: Set[str] = field(default_factory=set)
+    # Decks whose cards were (re)loaded, from the parser or the card cache
+    files_parsed: List[str] = field(default_factory=list)
+    files_removed: List[str] = field(default_factory=list)
+    cache_hits: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.updated or self.removed)
+
+    def apply(self, cache: Dict[str, Card]):
+        """Patch a card cache in place"""
+        for card_hash in self.removed:
+            cache.pop(card_hash, None)
+        cache.update(self.updated)
+
+
+class DeckLoader:
+    """
+    Incrementally load cards from a directory of decks
+
+    Keeps the parse result of every file in memory and consults a
+    DeckManifest to decide which files need re-parsing on refresh().
+    """
+
+    def __init__(self, cards_dir: str, manifest_path: Optional[str] = None, jobs: int = 1,
+                 cache_dir: Optional[str] = None, use_cache: bool = True,
+                 hash_algorithm: str = DEFAULT_ALGORITHM):
+        """
+        Initialize loader
+
+        Args:
+            cards_dir: Directory containing .md card files
+            manifest_path: Manifest location (default: .hashcards/manifest.json in cards_dir)
+            jobs: Worker processes for parsing (1 = serial, 0 = one per CPU)
+            cache_dir: Parsed-card cache location (default: .hashcards/cards in cards_dir)
+            use_cache: Read and write the parsed-card cache
+            hash_algorithm: Card hash algorithm (see hasher.ALGORITHMS)
+        """
+        if hash_algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown hash algorithm: {hash_algorithm}")
+        self.cards_dir = Path(cards_dir)
+        self.jobs = jobs
+        self.hash_algorithm = hash_algorithm
+        if manifest_path is None:
+            manifest_path = str(self.cards_dir / ".hashcards" / "manifest.json")
+        self.manifest = DeckManifest(manifest_path)
+        if cache_dir is None:
+            cache_dir = str(self.cards_dir / ".hashcards" / "cards")
+        self.cache = CardCache(cache_dir, hash_algorithm) if use_cache else None
+
+        # rel_path -> {card_hash: Card}, first occurrence within the file wins
+        self._files: Dict[str, Dict[str, Card]] = {}
+        # card_hash -> sorted rel_paths that contain it
+        self._owners: Dict[str, List[str]] = {}
+
+    def refresh(self, paths: Optional[Iterable[str]] = None,
+                on_error: Optional[Callable[[str, Exception], None]] = None) -> LoadDelta:
+        """
+        Rescan the directory and parse new or changed files
+
+        Args:
+            paths: Relative deck paths known to have changed (None = scan everything)
+            on_error: Called with (rel_path, exception) for decks that fail to
+                      parse; those decks are skipped. Without it the error is raised.
+
+        Returns:
+            LoadDelta describing how the card cache must change
+        """
+        delta = LoadDelta()
+        # Ordered so the cache fills in path, then document order
+        touched: Dict[str, None] = {}
+
+        on_disk = {}
+        if paths is None:
+            for path in find_deck_files(self.cards_dir):
+                on_disk[path.relative_to(self.cards_dir).as_posix()] = path
+            known = set(self._files) | set(self.manifest.entries)
+            gone = sorted(r for r in known if r not in on_disk)
+        else:
+            gone = []
+            for rel_path in sorted(set(paths)):
+                path = self.cards_dir / rel_path
+                if path.is_file():
+                    on_disk[rel_path] = path
+                else:
+                    gone.append(rel_path)
+
+        for rel_path in gone:
+            self.manifest.remove(rel_path)
+            if rel_path in self._files:
+                self._drop_file(rel_path, touched)
+                delta.files_removed.append(rel_path)
+
+        # rel_path -> (stat, digest, cards) for every deck to (re)load
+        loaded: Dict[str, Tuple[os.stat_result, str, List[Tuple[str, Card]]]] = {}
+        pending: List[Tuple[str, os.stat_result]] = []
+        decks: List[DeckJob] = []
+        for rel_path, path in on_disk.items():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Deleted between the directory walk and now
+                continue
+            entry = self.manifest.get(rel_path)
+            in_memory = rel_path in self._files
+
+            if entry is not None and entry.matches(stat):
+                if in_memory:
+                    continue
+                # Unchanged since the last run: digest known without reading the file
+                cached = self.cache.get(entry.digest, deck_name_for(rel_path)) if self.cache else None
+                if cached is not None:
+                    loaded[rel_path] = (stat, entry.digest, cached)
+                    delta.cache_hits += 1
+                    continue
+
+            known_digest = entry.digest if in_memory and entry is not None else None
+            pending.append((rel_path, stat))
+            decks.append(DeckJob(str(path), deck_name_for(rel_path), known_digest,
+                                 self.hash_algorithm))
+
+        for (rel_path, stat), result in zip(pending, parse_decks(decks, self.jobs, self.cache)):
+            if result.error is not None:
+                if on_error is None:
+                    raise result.error
+                on_error(rel_path, result.error)
+                continue
+            if result.cards is None:
+                # Touched but not edited: refresh stat metadata only
+                self.manifest.put(rel_path, ManifestEntry(stat.st_mtime_ns, stat.st_size, result.digest))
+                continue
+            if result.from_cache:
+                delta.cache_hits += 1
+            elif self.cache:
+                self.cache.put(result.digest, result.cards)
+            loaded[rel_path] = (stat, result.digest, result.cards)
+
+        # Merge in path order so duplicate resolution never depends on timing
+        for rel_path in on_disk:
+            if rel_path not in loaded:
+                continue
+            stat, digest, cards = loaded[rel_path]
+            self._drop_file(rel_path, touched)
+            self._add_file(rel_path, cards, touched)
+            self.manifest.put(rel_path, ManifestEntry(stat.st_mtime_ns, stat.st_size, digest))
+            delta.files_parsed.append(rel_path)
+
+        for card_hash in touched:
+            owners = self._owners.get(card_hash)
+            if owners:
+                delta.updated[card_hash] = self._files[owners[0]][card_hash]
+            else:
+                delta.removed.add(card_hash)
+
+        self.manifest.save()
+        if self.cache and paths is None:
+            self.cache.prune(e.digest for e in self.manifest.entries.values())
+        return delta
+
+    def card_count(self) -> int:
+        """Number of distinct cards currently loaded"""
+        return len(self._owners)
+
+    def cached_card_count(self) -> Optional[int]:
+        """
+        Number of distinct cards in the decks, from the manifest and the
+        parsed-card cache alone
+
+        Nothing is parsed, hashed or written: decks are only stat()ed.
+
+        Returns:
+            The count, or None if a deck changed since the last load or
+            is missing from the cache
+        """
+        if self.cache is None:
+            return None
+        card_hashes = set()
+        for path in find_deck_files(self.cards_dir):
+            rel_path = path.relative_to(self.cards_dir).as_posix()
+            entry = self.manifest.get(rel_path)
+            try:
+                if entry is None or not entry.matches(path.stat()):
+                    return None
+            except FileNotFoundError:
+                continue
+            cached = self.cache.get(entry.digest, deck_name_for(rel_path))
+            if cached is None:
+                return None
+            card_hashes.update(card_hash for card_hash, _ in cached)
+        return len(card_hashes)
+
+    def file_cards(self, rel_path: str) -> List[Card]:
+        """Cards currently loaded from one deck file (duplicates removed)"""
+        return list(self._files.get(rel_path, {}).values())
+
+    def _add_file(self, rel_path: str, cards: List[Tuple[str, Card]], touched: Dict[str, None]):
+        """Index the (card_hash, card) pairs of one file"""
+        by_hash: Dict[str, Card] = {}
+        for card_hash, card in cards:
+            by_hash.setdefault(card_hash, card)
+        self._files[rel_path] = by_hash
+        owners_by_hash = self._owners
+        for card_hash in by_hash:
+            owners = owners_by_hash.get(card_hash)
+            if owners is None:
+                owners_by_hash[card_hash] = [rel_path]
+            else:
+                bisect.insort(owners, rel_path)
+            touched[card_hash] = None
+
+    def _drop_file(self, rel_path: str, touched: Dict[str, None]):
+        """Remove the cards of one file from the index"""
+        for card_hash in self._files.pop(rel_path, {}):
+            owners = self._owners[card_hash]
+            owners.remove(rel_path)
+            if not owners:
+                del self._owners[card_hash]
+            touched[card_hash] = None
@@ -0,0 +1,112 @@
+"""
+Deck Manifest - Remember what every deck file looked like at the last load
+Lets the loader skip files that have not changed since they were parsed
+
+Change detection is two-stage:
+- (mtime, size) match -> unchanged, the file is not even opened
+- stat differs -> compare content digests (catches `touch`)
+"""
+
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+
+
+@dataclass
+class ManifestEntry:
+    """Last known state of one deck file"""
+    mtime_ns: int
+    size: int
+    digest: str
+
+    def matches(self, stat: os.stat_result) -> bool:
+        """True if the file's stat metadata is unchanged"""
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+
+
+class DeckManifest:
+    """
+    Persisted map of relative deck path -> ManifestEntry
+
+    Stored as JSON so it stays inspectable with standard tools.
+    The manifest is a cache: a missing or unreadable file simply
+    means every deck is treated as new.
+    """
+
+    # 2: entries no longer list their card hashes (the parsed-card cache has them)
+    VERSION = 2
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize manifest
+
+        Args:
+            path: JSON file to persist to (None = in-memory only)
+        """
+        self.path = Path(path) if path else None
+        self.entries: Dict[str, ManifestEntry] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        """Read the manifest from disk, ignoring stale or corrupt files"""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != self.VERSION:
+            return
+        for rel_path, entry in data.get('files', {}).items():
+            self.entries[rel_path] = ManifestEntry(**entry)
+
+    def get(self, rel_path: str) -> Optional[ManifestEntry]:
+        """Return the recorded entry for a file, if any"""
+        return self.entries.get(rel_path)
+
+    def put(self, rel_path: str, entry: ManifestEntry):
+        """Record the current state of a file"""
+        if self.entries.get(rel_path) != entry:
+            self.entries[rel_path] = entry
+            self._dirty = True
+
+    def remove(self, rel_path: str):
+        """Forget a file that no longer exists"""
+        if self.entries.pop(rel_path, None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """Atomically write the manifest if anything changed"""
+        if self.path is None or not self._dirty:
+            return
+        data = {
+            'version': self.VERSION,
+            'files': {
+                rel_path: {
+                    'mtime_ns': e.mtime_ns,
+                    'size': e.size,
+                    'digest': e.digest,
+                }
+                for rel_path, e in sorted(self.entries.items())
+            },
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), prefix='.manifest-')
+        except OSError:
+            # Read-only collections still work, they just rehash on restart
+            return
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            return
+        self._dirty = False
@@ -0,0 +1,366 @@
+"""
+Memory Storage - Scheduling state kept in process memory
+Nothing is persisted: for demo and CI instances, and as a baseline
+when benchmarking the SQLite backend
+
+Schedules live in a dict. Due order is kept in sorted (due, card_hash)
+lists, one for the collection and one per deck, so due queries are
+binary searches; stats and due-day counters are updated on every
+write, like the SQLite rollup tables.
+"""
+
+import bisect
+import threading
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .hasher import DEFAULT_ALGORITHM
+from .scheduler import CardSchedule, ReviewLog, Rating, State
+from .storage import ARCHIVED_ALGORITHMS_META_KEY, Storage, archived_algorithms, to_epoch
+
+# (id, card_hash, rating, state, review_time, scheduled_days, elapsed_days)
+ReviewRow = Tuple[int, str, int, int, int, int, int]
+
+
+def _whole_seconds(moment: Optional[datetime]) -> Optional[datetime]:
+    """Drop sub-second precision, as the SQLite backend does"""
+    return None if moment is None else datetime.fromtimestamp(to_epoch(moment))
+
+
+def _review_day(review_time: int) -> str:
+    return date.fromtimestamp(review_time).isoformat()
+
+
+class MemoryStorage(Storage):
+    """
+    Storage backend built on dicts and sorted lists
+
+    Safe to share between threads: every method runs under one lock.
+    Has no review archive; include_archive is accepted and ignored.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # card_hash -> (schedule, deck_name)
+        self._schedules: Dict[str, Tuple[CardSchedule, str]] = {}
+        self._due: List[Tuple[int, str]] = []
+        self._deck_due: Dict[str, List[Tuple[int, str]]] = {}
+        # deck_name -> [total, new, learning, review, relearning, difficulty_sum, lapses_sum]
+        self._decks: Dict[str, list] = {}
+        # day -> cards (other than new ones) due that day, like due_rollup
+        self._due_days: Dict[str, int] = {}
+        self._reviews: List[ReviewRow] = []
+        self._review_days: Dict[str, int] = {}
+        self._next_review_id = 1
+        # card_hash -> (schedule, deck_name, reviews) of orphaned cards
+        self._archived: Dict[str, Tuple[CardSchedule, str, List[ReviewRow]]] = {}
+        self._meta: Dict[str, str] = {}
+
+    def _put(self, schedule: CardSchedule, deck_name: str):
+        """
+        Insert or update a schedule, keeping indexes and counters current
+
+        Like CardStorage, an update keeps the card's existing deck.
+        """
+        schedule = replace(schedule, last_review=_whole_seconds(schedule.last_review),
+                           due=_whole_seconds(schedule.due))
+        existing = self._remove(schedule.card_hash)
+        if existing is not None:
+            deck_name = existing[1]
+        self._schedules[schedule.card_hash] = (schedule, deck_name)
+        key = (to_epoch(schedule.due), schedule.card_hash)
+        bisect.insort(self._due, key)
+        bisect.insort(self._deck_due.setdefault(deck_name, []), key)
+        self._count(schedule, deck_name, 1)
+
+    def _remove(self, card_hash: str) -> Optional[Tuple[CardSchedule, str]]:
+        """Remove a schedule (not its reviews)"""
+        entry = self._schedules.pop(card_hash, None)
+        if entry is None:
+            return None
+        schedule, deck_name = entry
+        key = (to_epoch(schedule.due), card_hash)
+        for index in (self._due, self._deck_due[deck_name]):
+            del index[bisect.bisect_left(index, key)]
+        if not self._deck_due[deck_name]:
+            del self._deck_due[deck_name]
+        self._count(schedule, deck_name, -1)
+        return entry
+
+    def _count(self, schedule: CardSchedule, deck_name: str, sign: int):
+        counters = self._decks.setdefault(deck_name, [0, 0, 0, 0, 0, 0.0, 0])
+        counters[0] += sign
+        counters[1 + int(schedule.state)] += sign
+        counters[5] += sign * schedule.difficulty
+        counters[6] += sign * schedule.lapses
+        if counters[0] == 0:
+            del self._decks[deck_name]
+        if schedule.state != State.NEW:
+            day = date.fromtimestamp(to_epoch(schedule.due)).isoformat()
+            self._due_days[day] = self._due_days.get(day, 0) + sign
+            if self._due_days[day] == 0:
+                del self._due_days[day]
+
+    def _add_reviews(self, rows: Iterable[ReviewRow]):
+        for row in rows:
+            self._reviews.append(row)
+            day = _review_day(row[4])
+            self._review_days[day] = self._review_days.get(day, 0) + 1
+
+    def _pop_reviews(self, card_hashes: set) -> List[ReviewRow]:
+        """Remove and return the reviews of some cards"""
+        removed, kept = [], []
+        for row in self._reviews:
+            (removed if row[1] in card_hashes else kept).append(row)
+        self._reviews = kept
+        for row in removed:
+            day = _review_day(row[4])
+            self._review_days[day] -= 1
+            if not self._review_days[day]:
+                del self._review_days[day]
+        return removed
+
+    def _review_row(self, log: ReviewLog) -> ReviewRow:
+        """Validate a review log and give it the next id"""
+        row = (self._next_review_id, log.card_hash, int(Rating(log.rating)), int(State(log.state)),
+               to_epoch(log.review_time), int(log.scheduled_days), int(log.elapsed_days))
+        self._next_review_id += 1
+        return row
+
+    def save_schedule(self, schedule: CardSchedule, deck_name: str):
+        """Save or update card schedule"""
+        with self._lock:
+            self._put(schedule, deck_name)
+
+    def bootstrap_schedules(self, cards: Iterable[Tuple[str, str]],
+                            init_card: Callable[[str], CardSchedule]) -> int:
+        """
+        Create schedules for every card that does not have one yet
+
+        Archived cards come back with their schedule and reviews.
+
+        Returns:
+            Number of schedules created or restored
+        """
+        created = 0
+        with self._lock:
+            for card_hash, deck_name in cards:
+                if card_hash in self._schedules:
+                    continue
+                archived = self._archived.pop(card_hash, None)
+                if archived is not None:
+                    schedule, _, reviews = archived
+                    self._put(schedule, deck_name)
+                    self._add_reviews(reviews)
+                else:
+                    self._put(init_card(card_hash), deck_name)
+                created += 1
+        return created
+
+    def get_schedule(self, card_hash: str) -> Optional[CardSchedule]:
+        """Retrieve card schedule by hash"""
+        with self._lock:
+            entry = self._schedules.get(card_hash)
+        return replace(entry[0]) if entry else None
+
+    def get_schedules(self, card_hashes: Iterable[str]) -> Dict[str, CardSchedule]:
+        """Retrieve many schedules at once"""
+        schedules = {}
+        with self._lock:
+            for card_hash in card_hashes:
+                entry = self._schedules.get(card_hash)
+                if entry is not None:
+                    schedules[card_hash] = replace(entry[0])
+        return schedules
+
+    def iter_schedules(self) -> Iterator[CardSchedule]:
+        """Stream every schedule, in no particular order"""
+        with self._lock:
+            schedules = [replace(schedule) for schedule, _ in self._schedules.values()]
+        yield from schedules
+
+    def log_review(self, log: ReviewLog):
+        """Save review log"""
+        with self._lock:
+            self._add_reviews([self._review_row(log)])
+
+    def record_review(self, schedule: CardSchedule, deck_name: str, log: ReviewLog):
+        """Save a review's new schedule and its log (the log is validated first)"""
+        with self._lock:
+            row = self._review_row(log)
+            self._put(schedule, deck_name)
+            self._add_reviews([row])
+
+    def get_due_cards(self, deck_name: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+        """Hashes of due cards, earliest due first"""
+        now = to_epoch(datetime.now())
+        with self._lock:
+            index = self._deck_due.get(deck_name, []) if deck_name else self._due
+            end = bisect.bisect_left(index, (now + 1,))
+            if limit:
+                end = min(end, limit)
+            return [card_hash for _, card_hash in index[:end]]
+
+    def get_stats(self, deck_name: Optional[str] = None) -> dict:
+        """Card counts by state, due cards and reviews today"""
+        now = to_epoch(datetime.now())
+        with self._lock:
+            if deck_name:
+                rows = [self._decks[deck_name]] if deck_name in self._decks else []
+                index = self._deck_due.get(deck_name, [])
+            else:
+                rows = list(self._decks.values())
+                index = self._due
+            counts = [sum(row[i] for row in rows) for i in range(5)]
+            due = bisect.bisect_left(index, (now + 1,))
+            reviews_today = self._review_days.get(date.today().isoformat(), 0)
+
+        by_state = {state.name: counts[1 + int(state)] for state in State if counts[1 + int(state)]}
+        return {
+            'total_cards': counts[0],
+            'due_cards': due,
+            'by_state': by_state,
+            'reviews_today': reviews_today
+        }
+
+    def get_review_history(self, days: int = 365, include_archive: bool = False) -> dict:
+        """{date_str: count} for every one of the last N days (zeros included)"""
+        today = date.today()
+        with self._lock:
+            return {
+                d: self._review_days.get(d, 0)
+                for d in ((today - timedelta(days=i)).isoformat() for i in range(days - 1, -1, -1))
+            }
+
+    def iter_reviews(self, include_archive: bool = False) -> Iterator[ReviewLog]:
+        """Stream every review log, oldest first"""
+        with self._lock:
+            rows = sorted(self._reviews, key=lambda row: (row[4], row[0]))
+        for _, card_hash, rating, state, review_time, scheduled_days, elapsed_days in rows:
+            yield ReviewLog(
+                card_hash=card_hash,
+                rating=Rating(rating),
+                state=State(state),
+                review_time=datetime.fromtimestamp(review_time),
+                scheduled_days=scheduled_days,
+                elapsed_days=elapsed_days
+            )
+
+    def get_deck_stats(self) -> list:
+        """Per-deck aggregates, in the format of CardStorage.get_deck_stats()"""
+        with self._lock:
+            rows = sorted((deck_name, list(counters)) for deck_name, counters in self._decks.items())
+        return [
+            {
+                'deck_name': deck_name,
+                'total': total,
+                'new': new,
+                'learning': learning,
+                'review': review,
+                'relearning': relearning,
+                'avg_difficulty': round(difficulty_sum / total, 1),
+                'lapse_rate': round(lapses_sum / total, 2),
+            }
+            for deck_name, (total, new, learning, review, relearning, difficulty_sum, lapses_sum) in rows
+        ]
+
+    def get_rating_counts(self) -> Dict[Tuple[int, int], int]:
+        """{(state, rating): count} over all reviews"""
+        counts: Dict[Tuple[int, int], int] = {}
+        with self._lock:
+            for row in self._reviews:
+                key = (row[3], row[2])
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def get_due_counts(self, start: date, days: int) -> List[int]:
+        """Cards (other than new ones) due on each of `days` local days from `start`"""
+        with self._lock:
+            return [self._due_days.get((start + timedelta(days=i)).isoformat(), 0)
+                    for i in range(days)]
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Read a collection setting"""
+        with self._lock:
+            return self._meta.get(key, default)
+
+    def set_meta(self, key: str, value: str):
+        """Write a collection setting"""
+        with self._lock:
+            self._meta[key] = value
+
+    def rehash_cards(self, mapping: Iterable[Tuple[str, str]], algorithm: str) -> int:
+        """
+        Move schedules, review history and archived cards to new card hashes
+
+        Returns:
+            Number of schedules moved
+        """
+        new_hashes: Dict[str, str] = {}
+        for old_hash, new_hash in mapping:
+            new_hashes.setdefault(old_hash, new_hash)
+        with self._lock:
+            moved = [(self._remove(old_hash), new_hash)
+                     for old_hash, new_hash in new_hashes.items() if old_hash in self._schedules]
+            for (schedule, deck_name), new_hash in moved:
+                self._put(replace(schedule, card_hash=new_hash), deck_name)
+            self._reviews = [
+                (row[0], new_hashes.get(row[1], row[1])) + row[2:] for row in self._reviews
+            ]
+            archived = {}
+            for card_hash, (schedule, deck_name, reviews) in self._archived.items():
+                new_hash = new_hashes.get(card_hash, card_hash)
+                archived[new_hash] = (replace(schedule, card_hash=new_hash), deck_name,
+                                      [(row[0], new_hash) + row[2:] for row in reviews])
+            self._archived = archived
+
+            rehashed = set(new_hashes.values())
+            unmatched = any(card_hash not in rehashed for card_hash in archived)
+            self._meta[ARCHIVED_ALGORITHMS_META_KEY] = archived_algorithms(
+                self._meta.get(ARCHIVED_ALGORITHMS_META_KEY),
+                self._meta.get('hash_algorithm', DEFAULT_ALGORITHM), algorithm, unmatched)
+            self._meta['hash_algorithm'] = algorithm
+        return len(moved)
+
+    def reconcile(self, card_hashes: Iterable[str], archive: bool = True,
+                  dry_run: bool = False) -> dict:
+        """
+        Archive or drop schedules whose card is no longer in any deck
+
+        Returns:
+            Report in the format of CardStorage.reconcile()
+        """
+        live = set(card_hashes)
+        with self._lock:
+            orphans = {h for h in self._schedules if h not in live}
+            by_deck: Dict[str, int] = {}
+            for card_hash in orphans:
+                deck_name = self._schedules[card_hash][1]
+                by_deck[deck_name] = by_deck.get(deck_name, 0) + 1
+            reviews = sum(1 for row in self._reviews if row[1] in orphans)
+
+            if orphans and not dry_run:
+                reviews_by_card: Dict[str, List[ReviewRow]] = {}
+                for row in self._pop_reviews(orphans):
+                    reviews_by_card.setdefault(row[1], []).append(row)
+                for card_hash in orphans:
+                    schedule, deck_name = self._remove(card_hash)
+                    if archive:
+                        self._archived[card_hash] = (schedule, deck_name,
+                                                     reviews_by_card.get(card_hash, []))
+
+        return {
+            'schedules': len(orphans),
+            'reviews': reviews,
+            'by_deck': dict(sorted(by_deck.items())),
+        }
+
+    def delete_card(self, card_hash: str):
+        """Delete card and its review history"""
+        with self._lock:
+            self._pop_reviews({card_hash})
+            self._remove(card_hash)
+
+    def close(self):
+        """Nothing to release"""
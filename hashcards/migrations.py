@@ -0,0 +1,391 @@
+"""
+Schema Migrations - Versioned, in-place upgrades of the scheduling database
+The schema version lives in SQLite's `PRAGMA user_version`
+
+MIGRATIONS[i] upgrades a database from version i to i + 1. Databases
+created before versioning existed report version 0; the first migration
+creates the original schema with IF NOT EXISTS, so it is a no-op on them.
+Pending migrations run in one transaction together with the version
+bump, so an interrupted upgrade leaves the file at its old version.
+"""
+
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Optional
+
+
+def _iso_to_epoch(value: Optional[str]) -> Optional[int]:
+    """ISO-8601 text (naive local time, as stored by version 1) to Unix seconds"""
+    if value is None:
+        return None
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def _v1_initial_schema(cursor: sqlite3.Cursor):
+    """Tables as first released: ISO-8601 TEXT timestamps"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schedules (
+            card_hash TEXT PRIMARY KEY,
+            deck_name TEXT NOT NULL,
+            state INTEGER NOT NULL,
+            stability REAL NOT NULL,
+            difficulty REAL NOT NULL,
+            elapsed_days INTEGER NOT NULL,
+            scheduled_days INTEGER NOT NULL,
+            reps INTEGER NOT NULL,
+            lapses INTEGER NOT NULL,
+            last_review TEXT,
+            due TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reviews (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            card_hash TEXT NOT NULL,
+            rating INTEGER NOT NULL,
+            state INTEGER NOT NULL,
+            review_time TEXT NOT NULL,
+            scheduled_days INTEGER NOT NULL,
+            elapsed_days INTEGER NOT NULL,
+            FOREIGN KEY (card_hash) REFERENCES schedules(card_hash)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_schedules_due ON schedules(due)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_schedules_deck ON schedules(deck_name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reviews_card ON reviews(card_hash)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reviews_time ON reviews(review_time)")
+
+
+def _v2_epoch_timestamps(cursor: sqlite3.Cursor):
+    """
+    Integer Unix-second timestamps and covering due indexes
+
+    Tables are rebuilt (SQLite cannot change a column's type in place);
+    rows keep their ids, so review order and AUTOINCREMENT are preserved.
+    """
+    cursor.connection.create_function("iso_to_epoch", 1, _iso_to_epoch, deterministic=True)
+
+    cursor.execute("""
+        CREATE TABLE schedules_v2 (
+            card_hash TEXT PRIMARY KEY,
+            deck_name TEXT NOT NULL,
+            state INTEGER NOT NULL,
+            stability REAL NOT NULL,
+            difficulty REAL NOT NULL,
+            elapsed_days INTEGER NOT NULL,
+            scheduled_days INTEGER NOT NULL,
+            reps INTEGER NOT NULL,
+            lapses INTEGER NOT NULL,
+            last_review INTEGER,
+            due INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO schedules_v2
+        SELECT card_hash, deck_name, state, stability, difficulty,
+               elapsed_days, scheduled_days, reps, lapses,
+               iso_to_epoch(last_review), iso_to_epoch(due),
+               iso_to_epoch(created_at), iso_to_epoch(updated_at)
+        FROM schedules
+    """)
+    cursor.execute("DROP TABLE schedules")
+    cursor.execute("ALTER TABLE schedules_v2 RENAME TO schedules")
+
+    cursor.execute("""
+        CREATE TABLE reviews_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            card_hash TEXT NOT NULL,
+            rating INTEGER NOT NULL,
+            state INTEGER NOT NULL,
+            review_time INTEGER NOT NULL,
+            scheduled_days INTEGER NOT NULL,
+            elapsed_days INTEGER NOT NULL,
+            FOREIGN KEY (card_hash) REFERENCES schedules(card_hash)
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO reviews_v2
+        SELECT id, card_hash, rating, state, iso_to_epoch(review_time),
+               scheduled_days, elapsed_days
+        FROM reviews
+    """)
+    cursor.execute("DROP TABLE reviews")
+    cursor.execute("ALTER TABLE reviews_v2 RENAME TO reviews")
+
+    # Due queries are index-only range scans, with or without a deck filter;
+    # (deck_name, due) also serves every lookup by deck_name alone
+    cursor.execute("CREATE INDEX idx_schedules_due ON schedules(due, card_hash)")
+    cursor.execute("CREATE INDEX idx_schedules_deck_due ON schedules(deck_name, due, card_hash)")
+    cursor.execute("CREATE INDEX idx_reviews_card ON reviews(card_hash)")
+    cursor.execute("CREATE INDEX idx_reviews_time ON reviews(review_time)")
+
+
+def rebuild_rollups(cursor: sqlite3.Cursor):
+    """
+    Recompute every rollup table from `schedules` and `reviews`
+
+    Reviews are attributed to their card's current deck.
+    """
+    _rebuild_stats_rollups(cursor)
+    _rebuild_due_rollup(cursor)
+
+
+def _rebuild_stats_rollups(cursor: sqlite3.Cursor):
+    """Recompute deck_rollup and review_rollup"""
+    cursor.execute("DELETE FROM deck_rollup")
+    cursor.execute("""
+        INSERT INTO deck_rollup
+        SELECT deck_name, COUNT(*),
+               SUM(state = 0), SUM(state = 1), SUM(state = 2), SUM(state = 3),
+               SUM(difficulty), SUM(lapses)
+        FROM schedules
+        GROUP BY deck_name
+    """)
+    cursor.execute("DELETE FROM review_rollup")
+    cursor.execute("""
+        INSERT INTO review_rollup
+        SELECT DATE(r.review_time, 'unixepoch', 'localtime'), COALESCE(s.deck_name, ''),
+               r.rating, r.state, COUNT(*)
+        FROM reviews r
+        LEFT JOIN schedules s ON s.card_hash = r.card_hash
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def _rebuild_due_rollup(cursor: sqlite3.Cursor):
+    """Recompute due_rollup"""
+    cursor.execute("DELETE FROM due_rollup")
+    cursor.execute("""
+        INSERT INTO due_rollup
+        SELECT DATE(due, 'unixepoch', 'localtime'), COUNT(*)
+        FROM schedules
+        WHERE state != 0
+        GROUP BY 1
+    """)
+
+
+def _v3_rollups(cursor: sqlite3.Cursor):
+    """
+    Aggregates kept current by triggers, so stats never scan whole tables
+
+    - deck_rollup: per deck card counts by state, difficulty and lapse sums
+    - review_rollup: review counts per local day, deck, rating and state
+      (a review's deck is its card's deck when the review is logged)
+    """
+    cursor.execute("""
+        CREATE TABLE deck_rollup (
+            deck_name TEXT PRIMARY KEY,
+            total INTEGER NOT NULL,
+            new INTEGER NOT NULL,
+            learning INTEGER NOT NULL,
+            review INTEGER NOT NULL,
+            relearning INTEGER NOT NULL,
+            difficulty_sum REAL NOT NULL,
+            lapses_sum INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE review_rollup (
+            day TEXT NOT NULL,
+            deck_name TEXT NOT NULL,
+            rating INTEGER NOT NULL,
+            state INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, deck_name, rating, state)
+        ) WITHOUT ROWID
+    """)
+
+    add_card = """
+        INSERT INTO deck_rollup VALUES (
+            NEW.deck_name, 1, NEW.state = 0, NEW.state = 1, NEW.state = 2, NEW.state = 3,
+            NEW.difficulty, NEW.lapses
+        )
+        ON CONFLICT(deck_name) DO UPDATE SET
+            total = total + 1,
+            new = new + (NEW.state = 0),
+            learning = learning + (NEW.state = 1),
+            review = review + (NEW.state = 2),
+            relearning = relearning + (NEW.state = 3),
+            difficulty_sum = difficulty_sum + NEW.difficulty,
+            lapses_sum = lapses_sum + NEW.lapses;
+    """
+    remove_card = """
+        UPDATE deck_rollup SET
+            total = total - 1,
+            new = new - (OLD.state = 0),
+            learning = learning - (OLD.state = 1),
+            review = review - (OLD.state = 2),
+            relearning = relearning - (OLD.state = 3),
+            difficulty_sum = difficulty_sum - OLD.difficulty,
+            lapses_sum = lapses_sum - OLD.lapses
+        WHERE deck_name = OLD.deck_name;
+        DELETE FROM deck_rollup WHERE deck_name = OLD.deck_name AND total = 0;
+    """
+    cursor.execute(f"CREATE TRIGGER schedules_rollup_insert AFTER INSERT ON schedules BEGIN {add_card} END")
+    cursor.execute(f"CREATE TRIGGER schedules_rollup_delete AFTER DELETE ON schedules BEGIN {remove_card} END")
+    cursor.execute(f"""
+        CREATE TRIGGER schedules_rollup_update
+        AFTER UPDATE OF deck_name, state, difficulty, lapses ON schedules
+        BEGIN {remove_card} {add_card} END
+    """)
+
+    review_key = """
+        DATE({row}.review_time, 'unixepoch', 'localtime'),
+        COALESCE((SELECT deck_name FROM schedules WHERE card_hash = {row}.card_hash), ''),
+        {row}.rating, {row}.state
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER reviews_rollup_insert AFTER INSERT ON reviews
+        BEGIN
+            INSERT INTO review_rollup VALUES ({review_key.format(row='NEW')}, 1)
+            ON CONFLICT(day, deck_name, rating, state) DO UPDATE SET count = count + 1;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER reviews_rollup_delete AFTER DELETE ON reviews
+        BEGIN
+            UPDATE review_rollup SET count = count - 1
+            WHERE (day, deck_name, rating, state) = ({review_key.format(row='OLD')});
+            DELETE FROM review_rollup
+            WHERE (day, deck_name, rating, state) = ({review_key.format(row='OLD')}) AND count <= 0;
+        END
+    """)
+
+    _rebuild_stats_rollups(cursor)
+
+
+def _v4_archive(cursor: sqlite3.Cursor):
+    """
+    Resting place for orphaned schedules and their reviews
+
+    Rows keep their original columns plus the time they were archived.
+    No rollup triggers: archived cards are out of every statistic.
+    """
+    cursor.execute("""
+        CREATE TABLE archived_schedules (
+            card_hash TEXT PRIMARY KEY,
+            deck_name TEXT NOT NULL,
+            state INTEGER NOT NULL,
+            stability REAL NOT NULL,
+            difficulty REAL NOT NULL,
+            elapsed_days INTEGER NOT NULL,
+            scheduled_days INTEGER NOT NULL,
+            reps INTEGER NOT NULL,
+            lapses INTEGER NOT NULL,
+            last_review INTEGER,
+            due INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL,
+            archived_at INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE archived_reviews (
+            id INTEGER PRIMARY KEY,
+            card_hash TEXT NOT NULL,
+            rating INTEGER NOT NULL,
+            state INTEGER NOT NULL,
+            review_time INTEGER NOT NULL,
+            scheduled_days INTEGER NOT NULL,
+            elapsed_days INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX idx_archived_reviews_card ON archived_reviews(card_hash)")
+
+
+def _v5_due_rollup(cursor: sqlite3.Cursor):
+    """
+    Cards due per local day, kept current by triggers (for load balancing)
+
+    New cards are left out: they are introduced at the learner's pace,
+    whatever their due time says.
+    """
+    cursor.execute("""
+        CREATE TABLE due_rollup (
+            day TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    add_due = """
+        INSERT INTO due_rollup
+        SELECT DATE(NEW.due, 'unixepoch', 'localtime'), 1 WHERE NEW.state != 0
+        ON CONFLICT(day) DO UPDATE SET count = count + 1;
+    """
+    remove_due = """
+        UPDATE due_rollup SET count = count - 1
+        WHERE OLD.state != 0 AND day = DATE(OLD.due, 'unixepoch', 'localtime');
+        DELETE FROM due_rollup
+        WHERE day = DATE(OLD.due, 'unixepoch', 'localtime') AND count <= 0;
+    """
+    cursor.execute(f"CREATE TRIGGER schedules_due_insert AFTER INSERT ON schedules BEGIN {add_due} END")
+    cursor.execute(f"CREATE TRIGGER schedules_due_delete AFTER DELETE ON schedules BEGIN {remove_due} END")
+    cursor.execute(f"""
+        CREATE TRIGGER schedules_due_update
+        AFTER UPDATE OF state, due ON schedules
+        BEGIN {remove_due} {add_due} END
+    """)
+    _rebuild_due_rollup(cursor)
+
+
+def _v6_meta(cursor: sqlite3.Cursor):
+    """
+    Collection settings as key/value text (hash algorithm, fitted weights)
+
+    Unversioned databases that selected a hash algorithm, and databases
+    created at versions 1 to 5 by earlier builds, already have the
+    table, hence IF NOT EXISTS.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+
+
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    _v1_initial_schema,
+    _v2_epoch_timestamps,
+    _v3_rollups,
+    _v4_archive,
+    _v5_due_rollup,
+    _v6_meta,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Bring a database up to SCHEMA_VERSION
+
+    Returns:
+        The version the database was at before migrating
+
+    Raises:
+        RuntimeError: The database was written by a newer hashcards
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this hashcards "
+            f"supports ({SCHEMA_VERSION}); upgrade hashcards"
+        )
+    if version == SCHEMA_VERSION:
+        return version
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        for migration in MIGRATIONS[version:]:
+            migration(cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return version
@@ -0,0 +1,355 @@
+"""
+Optimizer - FSRS weights fitted to a collection's review history
+Mini-batch gradient descent on log-loss, in NumPy
+
+Each card's reviews are replayed in order with candidate weights. Every
+review of a card in the review state is a prediction - the card's
+retrievability at that moment - of whether it would be recalled, and
+the fit minimises the log-loss of those predictions.
+
+Cards are replayed side by side, one review step at a time, and so are
+the weight vectors the gradient needs: central differences for all the
+weights cost one replay of a (32, cards) array instead of 32 replays.
+Weights are optimised in coordinates scaled to their bounds, so one
+learning rate suits weights of very different magnitudes.
+
+A re-fit can start from the saved weights and score only the reviews
+made since the last fit; earlier reviews are still replayed, to rebuild
+each card's memory state.
+"""
+
+import json
+import math
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .scheduler import WEIGHTS_META_KEY, FSRSScheduler, Rating, State
+from .storage import CardStorage, Storage
+
+# Review time (Unix seconds) of the newest review the saved weights were fitted on
+FITTED_THROUGH_META_KEY = 'fsrs_fitted_through'
+
+# Allowed range of each weight (those of the reference FSRS optimizer)
+BOUNDS = np.array([
+    (0.1, 100.0), (0.1, 100.0), (0.1, 100.0), (0.1, 100.0),  # initial stability by rating
+    (1.0, 10.0), (0.1, 5.0),                                 # initial difficulty
+    (0.1, 5.0),                                              # difficulty update
+    (0.0, 0.75),                                             # (not used by this scheduler)
+    (0.0, 4.5), (0.0, 0.8), (0.01, 3.5),                     # stability after success
+    (0.1, 5.0), (0.01, 0.2), (0.01, 0.9), (0.01, 4.0),       # stability after failure
+    (0.0, 1.0), (1.0, 6.0),                                  # hard penalty, easy bonus
+])
+
+# w[7] does not appear in this scheduler's formulas: it is left as it is
+FROZEN = (7,)
+
+# Reviews a fit needs to score before its result is worth keeping
+MIN_REVIEWS_TO_FIT = 100
+
+DEFAULT_ITERATIONS = 200
+INCREMENTAL_ITERATIONS = 50
+BATCH_CARDS = 512
+LEARNING_RATE = 0.02
+# A warm start only refines: smaller steps, so a few new reviews cannot undo the fit
+INCREMENTAL_LEARNING_RATE = 0.005
+
+# Step (in scaled coordinates) of the central differences
+_GRADIENT_STEP = 1e-3
+# Predictions are kept this far from 0 and 1, so one review cannot dominate the loss
+_P_EPSILON = 1e-6
+
+
+@dataclass
+class ReviewHistory:
+    """
+    Review logs grouped by card, each card's reviews in order
+
+    Review arrays have one entry per review; cards are the spans
+    [start, start + length) of them.
+    """
+    rating: np.ndarray       # int64, Rating values
+    state: np.ndarray        # int8, State before the review
+    elapsed: np.ndarray      # float64, days since the card's previous review
+    review_time: np.ndarray  # float64, Unix seconds
+    start: np.ndarray        # int64, first review of each card
+    length: np.ndarray       # int64, reviews of each card
+
+    def __len__(self) -> int:
+        return len(self.rating)
+
+    @property
+    def cards(self) -> int:
+        return len(self.start)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> 'ReviewHistory':
+        """
+        History from review rows in CardStorage.TABLE_COLUMNS order,
+        as streamed by CardStorage.iter_rows('reviews')
+        """
+        (ids, card_hash, rating, state, review_time,
+         _scheduled_days, elapsed_days) = list(zip(*rows)) or [()] * 7
+        _, card = np.unique(np.array(card_hash, dtype=object), return_inverse=True)
+        card = np.asarray(card, dtype=np.int64).reshape(-1)
+        review_time = np.array(review_time, dtype=np.float64)
+        # By card, then time; ids break ties between reviews in the same second
+        order = np.lexsort((np.array(ids, dtype=np.int64), review_time, card))
+        length = np.bincount(card, minlength=0).astype(np.int64)
+        return cls(
+            rating=np.array(rating, dtype=np.int64)[order],
+            state=np.array(state, dtype=np.int8)[order],
+            elapsed=np.array(elapsed_days, dtype=np.float64)[order],
+            review_time=review_time[order],
+            start=np.cumsum(length) - length,
+            length=length,
+        )
+
+
+@dataclass
+class FitResult:
+    """Outcome of a fit"""
+    weights: List[float]
+    # Mean log-loss over the scored reviews, with the starting and fitted weights
+    loss_before: float
+    loss_after: float
+    reviews: int
+    cards: int
+    iterations: int
+    # Newest review time covered by the fit
+    fitted_through: float
+    incremental: bool = False
+
+    @property
+    def improved(self) -> bool:
+        return self.loss_after < self.loss_before
+
+
+def load_history(storage: CardStorage) -> ReviewHistory:
+    """Every review of a collection, archived ones included"""
+    return ReviewHistory.from_rows(storage.iter_rows('reviews', include_archive=True))
+
+
+def saved_weights(storage: Storage) -> Optional[List[float]]:
+    """Weights saved by the last fit, if any"""
+    value = storage.get_meta(WEIGHTS_META_KEY)
+    return json.loads(value) if value else None
+
+
+def _scaled(weights: np.ndarray) -> np.ndarray:
+    return (weights - BOUNDS[:, 0]) / (BOUNDS[:, 1] - BOUNDS[:, 0])
+
+
+def _unscaled(x: np.ndarray) -> np.ndarray:
+    return BOUNDS[:, 0] + x * (BOUNDS[:, 1] - BOUNDS[:, 0])
+
+
+def _replay(history: ReviewHistory, weights: np.ndarray, cards: np.ndarray,
+            since: float) -> Tuple[np.ndarray, int]:
+    """
+    Summed log-loss of each row of `weights` over the scored reviews of `cards`
+
+    Args:
+        history: Review history
+        weights: (n, 17) weight vectors, replayed side by side
+        cards: Cards to replay
+        since: Only reviews made after this time (Unix seconds) are scored
+
+    Returns:
+        ((n,) summed log-loss, number of reviews scored)
+    """
+    # Longest histories first: the cards still being replayed at any
+    # step are then a prefix, and the state arrays below are views
+    cards = cards[np.argsort(-history.length[cards], kind='stable')]
+    starts, lengths = history.start[cards], history.length[cards]
+    w = [weights[:, i:i + 1] for i in range(weights.shape[1])]
+    stability = np.zeros((len(weights), len(cards)))
+    difficulty = np.full((len(weights), len(cards)), 5.0)
+    loss = np.zeros(len(weights))
+    scored_count = 0
+
+    for step in range(int(lengths.max(initial=0))):
+        at = starts[:np.count_nonzero(lengths > step)] + step
+        rating, state = history.rating[at], history.state[at]
+        s, d = stability[:, :len(at)], difficulty[:, :len(at)]
+        again = rating == Rating.AGAIN
+
+        # New cards: difficulty from the first rating
+        is_new = state == State.NEW
+        d[:, is_new] = w[4] - (rating[is_new] - 3) * w[5]
+
+        # Review cards, once replayed to a stability (a history may start mid-way)
+        is_review = (state == State.REVIEW) & (s[0] > 0)
+        if is_review.any():
+            rs, rd = s[:, is_review], d[:, is_review]
+            r_rating, r_again = rating[is_review], again[is_review]
+            retrievability = 1 / (1 + history.elapsed[at][is_review] / (9 * rs))
+
+            scored = history.review_time[at][is_review] > since
+            p = np.clip(retrievability[:, scored], _P_EPSILON, 1 - _P_EPSILON)
+            loss -= np.where(r_again[scored], np.log(1 - p), np.log(p)).sum(axis=1)
+            scored_count += int(np.count_nonzero(scored))
+
+            success = rs * (
+                1 + np.exp(w[8]) *
+                (11 - rd) *
+                np.power(rs, -w[9]) *
+                (np.exp((1 - retrievability) * w[10]) - 1) *
+                np.where(r_rating == Rating.HARD, w[15], 1) *
+                np.where(r_rating == Rating.EASY, w[16], 1)
+            )
+            failure = np.maximum(0.1, (
+                w[11] *
+                np.power(rd, -w[12]) *
+                (np.power(rs + 1, w[13]) - 1) *
+                np.exp((1 - retrievability) * w[14])
+            ))
+            s[:, is_review] = np.where(r_again, failure, success)
+            d[:, is_review] = np.where(r_again, rd, np.clip(rd - w[6] * (r_rating - 3), 1, 10))
+
+        # New and learning cards: anything but AGAIN graduates with an initial stability
+        graduate = (state != State.REVIEW) & ~again
+        s[:, graduate] = weights[:, rating[graduate] - 1]
+
+    return loss, scored_count
+
+
+def _cards_to_score(history: ReviewHistory, since: float) -> np.ndarray:
+    """Cards with a review in the review state made after `since`"""
+    scored = (history.state == State.REVIEW) & (history.review_time > since)
+    card = np.repeat(np.arange(history.cards), history.length)
+    return np.unique(card[scored])
+
+
+def log_loss(history: ReviewHistory, weights: Sequence[float],
+             since: float = -math.inf) -> Tuple[float, int]:
+    """
+    Mean log-loss of a weight vector over a review history
+
+    Args:
+        history: Review history
+        weights: The 17 FSRS weights
+        since: Only score reviews made after this time (Unix seconds)
+
+    Returns:
+        (mean log-loss, or NaN if nothing was scored; reviews scored)
+    """
+    loss, count = _replay(history, np.array([weights], dtype=np.float64),
+                          _cards_to_score(history, since), since)
+    return (float(loss[0] / count) if count else math.nan), count
+
+
+def fit(history: ReviewHistory, initial: Optional[Sequence[float]] = None,
+        since: float = -math.inf, iterations: int = DEFAULT_ITERATIONS,
+        batch_cards: int = BATCH_CARDS, learning_rate: float = LEARNING_RATE,
+        seed: Optional[int] = None) -> FitResult:
+    """
+    Fit the FSRS weights to a review history
+
+    Each iteration replays a random batch of cards and takes an Adam
+    step along the central-difference gradient of their log-loss.
+
+    Args:
+        history: Review history
+        initial: Weights to start from (default: FSRSScheduler.DEFAULT_PARAMS)
+        since: Only fit on reviews made after this time (warm starts)
+        iterations: Gradient steps
+        batch_cards: Cards replayed per step
+        learning_rate: Adam step size, in bound-scaled coordinates
+        seed: Random seed for the batches, for repeatable fits
+
+    Returns:
+        Fitted weights, and the loss over all scored reviews before and after
+
+    Raises:
+        ValueError: Fewer than MIN_REVIEWS_TO_FIT reviews to score
+    """
+    initial = np.array(initial or FSRSScheduler.DEFAULT_PARAMS['w'], dtype=np.float64)
+    eligible = _cards_to_score(history, since)
+    loss, count = _replay(history, initial[None, :], eligible, since)
+    if count < MIN_REVIEWS_TO_FIT:
+        raise ValueError(f"Only {count} review(s) to fit on; at least {MIN_REVIEWS_TO_FIT} are needed")
+
+    rng = np.random.default_rng(seed)
+    free = np.array([i for i in range(len(initial)) if i not in FROZEN])
+    rows = np.arange(len(free))
+    x = np.clip(_scaled(initial), 0, 1)
+    moment, second_moment = np.zeros_like(x), np.zeros_like(x)
+    beta1, beta2 = 0.9, 0.999
+
+    for iteration in range(1, iterations + 1):
+        batch = rng.choice(eligible, size=min(batch_cards, len(eligible)), replace=False)
+        # One probe above and one below x for each free weight, inside the bounds
+        probes = np.repeat(x[None, :], 2 * len(free), axis=0)
+        probes[rows, free] = np.minimum(x[free] + _GRADIENT_STEP, 1)
+        probes[rows + len(free), free] = np.maximum(x[free] - _GRADIENT_STEP, 0)
+        probe_weights = _unscaled(probes)
+        probe_weights[:, FROZEN] = initial[list(FROZEN)]
+        probe_loss, scored = _replay(history, probe_weights, batch, since)
+        if not scored:
+            continue
+
+        gradient = np.zeros_like(x)
+        gradient[free] = ((probe_loss[rows] - probe_loss[rows + len(free)])
+                          / (probes[rows, free] - probes[rows + len(free), free]) / scored)
+        moment = beta1 * moment + (1 - beta1) * gradient
+        second_moment = beta2 * second_moment + (1 - beta2) * gradient ** 2
+        step = (moment / (1 - beta1 ** iteration)
+                / (np.sqrt(second_moment / (1 - beta2 ** iteration)) + 1e-8))
+        x = np.clip(x - learning_rate * step, 0, 1)
+
+    fitted = np.round(_unscaled(x), 4)
+    fitted[list(FROZEN)] = initial[list(FROZEN)]
+    fitted_loss, _ = _replay(history, fitted[None, :], eligible, since)
+    return FitResult(
+        weights=fitted.tolist(),
+        loss_before=float(loss[0] / count),
+        loss_after=float(fitted_loss[0] / count),
+        reviews=count,
+        cards=len(eligible),
+        iterations=iterations,
+        fitted_through=float(history.review_time.max()),
+    )
+
+
+def optimize(storage: CardStorage, incremental: bool = True, iterations: Optional[int] = None,
+             save: bool = True, seed: Optional[int] = None) -> FitResult:
+    """
+    Fit a collection's FSRS weights and save them with it
+
+    With `incremental`, a collection fitted before is re-fitted from
+    its saved weights on the reviews made since; otherwise the fit
+    starts from the default weights and covers the whole history.
+    Fitted weights are saved only if they lower the loss.
+
+    Args:
+        storage: Collection to fit
+        incremental: Warm-start from the saved weights when there are some
+        iterations: Gradient steps (default: DEFAULT_ITERATIONS, or
+                    INCREMENTAL_ITERATIONS for a warm start)
+        save: Save the result in the collection (see FSRSScheduler.with_weights)
+        seed: Random seed, for repeatable fits
+
+    Raises:
+        ValueError: Too few (new) reviews to fit on
+    """
+    initial = saved_weights(storage) if incremental else None
+    fitted_through = storage.get_meta(FITTED_THROUGH_META_KEY) if initial else None
+    warm = fitted_through is not None
+    if warm:
+        result = fit(load_history(storage), initial, since=float(fitted_through),
+                     iterations=iterations or INCREMENTAL_ITERATIONS,
+                     learning_rate=INCREMENTAL_LEARNING_RATE, seed=seed)
+    else:
+        result = fit(load_history(storage), initial,
+                     iterations=iterations or DEFAULT_ITERATIONS, seed=seed)
+    result.incremental = warm
+
+    if save and (result.improved or warm):
+        if result.improved:
+            storage.set_meta(WEIGHTS_META_KEY, json.dumps(result.weights))
+        # Reviews the saved weights already fit as well as the new ones would
+        # need not be fitted again
+        storage.set_meta(FITTED_THROUGH_META_KEY, repr(result.fitted_through))
+    return result
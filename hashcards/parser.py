@@ -3,31 +3,158 @@ Card Parser - Parse Markdown files into card objects
 Follows Unix philosophy: do one thing well - parse text
 """
 
+import mmap
+import os
 import re
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
 from enum import Enum
 
 
+# Bump whenever parsing rules change; invalidates on-disk card caches
+PARSER_VERSION = 2
+
+
 class CardType(Enum):
     """Card types supported by hashcards"""
     QA = "qa"  # Question-Answer
     CLOZE = "cloze"  # Cloze deletion
 
 
-@dataclass
 class Card:
-    """Represents a single flashcard"""
-    card_type: CardType
-    content: Dict[str, str]
-    deck_name: str
-    line_number: int
-    raw_text: str
-    
+    """
+    Represents a single flashcard
+
+    A slotted record rather than a dataclass: no per-instance __dict__,
+    card fields stored directly instead of in a nested dict, deck names
+    interned across cards, and the content hash computed at most once.
+    """
+
+    __slots__ = ('card_type', 'deck_name', 'line_number', 'raw_text',
+                 'question', 'answer', 'text', 'deletions', '_hash')
+
+    def __init__(self, card_type: CardType, deck_name: str, line_number: int, raw_text: str,
+                 question: Optional[str] = None, answer: Optional[str] = None,
+                 text: Optional[str] = None, deletions: Sequence[str] = (),
+                 content: Optional[Dict] = None, card_hash: Optional[str] = None):
+        """
+        Args:
+            card_type: QA or CLOZE
+            deck_name: Deck the card belongs to
+            line_number: Line of the card's Q:/C: marker
+            raw_text: Card text as written (the hash input)
+            question, answer: Q&A fields
+            text, deletions: Cloze fields
+            content: Legacy dict form of the fields above
+            card_hash: Precomputed content hash, if already known
+        """
+        if content is not None:
+            question = content.get('question', question)
+            answer = content.get('answer', answer)
+            text = content.get('text', text)
+            deletions = content.get('deletions', deletions)
+        self.card_type = card_type
+        self.deck_name = sys.intern(deck_name)
+        self.line_number = line_number
+        self.raw_text = raw_text
+        self.question = question
+        self.answer = answer
+        self.text = text
+        self.deletions = tuple(deletions)
+        self._hash = card_hash
+
+    @property
+    def content(self) -> Dict:
+        """Card fields as a dict (what templates use as card.content.*)"""
+        if self.card_type is CardType.QA:
+            return {"question": self.question, "answer": self.answer}
+        return {"text": self.text, "deletions": list(self.deletions)}
+
     def get_hash(self) -> str:
-        """Content-addressable: hash is based on content"""
+        """
+        Content-addressable: hash is based on content
+
+        The hash depends on the collection's algorithm, so it is stamped
+        on the card by whoever knows it (the loader, via hash_all).
+
+        Raises:
+            ValueError: The card has not been hashed yet
+        """
+        if self._hash is None:
+            raise ValueError("Card has no hash yet: hash it with the collection's "
+                             "algorithm first (Card.hash_all)")
+        return self._hash
+
+    @staticmethod
+    def hash_all(cards: Sequence['Card'], algorithm: str) -> List[str]:
+        """
+        Hash many cards in one batch with the given algorithm
+
+        The hashes are cached on the cards, so later get_hash() calls
+        return them.
+        """
         from .hasher import CardHasher
-        return CardHasher.hash_card(self.raw_text)
+        hashes = CardHasher.hash_cards([card.raw_text for card in cards], algorithm)
+        for card, card_hash in zip(cards, hashes):
+            card._hash = card_hash
+        return hashes
+
+    def _fields(self) -> tuple:
+        return (self.card_type, self.deck_name, self.line_number, self.raw_text,
+                self.question, self.answer, self.text, self.deletions)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"Card(card_type={self.card_type}, deck_name={self.deck_name!r}, "
+                f"line_number={self.line_number}, content={self.content!r})")
+
+    def __getstate__(self) -> tuple:
+        return self._fields() + (self._hash,)
+
+    def __setstate__(self, state: tuple):
+        (self.card_type, deck_name, self.line_number, self.raw_text,
+         self.question, self.answer, self.text, self.deletions, self._hash) = state
+        self.deck_name = sys.intern(deck_name)
+
+
+def _text_is_blank(line: str) -> bool:
+    return not line.strip()
+
+
+def _bytes_is_blank(line: bytes) -> bool:
+    """Same answer as decoding and str.strip(), decoding only when in doubt"""
+    stripped = line.strip()
+    if not stripped:
+        return True
+    if 0x21 <= stripped[0] <= 0x7e:
+        return False
+    # Non-ASCII or control characters: str.strip() knows more whitespace
+    return not line.decode('utf-8').strip()
+
+
+def _iter_buffer_lines(buf) -> Iterator[bytes]:
+    """
+    Split bytes into lines the way text mode does
+
+    Universal newlines: \n, \r\n and a lone \r all end a line.
+    """
+    if isinstance(buf, mmap.mmap) and buf.find(b'\r') == -1:
+        # Common case: stream lines straight out of the mapping
+        buf.seek(0)
+        return iter(buf.readline, b'')
+    return iter(buf[:].splitlines())
+
+
+# (Q marker, A marker, C marker, newline, blank test) for str and bytes lines
+_TEXT_SYNTAX = ('Q:', 'A:', 'C:', '\n', _text_is_blank)
+_BYTES_SYNTAX = (b'Q:', b'A:', b'C:', b'\n', _bytes_is_blank)
 
 
 class CardParser:
@@ -39,10 +166,15 @@ class CardParser:
     A: 6
     
     C: The atomic number of [carbon] is [6].
+
+    Parsing is a single line-oriented pass, linear in input size:
+    - `Q:` opens a question that runs until the next `A:` line
+    - `A:` closes it; the answer is the rest of that line
+    - `C:` is a one-line cloze card (kept only if it has [deletions])
+    - `A:`/`C:` with nothing after the marker take the next non-blank line
+    - A `Q:`/`C:` line abandons any card still waiting for its answer
     """
     
-    QA_PATTERN = re.compile(r'^Q:\s*(.+?)$\s*^A:\s*(.+?)$', re.MULTILINE | re.DOTALL)
-    CLOZE_PATTERN = re.compile(r'^C:\s*(.+?)$', re.MULTILINE)
     CLOZE_DELETION = re.compile(r'\[([^\]]+)\]')
     
     @classmethod
@@ -57,12 +189,7 @@ class CardParser:
         Returns:
             List of Card objects
         """
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        if deck_name is None:
-            deck_name = cls._extract_deck_name(filepath)
-        return cls.parse_content(content, deck_name)
+        return list(cls.iter_cards(filepath, deck_name))
     
     @classmethod
     def parse_content(cls, content: str, deck_name: str = "default") -> List[Card]:
@@ -76,46 +203,162 @@ class CardParser:
         Returns:
             List of Card objects
         """
-        cards = []
-        
-        # Parse Q&A cards
-        for match in cls.QA_PATTERN.finditer(content):
-            question = match.group(1).strip()
-            answer = match.group(2).strip()
-            line_num = content[:match.start()].count('\n') + 1
-            
-            card = Card(
+        return list(cls._iter_lines(content.split('\n'), deck_name))
+
+    @classmethod
+    def iter_cards(cls, source: Union[str, os.PathLike, Iterable[str]],
+                   deck_name: Optional[str] = None) -> Iterator[Card]:
+        """
+        Lazily yield cards in document order
+
+        Only the lines of the card currently being read are held in
+        memory, so arbitrarily large decks stream in constant space.
+
+        Args:
+            source: Path to a .md file, or an open text stream / iterable of lines
+            deck_name: Override deck name (default: derived from filename, or "default")
+
+        Yields:
+            Card objects
+        """
+        if isinstance(source, (str, os.PathLike)):
+            if deck_name is None:
+                deck_name = cls._extract_deck_name(os.fspath(source))
+            with open(source, 'r', encoding='utf-8') as f:
+                yield from cls._iter_lines(f, deck_name)
+        else:
+            yield from cls._iter_lines(source, deck_name or "default")
+
+    @classmethod
+    def _iter_lines(cls, lines: Iterable[str], deck_name: str) -> Iterator[Card]:
+        """Build cards from text lines"""
+        for card_type, start_line, raw_lines, answer_at in cls._tokenize(lines, _TEXT_SYNTAX):
+            card = cls._make_card(card_type, raw_lines, answer_at, deck_name, start_line)
+            if card is not None:
+                yield card
+
+    @classmethod
+    def iter_buffer_cards(cls, buf, deck_name: str) -> Iterator[Card]:
+        """
+        Yield cards from raw UTF-8 bytes (bytes, bytearray or mmap)
+
+        Card boundaries are found on the bytes; only lines that end up
+        in a card are decoded. Produces exactly the cards (and hashes)
+        that parsing the decoded text would.
+        """
+        for card_type, start_line, raw_lines, answer_at in cls._tokenize(
+                _iter_buffer_lines(buf), _BYTES_SYNTAX):
+            joined = b'\n'.join(raw_lines)
+            if card_type is CardType.CLOZE and b'[' not in joined:
+                continue  # No deletions possible, skip decoding
+            text_lines = joined.decode('utf-8').split('\n')
+            card = cls._make_card(card_type, text_lines, answer_at, deck_name, start_line)
+            if card is not None:
+                yield card
+
+    @staticmethod
+    @contextmanager
+    def map_file(filepath: str):
+        """
+        Memory-map a deck file read-only
+
+        Yields an mmap (or b'' for empty files, which cannot be mapped).
+        """
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''
+                return
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield buf
+            finally:
+                buf.close()
+
+    @staticmethod
+    def _tokenize(lines: Iterable, syntax: tuple) -> Iterator[tuple]:
+        """
+        Split lines into cards with a small state machine
+
+        Works on str or bytes lines; `syntax` supplies the matching
+        markers and blank-line test.
+
+        Yields:
+            (card_type, line_number, raw_lines, answer_at) per complete card
+        """
+        q_marker, a_marker, c_marker, newline, is_blank = syntax
+        card_type = None    # Type of the card being read, if any
+        start_line = 0      # Line number of its Q:/C: marker
+        raw_lines = []      # Its lines so far
+        answer_at = 0       # Index of the A: line within raw_lines
+        awaiting = False    # Marker had no text: next non-blank line completes it
+
+        for line_number, line in enumerate(lines, 1):
+            if line[-1:] == newline:
+                line = line[:-1]
+            marker = line[:2]
+
+            if awaiting and marker != q_marker and marker != c_marker:
+                raw_lines.append(line)
+                if not is_blank(line):
+                    yield card_type, start_line, raw_lines, answer_at
+                    card_type = None
+                    awaiting = False
+                continue
+
+            if marker == q_marker:
+                card_type, start_line, raw_lines, awaiting = CardType.QA, line_number, [line], False
+            elif marker == c_marker:
+                card_type, start_line, raw_lines, awaiting = CardType.CLOZE, line_number, [line], False
+                if not is_blank(line[2:]):
+                    yield card_type, start_line, raw_lines, 0
+                    card_type = None
+                else:
+                    awaiting = True
+            elif card_type is CardType.QA:
+                raw_lines.append(line)
+                if marker == a_marker:
+                    answer_at = len(raw_lines) - 1
+                    if not is_blank(line[2:]):
+                        yield card_type, start_line, raw_lines, answer_at
+                        card_type = None
+                    else:
+                        awaiting = True
+
+    @classmethod
+    def _make_card(cls, card_type: CardType, raw_lines: List[str], answer_at: int,
+                   deck_name: str, line_number: int) -> Optional[Card]:
+        """Build a card from its raw lines, or None if it is incomplete"""
+        if card_type is CardType.QA:
+            # raw_lines = [Q: line, question body..., A: line, blank lines..., answer]
+            question = '\n'.join([raw_lines[0][2:]] + raw_lines[1:answer_at]).strip()
+            answer = '\n'.join([raw_lines[answer_at][2:]] + raw_lines[answer_at + 1:]).strip()
+            if not question:
+                return None
+            return Card(
                 card_type=CardType.QA,
-                content={"question": question, "answer": answer},
                 deck_name=deck_name,
-                line_number=line_num,
-                raw_text=match.group(0)
+                line_number=line_number,
+                raw_text='\n'.join(raw_lines),
+                question=question,
+                answer=answer
             )
-            cards.append(card)
-        
-        # Parse Cloze cards
-        for match in cls.CLOZE_PATTERN.finditer(content):
-            text = match.group(1).strip()
-            line_num = content[:match.start()].count('\n') + 1
-            
-            # Find all cloze deletions
-            deletions = cls.CLOZE_DELETION.findall(text)
-            if deletions:
-                card = Card(
-                    card_type=CardType.CLOZE,
-                    content={"text": text, "deletions": deletions},
-                    deck_name=deck_name,
-                    line_number=line_num,
-                    raw_text=match.group(0)
-                )
-                cards.append(card)
-        
-        return cards
+
+        text = '\n'.join([raw_lines[0][2:]] + raw_lines[1:]).strip()
+        deletions = cls.CLOZE_DELETION.findall(text)
+        if not deletions:
+            return None
+        return Card(
+            card_type=CardType.CLOZE,
+            deck_name=deck_name,
+            line_number=line_number,
+            raw_text='\n'.join(raw_lines),
+            text=text,
+            deletions=deletions
+        )
     
     @staticmethod
     def _extract_deck_name(filepath: str) -> str:
         """Extract deck name from file path"""
-        import os
         return os.path.splitext(os.path.basename(filepath))[0]
     
     @staticmethod
@@ -5,12 +5,22 @@ Implements the state-of-the-art scheduling algorithm
 Based on: https://github.com/open-spaced-repetition/fsrs4anki
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from dataclasses import dataclass
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 from enum import IntEnum
 import math
 
+# Collection setting holding the weights fitted to its reviews (see optimizer.py)
+WEIGHTS_META_KEY = 'fsrs_weights'
+
+# Cards due on each of `days` days from a date (e.g. Storage.get_due_counts)
+DueCounts = Callable[[date, int], List[int]]
+
+# Fuzz window of an interval: 1 day, plus a share of the interval in each
+# range (days from, days to, share), as in FSRS
+FUZZ_RANGES = ((2.5, 7.0, 0.15), (7.0, 20.0, 0.1), (20.0, math.inf, 0.05))
+
 
 class Rating(IntEnum):
     """User ratings for card review"""
@@ -75,10 +85,27 @@ class FSRSScheduler:
         'relearning_steps': [10],  # 10 min for forgotten cards
     }
     
-    def __init__(self, params: Optional[dict] = None):
-        """Initialize scheduler with parameters"""
+    def __init__(self, params: Optional[dict] = None, due_counts: Optional[DueCounts] = None):
+        """
+        Initialize scheduler with parameters
+
+        Args:
+            params: FSRS parameters (default: DEFAULT_PARAMS)
+            due_counts: Load balancing: each interval moves to the least
+                        loaded day of its fuzz window, by these counts
+                        (default: off, intervals are exact)
+        """
         self.params = params or self.DEFAULT_PARAMS.copy()
         self.w = self.params['w']
+        self.due_counts = due_counts
+    
+    @classmethod
+    def with_weights(cls, w: Optional[list],
+                     due_counts: Optional[DueCounts] = None) -> 'FSRSScheduler':
+        """Scheduler with the default parameters but weights `w` (None: the defaults)"""
+        if w is None:
+            return cls(due_counts=due_counts)
+        return cls({**cls.DEFAULT_PARAMS, 'w': list(w)}, due_counts)
     
     def init_card(self, card_hash: str) -> CardSchedule:
         """Initialize a new card"""
@@ -95,18 +122,20 @@ class FSRSScheduler:
             due=datetime.now()
         )
     
-    def review_card(self, schedule: CardSchedule, rating: Rating) -> tuple[CardSchedule, ReviewLog]:
+    def review_card(self, schedule: CardSchedule, rating: Rating,
+                    now: Optional[datetime] = None) -> tuple[CardSchedule, ReviewLog]:
         """
         Process a card review and update schedule
         
         Args:
             schedule: Current card schedule
             rating: User's rating
+            now: Review time (default: the current time)
             
         Returns:
             (updated_schedule, review_log)
         """
-        now = datetime.now()
+        now = now or datetime.now()
         elapsed_days = 0
         
         if schedule.last_review:
@@ -149,7 +178,7 @@ class FSRSScheduler:
             # Calculate initial stability
             schedule.stability = self._init_stability(rating)
             schedule.state = State.REVIEW
-            schedule.scheduled_days = self._next_interval(schedule.stability)
+            schedule.scheduled_days = self._next_interval(schedule.stability, now)
             schedule.due = now + timedelta(days=schedule.scheduled_days)
         
         return schedule
@@ -170,7 +199,7 @@ class FSRSScheduler:
             # Graduate to review
             schedule.stability = self._init_stability(rating)
             schedule.state = State.REVIEW
-            schedule.scheduled_days = self._next_interval(schedule.stability)
+            schedule.scheduled_days = self._next_interval(schedule.stability, now)
             schedule.due = now + timedelta(days=schedule.scheduled_days)
         
         return schedule
@@ -197,11 +226,18 @@ class FSRSScheduler:
             # Card remembered - update parameters
             schedule.stability = self._next_stability_after_success(schedule, rating, retrievability)
             schedule.difficulty = self._next_difficulty(schedule.difficulty, rating)
-            schedule.scheduled_days = self._next_interval(schedule.stability)
+            schedule.scheduled_days = self._next_interval(schedule.stability, now)
             schedule.due = now + timedelta(days=schedule.scheduled_days)
         
         return schedule
     
+    def get_retrievability(self, schedule: CardSchedule, now: Optional[datetime] = None) -> float:
+        """Probability of recalling a card at `now` (default: the current time); 1 if never learned"""
+        if schedule.last_review is None or schedule.stability <= 0:
+            return 1.0
+        elapsed_days = ((now or datetime.now()) - schedule.last_review).days
+        return self._calculate_retrievability(schedule.stability, max(elapsed_days, 0))
+    
     def _init_difficulty(self, rating: Rating) -> float:
         """Initialize difficulty based on first rating"""
         return self.w[4] - (rating - 3) * self.w[5]
@@ -247,10 +283,33 @@ class FSRSScheduler:
         )
         return max(0.1, new_stability)  # Minimum stability
     
-    def _next_interval(self, stability: float) -> int:
-        """Calculate next review interval in days"""
+    def _next_interval(self, stability: float, now: Optional[datetime] = None) -> int:
+        """Calculate next review interval in days (load balanced from `now` if enabled)"""
         interval = stability * (
             math.log(self.params['request_retention']) / math.log(0.9)
         )
         interval = min(interval, self.params['maximum_interval'])
-        return max(1, round(interval))
\ No newline at end of file
+        if self.due_counts is None or now is None:
+            return max(1, round(interval))
+        return self._balanced_interval(interval, now)
+    
+    def _fuzz_range(self, interval: float) -> Tuple[int, int]:
+        """Shortest and longest interval an ideal `interval` may be moved to"""
+        if interval < 2.5:
+            return (max(1, round(interval)),) * 2
+        delta = 1.0
+        for start, end, share in FUZZ_RANGES:
+            delta += share * max(min(interval, end) - start, 0.0)
+        low = max(2, round(interval - delta))
+        high = min(round(interval + delta), self.params['maximum_interval'])
+        return min(low, high), high
+    
+    def _balanced_interval(self, interval: float, now: datetime) -> int:
+        """Interval of the fuzz window landing on the day with the fewest cards due"""
+        low, high = self._fuzz_range(interval)
+        if low == high:
+            return low
+        counts = self.due_counts(now.date() + timedelta(days=low), high - low + 1)
+        # Ties go to the day nearest the ideal interval
+        return min(range(low, high + 1),
+                   key=lambda days: (counts[days - low], abs(days - interval), days))
\ No newline at end of file
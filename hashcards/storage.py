@@ -5,120 +5,477 @@ Cards themselves live in Markdown files; only scheduling data is in DB
 Design principle: Separation of concerns
 - Markdown files = source of truth for card content
 - SQLite = ephemeral scheduling state
+
+`Storage` is the interface the app and CLI program against; CardStorage
+is the SQLite implementation and memory_storage.MemoryStorage keeps
+everything in process memory. open_storage() picks one from a URL.
 """
 
+import os
 import sqlite3
-from datetime import datetime
-from typing import List, Optional
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 from pathlib import Path
 
+from .hasher import DEFAULT_ALGORITHM
+from .migrations import migrate, rebuild_rollups
 from .scheduler import CardSchedule, ReviewLog, State, Rating
 
 
-class CardStorage:
+def to_epoch(moment: datetime) -> int:
+    """Naive local datetime to Unix seconds (how timestamps are stored)"""
+    return int(moment.timestamp())
+
+
+def start_of_day(day: date) -> int:
+    """Unix seconds at local midnight starting `day`"""
+    return to_epoch(datetime.combine(day, datetime.min.time()))
+
+
+# Collection setting: comma-separated algorithms that archived cards left
+# out of a rehash are still hashed with (their text was in no deck)
+ARCHIVED_ALGORITHMS_META_KEY = 'archived_hash_algorithms'
+
+
+# Collection setting: the local time zone the rollups group days in.
+# Triggers bucket rows with DATE(..., 'localtime') as they fire, so a
+# rollup written in another zone disagrees with local-day queries.
+ROLLUP_TIMEZONE_META_KEY = 'rollup_timezone'
+
+
+def local_timezone() -> str:
+    """The process's local time zone as its names and UTC offsets"""
+    return f"{'/'.join(time.tzname)} {time.timezone} {time.altzone}"
+
+
+def archived_algorithms(listed: Optional[str], previous: str, algorithm: str,
+                        unmatched: bool) -> str:
+    """
+    Algorithms of the archived cards after a rehash from `previous` to `algorithm`
+
+    Args:
+        listed: The setting before the rehash
+        unmatched: Some archived cards were not in the mapping
+
+    Returns:
+        New value of the setting ('' = every archived card uses `algorithm`)
+    """
+    if not unmatched:
+        return ''
+    algorithms = [name for name in (listed or '').split(',') if name]
+    if previous not in algorithms:
+        algorithms.append(previous)
+    return ','.join(name for name in algorithms if name != algorithm)
+
+
+class Storage(ABC):
+    """
+    Scheduling state of a card collection
+
+    Timestamps round-trip at whole-second precision in every backend.
+    Review statistics attribute a review to its card's deck when the
+    review is recorded.
+    """
+
+    @abstractmethod
+    def save_schedule(self, schedule: CardSchedule, deck_name: str):
+        """Save or update card schedule"""
+
+    @abstractmethod
+    def bootstrap_schedules(self, cards: Iterable[Tuple[str, str]],
+                            init_card: Callable[[str], CardSchedule]) -> int:
+        """
+        Create schedules for every card that does not have one yet,
+        restoring archived ones (see CardStorage.bootstrap_schedules)
+        """
+
+    @abstractmethod
+    def get_schedule(self, card_hash: str) -> Optional[CardSchedule]:
+        """Retrieve card schedule by hash"""
+
+    @abstractmethod
+    def get_schedules(self, card_hashes: Iterable[str]) -> Dict[str, CardSchedule]:
+        """Retrieve many schedules at once: {card_hash: schedule} for those that exist"""
+
+    @abstractmethod
+    def iter_schedules(self) -> Iterator[CardSchedule]:
+        """Stream every schedule, in no particular order"""
+
+    @abstractmethod
+    def log_review(self, log: ReviewLog):
+        """Save review log"""
+
+    @abstractmethod
+    def record_review(self, schedule: CardSchedule, deck_name: str, log: ReviewLog):
+        """Save a review's new schedule and its log atomically"""
+
+    @abstractmethod
+    def get_due_cards(self, deck_name: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+        """Hashes of due cards, earliest due first (ties by hash)"""
+
+    @abstractmethod
+    def get_stats(self, deck_name: Optional[str] = None) -> dict:
+        """Card counts by state, due cards and reviews today"""
+
+    @abstractmethod
+    def get_review_history(self, days: int = 365, include_archive: bool = False) -> dict:
+        """{date_str: count} for each of the last `days` days"""
+
+    @abstractmethod
+    def iter_reviews(self, include_archive: bool = False) -> Iterator[ReviewLog]:
+        """Stream every review log, oldest first"""
+
+    @abstractmethod
+    def get_deck_stats(self) -> list:
+        """Per-deck aggregates, sorted by deck name"""
+
+    @abstractmethod
+    def get_rating_counts(self) -> Dict[Tuple[int, int], int]:
+        """{(state, rating): count} over all live reviews"""
+
+    @abstractmethod
+    def get_due_counts(self, start: date, days: int) -> List[int]:
+        """Cards (other than new ones) due on each of `days` local days from `start`"""
+
+    @abstractmethod
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Read a collection setting"""
+
+    @abstractmethod
+    def set_meta(self, key: str, value: str):
+        """Write a collection setting"""
+
+    @abstractmethod
+    def rehash_cards(self, mapping: Iterable[Tuple[str, str]], algorithm: str) -> int:
+        """Move schedules and review history to new card hashes"""
+
+    @abstractmethod
+    def reconcile(self, card_hashes: Iterable[str], archive: bool = True,
+                  dry_run: bool = False) -> dict:
+        """Archive or drop schedules whose card is no longer in any deck"""
+
+    @abstractmethod
+    def delete_card(self, card_hash: str):
+        """Delete card and its review history"""
+
+    @abstractmethod
+    def close(self):
+        """Release the backend's resources"""
+
+
+class _PendingReview:
+    """A review waiting for a group commit"""
+
+    __slots__ = ('schedule_row', 'review_row', 'done', 'error')
+
+    def __init__(self, schedule_row: tuple, review_row: tuple):
+        self.schedule_row = schedule_row
+        self.review_row = review_row
+        self.done = False
+        self.error: Optional[Exception] = None
+
+
+class CardStorage(Storage):
     """
     Manages SQLite database for card scheduling state
     
     Database schema:
     - schedules: Current scheduling state for each card
     - reviews: Historical review logs
+    - meta: Collection-wide settings (e.g. the card hash algorithm)
+    - deck_rollup, review_rollup: Stats aggregates maintained by triggers
+    - due_rollup: Cards due per day, also maintained by triggers
+    - archived_schedules, archived_reviews: Cards no longer in any deck
+
+    Reviews past a horizon can be moved out to a second database file
+    (see archive_reviews()); reads include them only when asked.
+
+    Timestamps are stored as integer Unix seconds.
+
+    Safe to share between threads. Writes go through one connection
+    (`conn`), serialized by a lock; reads borrow a connection from a
+    pool, so with WAL journaling they proceed while a write commits.
+    An in-memory database cannot be shared between connections, so
+    there every read and write uses `conn` under the lock.
+    """
+
+    # Seconds a connection waits on a locked database before failing
+    BUSY_TIMEOUT = 5.0
+
+    # Hashes per `IN (...)` query; well below SQLite's bound-parameter limit
+    QUERY_CHUNK = 500
+
+    # Rows fetched per round trip when streaming a table out
+    EXPORT_CHUNK = 1000
+
+    # Pages copied per backup step (1 MiB at the default page size), and
+    # the pause between steps that leaves the disk to live traffic
+    BACKUP_PAGES = 256
+    BACKUP_SLEEP = 0.005
+
+    # Columns of the tables that iter_rows() and import_rows() move, in table order
+    TABLE_COLUMNS = {
+        'schedules': ('card_hash', 'deck_name', 'state', 'stability', 'difficulty',
+                      'elapsed_days', 'scheduled_days', 'reps', 'lapses',
+                      'last_review', 'due', 'created_at', 'updated_at'),
+        'reviews': ('id', 'card_hash', 'rating', 'state', 'review_time',
+                    'scheduled_days', 'elapsed_days'),
+        'meta': ('key', 'value'),
+    }
+
+    # Archive rows not also in the live table (left there by an interrupted archive_reviews)
+    NOT_LIVE = "NOT EXISTS (SELECT 1 FROM main.reviews r WHERE r.id = a.id)"
+
+    # Archived cards among those being bootstrapped
+    ARCHIVED_HASHES = "SELECT card_hash FROM archived_schedules JOIN bootstrap_cards USING (card_hash)"
+
+    UPSERT_SCHEDULE = """
+        INSERT INTO schedules (
+            card_hash, deck_name, state, stability, difficulty,
+            elapsed_days, scheduled_days, reps, lapses,
+            last_review, due, created_at, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(card_hash) DO UPDATE SET
+            state = excluded.state,
+            stability = excluded.stability,
+            difficulty = excluded.difficulty,
+            elapsed_days = excluded.elapsed_days,
+            scheduled_days = excluded.scheduled_days,
+            reps = excluded.reps,
+            lapses = excluded.lapses,
+            last_review = excluded.last_review,
+            due = excluded.due,
+            updated_at = excluded.updated_at
+    """
+
+    INSERT_REVIEW = """
+        INSERT INTO reviews (
+            card_hash, rating, state, review_time,
+            scheduled_days, elapsed_days
+        ) VALUES (?, ?, ?, ?, ?, ?)
     """
     
-    def __init__(self, db_path: str = ".hashcards.db"):
+    def __init__(self, db_path: str = ".hashcards.db", group_commit: Optional[float] = None,
+                 archive_path: Optional[str] = None):
         """
         Initialize storage
         
         Args:
             db_path: Path to SQLite database file
+            group_commit: Batch concurrent record_review() calls into shared
+                          commits. None = every review commits on its own;
+                          0 = batch reviews that arrive while a commit is in
+                          flight; > 0 = also wait this many seconds for more.
+            archive_path: Review archive database (default: db_path with an
+                          .archive.db suffix; in-memory databases have none)
         """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self.group_commit = group_commit
+        self._group_cond = threading.Condition()
+        self._group_pending: List[_PendingReview] = []
+        self._group_committing = False
+        self._in_memory = db_path in (':memory:', '') or db_path.startswith('file::memory:')
+        self._write_lock = threading.RLock()
+        self._pool_lock = threading.Lock()
+        self._idle_readers: List[sqlite3.Connection] = []
+        self._readers: List[sqlite3.Connection] = []
+        if self._in_memory:
+            self.archive_path = None
+        else:
+            self.archive_path = archive_path or str(Path(db_path).with_suffix('.archive.db'))
+        self.conn = self._connect()
+        if not self._in_memory:
+            # Only takes effect on a new file; compact() converts older ones
+            self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            # Readers never block the writer and vice versa
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            # Durable at checkpoints; a crash can lose only the last commits, never corrupt
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+        # Rows removed by INSERT OR REPLACE fire delete triggers (keeps rollups right)
+        self.conn.execute("PRAGMA recursive_triggers = ON")
         self._init_db()
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def _writing(self) -> Iterator[sqlite3.Cursor]:
+        """Run one write transaction on the writer connection"""
+        with self._write_lock:
+            try:
+                yield self.conn.cursor()
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+
+    @contextmanager
+    def _reading(self) -> Iterator[sqlite3.Cursor]:
+        """Borrow a read connection from the pool"""
+        if self._in_memory:
+            with self._write_lock:
+                yield self.conn.cursor()
+            return
+
+        with self._pool_lock:
+            conn = self._idle_readers.pop() if self._idle_readers else None
+        if conn is None:
+            conn = self._connect(read_only=True)
+            with self._pool_lock:
+                self._readers.append(conn)
+        try:
+            yield conn.cursor()
+        finally:
+            with self._pool_lock:
+                self._idle_readers.append(conn)
     
+    def _attach_archive(self, conn: sqlite3.Connection, create: bool = False) -> bool:
+        """
+        Attach the review archive to a connection as `history`
+
+        Returns:
+            True when history.reviews can be queried
+        """
+        if self.archive_path is None:
+            return False
+        attached = any(row[1] == 'history' for row in conn.execute("PRAGMA database_list"))
+        if not attached:
+            if not create and not os.path.exists(self.archive_path):
+                return False
+            conn.execute("ATTACH DATABASE ? AS history", (self.archive_path,))
+        if create:
+            # Same columns as `reviews`; only the time index, for range reads
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS history.reviews (
+                    id INTEGER PRIMARY KEY,
+                    card_hash TEXT NOT NULL,
+                    rating INTEGER NOT NULL,
+                    state INTEGER NOT NULL,
+                    review_time INTEGER NOT NULL,
+                    scheduled_days INTEGER NOT NULL,
+                    elapsed_days INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS history.idx_reviews_time ON reviews(review_time)")
+            return True
+        # The writer may have created the file but not yet its table
+        return conn.execute(
+            "SELECT 1 FROM history.sqlite_master WHERE type = 'table' AND name = 'reviews'"
+        ).fetchone() is not None
+
     def _init_db(self):
-        """Create database tables if they don't exist"""
-        cursor = self.conn.cursor()
-        
-        # Card schedules table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS schedules (
-                card_hash TEXT PRIMARY KEY,
-                deck_name TEXT NOT NULL,
-                state INTEGER NOT NULL,
-                stability REAL NOT NULL,
-                difficulty REAL NOT NULL,
-                elapsed_days INTEGER NOT NULL,
-                scheduled_days INTEGER NOT NULL,
-                reps INTEGER NOT NULL,
-                lapses INTEGER NOT NULL,
-                last_review TEXT,
-                due TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-        """)
-        
-        # Review logs table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS reviews (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                card_hash TEXT NOT NULL,
-                rating INTEGER NOT NULL,
-                state INTEGER NOT NULL,
-                review_time TEXT NOT NULL,
-                scheduled_days INTEGER NOT NULL,
-                elapsed_days INTEGER NOT NULL,
-                FOREIGN KEY (card_hash) REFERENCES schedules(card_hash)
-            )
-        """)
-        
-        # Indexes for performance
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_schedules_due 
-            ON schedules(due)
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_schedules_deck 
-            ON schedules(deck_name)
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_reviews_card 
-            ON reviews(card_hash)
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_reviews_time 
-            ON reviews(review_time)
-        """)
-        
-        self.conn.commit()
+        """Create or upgrade the schema (see migrations.py)"""
+        with self._write_lock:
+            migrate(self.conn)
+            if self.get_meta(ROLLUP_TIMEZONE_META_KEY) != local_timezone():
+                self.rebuild_rollups()
     
     def save_schedule(self, schedule: CardSchedule, deck_name: str):
         """Save or update card schedule"""
-        cursor = self.conn.cursor()
-        now = datetime.now().isoformat()
+        now = to_epoch(datetime.now())
         
+        with self._writing() as cursor:
+            cursor.execute(self.UPSERT_SCHEDULE, self._schedule_row(schedule, deck_name, now))
+
+    def bootstrap_schedules(self, cards: Iterable[Tuple[str, str]],
+                            init_card: Callable[[str], CardSchedule]) -> int:
+        """
+        Create schedules for every card that does not have one yet
+
+        The incoming hashes are diffed against `schedules` in one
+        set-based query and the missing rows are inserted in a single
+        transaction, so a cold load costs one commit instead of one
+        per card.
+
+        Args:
+            cards: (card_hash, deck_name) pairs; the first deck seen for a hash wins
+            init_card: Factory for a new card's schedule (e.g. FSRSScheduler.init_card)
+
+        Returns:
+            Number of schedules created
+        """
+        now = to_epoch(datetime.now())
+
+        with self._writing() as cursor:
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS bootstrap_cards (
+                    card_hash TEXT PRIMARY KEY,
+                    deck_name TEXT NOT NULL
+                )
+            """)
+            cursor.executemany(
+                "INSERT OR IGNORE INTO bootstrap_cards (card_hash, deck_name) VALUES (?, ?)",
+                cards
+            )
+            restored = self._restore_archived(cursor)
+            cursor.execute("""
+                SELECT b.card_hash, b.deck_name
+                FROM bootstrap_cards b
+                LEFT JOIN schedules s ON s.card_hash = b.card_hash
+                WHERE s.card_hash IS NULL
+            """)
+            missing = cursor.fetchall()
+            cursor.executemany("""
+                INSERT INTO schedules (
+                    card_hash, deck_name, state, stability, difficulty,
+                    elapsed_days, scheduled_days, reps, lapses,
+                    last_review, due, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                self._schedule_row(init_card(row['card_hash']), row['deck_name'], now)
+                for row in missing
+            ))
+            cursor.execute("DELETE FROM bootstrap_cards")
+
+        return restored + len(missing)
+
+    def _restore_archived(self, cursor: sqlite3.Cursor) -> int:
+        """
+        Bring archived schedules and reviews back for cards in `bootstrap_cards`
+
+        A card whose text returns (an undone edit, a restored file) picks
+        up where it left off, in the deck it is now loaded from.
+        """
         cursor.execute("""
             INSERT INTO schedules (
                 card_hash, deck_name, state, stability, difficulty,
                 elapsed_days, scheduled_days, reps, lapses,
                 last_review, due, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(card_hash) DO UPDATE SET
-                state = excluded.state,
-                stability = excluded.stability,
-                difficulty = excluded.difficulty,
-                elapsed_days = excluded.elapsed_days,
-                scheduled_days = excluded.scheduled_days,
-                reps = excluded.reps,
-                lapses = excluded.lapses,
-                last_review = excluded.last_review,
-                due = excluded.due,
-                updated_at = excluded.updated_at
-        """, (
+            )
+            SELECT a.card_hash, b.deck_name, a.state, a.stability, a.difficulty,
+                   a.elapsed_days, a.scheduled_days, a.reps, a.lapses,
+                   a.last_review, a.due, a.created_at, a.updated_at
+            FROM archived_schedules a
+            JOIN bootstrap_cards b USING (card_hash)
+            WHERE a.card_hash NOT IN (SELECT card_hash FROM schedules)
+        """)
+        restored = cursor.rowcount
+        if not restored:
+            return 0
+        # After their schedules, so the rollup trigger finds each review's deck
+        cursor.execute(f"""
+            INSERT INTO reviews (id, card_hash, rating, state, review_time, scheduled_days, elapsed_days)
+            SELECT id, card_hash, rating, state, review_time, scheduled_days, elapsed_days
+            FROM archived_reviews
+            WHERE card_hash IN ({self.ARCHIVED_HASHES})
+            ORDER BY id
+        """)
+        cursor.execute(f"DELETE FROM archived_reviews WHERE card_hash IN ({self.ARCHIVED_HASHES})")
+        cursor.execute(f"DELETE FROM archived_schedules WHERE card_hash IN ({self.ARCHIVED_HASHES})")
+        return restored
+
+    @staticmethod
+    def _schedule_row(schedule: CardSchedule, deck_name: str, now: int) -> tuple:
+        """Flatten a schedule into `schedules` column order"""
+        return (
             schedule.card_hash,
             deck_name,
             schedule.state,
@@ -128,25 +485,86 @@ class CardStorage:
             schedule.scheduled_days,
             schedule.reps,
             schedule.lapses,
-            schedule.last_review.isoformat() if schedule.last_review else None,
-            schedule.due.isoformat(),
+            to_epoch(schedule.last_review) if schedule.last_review else None,
+            to_epoch(schedule.due),
             now,
             now
-        ))
-        
-        self.conn.commit()
+        )
     
     def get_schedule(self, card_hash: str) -> Optional[CardSchedule]:
         """Retrieve card schedule by hash"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM schedules WHERE card_hash = ?
-        """, (card_hash,))
-        
-        row = cursor.fetchone()
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT * FROM schedules WHERE card_hash = ?
+            """, (card_hash,))
+            row = cursor.fetchone()
+
         if not row:
             return None
-        
+        return self._row_to_schedule(row)
+
+    def get_schedules(self, card_hashes: Iterable[str]) -> Dict[str, CardSchedule]:
+        """
+        Retrieve many schedules at once
+
+        Hashes are looked up in chunks of QUERY_CHUNK per `IN (...)`
+        query (SQLite caps the number of bound parameters).
+
+        Returns:
+            {card_hash: schedule} for the hashes that have one
+        """
+        card_hashes = list(dict.fromkeys(card_hashes))
+        schedules = {}
+        with self._reading() as cursor:
+            for start in range(0, len(card_hashes), self.QUERY_CHUNK):
+                chunk = card_hashes[start:start + self.QUERY_CHUNK]
+                cursor.execute(f"""
+                    SELECT * FROM schedules
+                    WHERE card_hash IN ({', '.join('?' * len(chunk))})
+                """, chunk)
+                for row in cursor:
+                    schedules[row['card_hash']] = self._row_to_schedule(row)
+        return schedules
+
+    def iter_schedules(self) -> Iterator[CardSchedule]:
+        """
+        Stream every schedule, in no particular order
+
+        One scan of the table, read EXPORT_CHUNK rows at a time: much
+        cheaper than get_schedules() when most cards are wanted.
+        """
+        states = tuple(State)
+        with self._reading() as cursor:
+            cursor.row_factory = None
+            cursor.execute("""
+                SELECT card_hash, state, stability, difficulty, elapsed_days,
+                       scheduled_days, reps, lapses, last_review, due
+                FROM schedules
+            """)
+            while True:
+                rows = cursor.fetchmany(self.EXPORT_CHUNK)
+                if not rows:
+                    break
+                for (card_hash, state, stability, difficulty, elapsed_days,
+                     scheduled_days, reps, lapses, last_review, due) in rows:
+                    yield CardSchedule(
+                        card_hash=card_hash,
+                        # Indexing beats State(state) by a wide margin over a whole table
+                        state=states[state],
+                        stability=stability,
+                        difficulty=difficulty,
+                        elapsed_days=elapsed_days,
+                        scheduled_days=scheduled_days,
+                        reps=reps,
+                        lapses=lapses,
+                        last_review=datetime.fromtimestamp(last_review) if last_review is not None else None,
+                        due=datetime.fromtimestamp(due)
+                    )
+
+    @staticmethod
+    def _row_to_schedule(row: Mapping) -> CardSchedule:
+        """Build a schedule from a `schedules` row (anything indexable by column name)"""
+        last_review = row['last_review']
         return CardSchedule(
             card_hash=row['card_hash'],
             state=State(row['state']),
@@ -156,28 +574,78 @@ class CardStorage:
             scheduled_days=row['scheduled_days'],
             reps=row['reps'],
             lapses=row['lapses'],
-            last_review=datetime.fromisoformat(row['last_review']) if row['last_review'] else None,
-            due=datetime.fromisoformat(row['due'])
+            last_review=datetime.fromtimestamp(last_review) if last_review is not None else None,
+            due=datetime.fromtimestamp(row['due'])
         )
     
     def log_review(self, log: ReviewLog):
         """Save review log"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO reviews (
-                card_hash, rating, state, review_time,
-                scheduled_days, elapsed_days
-            ) VALUES (?, ?, ?, ?, ?, ?)
-        """, (
+        with self._writing() as cursor:
+            cursor.execute(self.INSERT_REVIEW, self._review_row(log))
+
+    def record_review(self, schedule: CardSchedule, deck_name: str, log: ReviewLog):
+        """
+        Save a review's new schedule and its log in one transaction
+
+        Either both rows are written or neither is. In group-commit
+        mode the call blocks until a commit containing the review has
+        completed, so returning still means the review is stored.
+        """
+        pending = _PendingReview(
+            self._schedule_row(schedule, deck_name, to_epoch(datetime.now())),
+            self._review_row(log)
+        )
+        if self.group_commit is None:
+            self._commit_reviews([pending])
+            return
+
+        with self._group_cond:
+            self._group_pending.append(pending)
+            while not pending.done and self._group_committing:
+                self._group_cond.wait()
+            if pending.done:
+                # Committed (or failed) as part of another thread's batch
+                if pending.error is not None:
+                    raise pending.error
+                return
+            self._group_committing = True
+
+        # This thread commits for everyone queued behind it
+        if self.group_commit > 0:
+            time.sleep(self.group_commit)
+        with self._group_cond:
+            batch, self._group_pending = self._group_pending, []
+        error = None
+        try:
+            self._commit_reviews(batch)
+        except Exception as exc:
+            error = exc
+        with self._group_cond:
+            for item in batch:
+                item.done = True
+                item.error = error
+            self._group_committing = False
+            self._group_cond.notify_all()
+        if error is not None:
+            raise error
+
+    def _commit_reviews(self, batch: List['_PendingReview']):
+        """Write a batch of reviews in a single transaction, in arrival order"""
+        with self._writing() as cursor:
+            cursor.executemany(self.UPSERT_SCHEDULE, [item.schedule_row for item in batch])
+            cursor.executemany(self.INSERT_REVIEW, [item.review_row for item in batch])
+
+    @staticmethod
+    def _review_row(log: ReviewLog) -> tuple:
+        """Flatten a review log into `reviews` column order"""
+        return (
             log.card_hash,
             log.rating,
             log.state,
-            log.review_time.isoformat(),
+            to_epoch(log.review_time),
             log.scheduled_days,
             log.elapsed_days
-        ))
-        
-        self.conn.commit()
+        )
     
     def get_due_cards(self, deck_name: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
         """
@@ -190,8 +658,7 @@ class CardStorage:
         Returns:
             List of card hashes
         """
-        cursor = self.conn.cursor()
-        now = datetime.now().isoformat()
+        now = to_epoch(datetime.now())
         
         query = """
             SELECT card_hash FROM schedules 
@@ -208,82 +675,263 @@ class CardStorage:
         if limit:
             query += f" LIMIT {limit}"
         
-        cursor.execute(query, params)
-        return [row['card_hash'] for row in cursor.fetchall()]
+        with self._reading() as cursor:
+            cursor.execute(query, params)
+            return [row['card_hash'] for row in cursor.fetchall()]
     
     def get_stats(self, deck_name: Optional[str] = None) -> dict:
-        """Get learning statistics"""
-        cursor = self.conn.cursor()
-        
+        """
+        Get learning statistics
+
+        Counts come from the rollup tables (one row per deck, a few per
+        day), so the cost does not grow with the number of cards or reviews.
+        """
         where_clause = "WHERE deck_name = ?" if deck_name else ""
         params = [deck_name] if deck_name else []
         
-        # Total cards
-        cursor.execute(f"""
-            SELECT COUNT(*) as total FROM schedules {where_clause}
-        """, params)
-        total = cursor.fetchone()['total']
+        with self._reading() as cursor:
+            # Cards, total and by state
+            cursor.execute(f"""
+                SELECT COALESCE(SUM(total), 0) as total,
+                       COALESCE(SUM(new), 0) as new,
+                       COALESCE(SUM(learning), 0) as learning,
+                       COALESCE(SUM(review), 0) as review,
+                       COALESCE(SUM(relearning), 0) as relearning
+                FROM deck_rollup {where_clause}
+            """, params)
+            counts = cursor.fetchone()
         
-        # Due cards
-        now = datetime.now().isoformat()
-        cursor.execute(f"""
-            SELECT COUNT(*) as due FROM schedules 
-            {where_clause}
-            {"AND" if where_clause else "WHERE"} due <= ?
-        """, params + [now])
-        due = cursor.fetchone()['due']
-        
-        # Cards by state
-        cursor.execute(f"""
-            SELECT state, COUNT(*) as count 
-            FROM schedules {where_clause}
-            GROUP BY state
-        """, params)
-        by_state = {State(row['state']).name: row['count'] for row in cursor.fetchall()}
+            # Due cards: an index-only range count
+            now = to_epoch(datetime.now())
+            cursor.execute(f"""
+                SELECT COUNT(*) as due FROM schedules 
+                {where_clause}
+                {"AND" if where_clause else "WHERE"} due <= ?
+            """, params + [now])
+            due = cursor.fetchone()['due']
         
-        # Reviews today
-        today = datetime.now().date().isoformat()
-        cursor.execute("""
-            SELECT COUNT(*) as reviews_today 
-            FROM reviews 
-            WHERE DATE(review_time) = ?
-        """, (today,))
-        reviews_today = cursor.fetchone()['reviews_today']
+            # Reviews today
+            cursor.execute("""
+                SELECT COALESCE(SUM(count), 0) as reviews_today
+                FROM review_rollup
+                WHERE day = ?
+            """, (date.today().isoformat(),))
+            reviews_today = cursor.fetchone()['reviews_today']
+
+        by_state = {}
+        for state, column in zip(State, ('new', 'learning', 'review', 'relearning')):
+            if counts[column]:
+                by_state[state.name] = counts[column]
         
         return {
-            'total_cards': total,
+            'total_cards': counts['total'],
             'due_cards': due,
             'by_state': by_state,
             'reviews_today': reviews_today
         }
 
-    def get_review_history(self, days: int = 365) -> dict:
+    def get_review_history(self, days: int = 365, include_archive: bool = False) -> dict:
         """
         Return daily review counts for the last N days.
 
+        Args:
+            days: Number of days, ending today
+            include_archive: Also count reviews moved to the archive
+
         Returns:
             {date_str: count} for every day in the range (zeros included)
         """
-        from datetime import date, timedelta
+        today = date.today()
+        first_day = today - timedelta(days=days - 1)
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT day, SUM(count) as cnt
+                FROM review_rollup
+                WHERE day >= ?
+                GROUP BY day
+            """, (first_day.isoformat(),))
 
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT DATE(review_time) as day, COUNT(*) as cnt
-            FROM reviews
-            WHERE review_time >= DATE('now', ? || ' days')
-            GROUP BY day
-        """, (f'-{days - 1}',))
+            counts = {row['day']: row['cnt'] for row in cursor.fetchall()}
 
-        counts = {row['day']: row['cnt'] for row in cursor.fetchall()}
+            if include_archive and self._attach_archive(cursor.connection):
+                cursor.execute(f"""
+                    SELECT DATE(review_time, 'unixepoch', 'localtime') AS day, COUNT(*) AS cnt
+                    FROM history.reviews a
+                    WHERE review_time >= ? AND {self.NOT_LIVE}
+                    GROUP BY day
+                """, (start_of_day(first_day),))
+                for row in cursor.fetchall():
+                    counts[row['day']] = counts.get(row['day'], 0) + row['cnt']
 
         # Fill in zeros for days with no reviews
         result = {}
-        today = date.today()
         for i in range(days - 1, -1, -1):
             d = (today - timedelta(days=i)).isoformat()
             result[d] = counts.get(d, 0)
         return result
 
+    def iter_reviews(self, include_archive: bool = False) -> Iterator[ReviewLog]:
+        """
+        Stream every review log, oldest first
+
+        Args:
+            include_archive: Also read reviews moved to the archive
+        """
+        columns = "id, card_hash, rating, state, review_time, scheduled_days, elapsed_days"
+        with self._reading() as cursor:
+            query = f"SELECT {columns} FROM main.reviews"
+            if include_archive and self._attach_archive(cursor.connection):
+                query += f" UNION ALL SELECT {columns} FROM history.reviews a WHERE {self.NOT_LIVE}"
+            cursor.execute(query + " ORDER BY review_time, id")
+            for row in cursor:
+                yield ReviewLog(
+                    card_hash=row['card_hash'],
+                    rating=Rating(row['rating']),
+                    state=State(row['state']),
+                    review_time=datetime.fromtimestamp(row['review_time']),
+                    scheduled_days=row['scheduled_days'],
+                    elapsed_days=row['elapsed_days']
+                )
+
+    def archive_reviews(self, older_than_days: int, compact: bool = True) -> int:
+        """
+        Move reviews older than a horizon to the archive database
+
+        Rows are copied to `archive_path` and deleted from the live
+        database in one transaction, which keeps `reviews` and its
+        indexes small. Review rollups then count live reviews only;
+        get_review_history() and iter_reviews() read across both when
+        asked to.
+
+        Args:
+            older_than_days: Archive reviews made more than this many days ago
+            compact: Return the freed pages to the filesystem afterwards
+
+        Returns:
+            Number of reviews archived
+
+        Raises:
+            ValueError: The database is in memory
+        """
+        if self.archive_path is None:
+            raise ValueError("An in-memory database has no review archive")
+        cutoff = to_epoch(datetime.now() - timedelta(days=older_than_days))
+
+        with self._write_lock:
+            self._attach_archive(self.conn, create=True)
+            with self._writing() as cursor:
+                # OR IGNORE: with WAL the two files do not commit atomically
+                # together, so a crash can leave rows in both (reads skip those)
+                cursor.execute("""
+                    INSERT OR IGNORE INTO history.reviews
+                    SELECT id, card_hash, rating, state, review_time, scheduled_days, elapsed_days
+                    FROM main.reviews
+                    WHERE review_time < ?
+                """, (cutoff,))
+                cursor.execute("DELETE FROM main.reviews WHERE review_time < ?", (cutoff,))
+                archived = cursor.rowcount
+
+            if compact and archived:
+                self.compact()
+        return archived
+
+    def compact(self):
+        """
+        Return free pages of the live database to the filesystem
+
+        Databases created with incremental auto-vacuum are trimmed in
+        place; older files get one full VACUUM, which also switches
+        them to incremental mode for next time.
+        """
+        with self._write_lock:
+            if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                # executescript steps the pragma to completion; execute() would
+                # free a single page
+                self.conn.executescript("PRAGMA incremental_vacuum;")
+            else:
+                self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                self.conn.execute("VACUUM")
+            if not self._in_memory:
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def backup(self, dest_path: str, pages: Optional[int] = None, sleep: Optional[float] = None):
+        """
+        Copy the database to `dest_path` while it stays in use
+
+        The copy runs in small steps on a read connection that holds one
+        transaction throughout. With WAL that transaction is a snapshot:
+        reviews committed meanwhile neither wait for the copy nor restart
+        it, and the result is the database as of the first step. The
+        review archive, if there is one, is copied next to the result
+        under the name CardStorage would look for.
+
+        The copy is a standalone file (rollback journal, not WAL), so it
+        can be opened read-only or moved without its -wal sidecar.
+
+        Args:
+            dest_path: File to write (replaced if it exists)
+            pages: Pages copied per step (default: BACKUP_PAGES)
+            sleep: Seconds to pause between steps (default: BACKUP_SLEEP)
+        """
+        pages = pages or self.BACKUP_PAGES
+        sleep = self.BACKUP_SLEEP if sleep is None else sleep
+        copies = [(self.db_path, dest_path)]
+        if self.archive_path is not None and os.path.exists(self.archive_path):
+            copies.append((self.archive_path, str(Path(dest_path).with_suffix('.archive.db'))))
+
+        for source_path, target_path in copies:
+            target = sqlite3.connect(target_path)
+            try:
+                if self._in_memory:
+                    with self._write_lock:
+                        self.conn.backup(target)
+                else:
+                    source = sqlite3.connect(source_path, timeout=self.BUSY_TIMEOUT)
+                    try:
+                        source.execute("BEGIN")
+                        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                        source.backup(target, pages=pages, sleep=sleep)
+                    finally:
+                        source.close()
+                target.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                target.close()
+
+    def get_rating_counts(self) -> Dict[Tuple[int, int], int]:
+        """
+        How often each rating was given, by the card's state at review
+
+        Read from review_rollup, so the cost does not grow with the
+        number of reviews.
+
+        Returns:
+            {(state, rating): count} over all live reviews
+        """
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT state, rating, SUM(count) AS count
+                FROM review_rollup
+                GROUP BY state, rating
+            """)
+            return {(row['state'], row['rating']): row['count'] for row in cursor.fetchall()}
+
+    def get_due_counts(self, start: date, days: int) -> List[int]:
+        """
+        Cards (other than new ones) due on each of `days` local days from `start`
+
+        Read from due_rollup, which triggers keep current as schedules
+        change: a range of a few rows, however large the collection.
+        Its days are those of the zone recorded with the rollups, which
+        opening the collection brings in line with the local one.
+        """
+        end = start + timedelta(days=days - 1)
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT day, count FROM due_rollup WHERE day BETWEEN ? AND ?
+            """, (start.isoformat(), end.isoformat()))
+            counts = dict(cursor.fetchall())
+        return [counts.get((start + timedelta(days=i)).isoformat(), 0) for i in range(days)]
+
     def get_deck_stats(self) -> list:
         """
         Return per-deck aggregates.
@@ -292,44 +940,393 @@ class CardStorage:
             List of dicts: deck_name, total, new, learning, review, relearning,
                            avg_difficulty, lapse_rate
         """
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT
-                deck_name,
-                COUNT(*) as total,
-                SUM(CASE WHEN state = 0 THEN 1 ELSE 0 END) as new_count,
-                SUM(CASE WHEN state = 1 THEN 1 ELSE 0 END) as learning,
-                SUM(CASE WHEN state = 2 THEN 1 ELSE 0 END) as review,
-                SUM(CASE WHEN state = 3 THEN 1 ELSE 0 END) as relearning,
-                AVG(difficulty) as avg_difficulty,
-                AVG(lapses) as lapse_rate
-            FROM schedules
-            GROUP BY deck_name
-            ORDER BY deck_name
-        """)
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT * FROM deck_rollup
+                ORDER BY deck_name
+            """)
+
+            rows = cursor.fetchall()
 
-        rows = cursor.fetchall()
         return [
             {
                 'deck_name': row['deck_name'],
                 'total': row['total'],
-                'new': row['new_count'],
+                'new': row['new'],
                 'learning': row['learning'],
                 'review': row['review'],
                 'relearning': row['relearning'],
-                'avg_difficulty': round(row['avg_difficulty'] if row['avg_difficulty'] is not None else 0, 1),
-                'lapse_rate': round(row['lapse_rate'] if row['lapse_rate'] is not None else 0, 2),
+                'avg_difficulty': round(row['difficulty_sum'] / row['total'], 1),
+                'lapse_rate': round(row['lapses_sum'] / row['total'], 2),
             }
             for row in rows
         ]
 
+    def rebuild_rollups(self):
+        """
+        Recompute the stats rollups from `schedules` and `reviews`
+
+        Triggers keep them current; rebuilding is only needed after
+        editing the tables with triggers disabled, or to regroup days
+        after a time zone change (done on open when the zone recorded
+        with the rollups is not the local one). A zone change while the
+        collection is open goes unnoticed until it is reopened.
+        """
+        with self._writing() as cursor:
+            self._rebuild_rollups(cursor)
+
+    @staticmethod
+    def _rebuild_rollups(cursor: sqlite3.Cursor):
+        """Recompute the rollups and record the time zone they group days in"""
+        rebuild_rollups(cursor)
+        cursor.execute("""
+            INSERT INTO meta (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """, (ROLLUP_TIMEZONE_META_KEY, local_timezone()))
+
+    def iter_rows(self, table: str, include_archive: bool = False) -> Iterator[tuple]:
+        """
+        Stream the raw rows of `schedules`, `reviews` or `meta` (TABLE_COLUMNS order)
+
+        Rows are fetched EXPORT_CHUNK at a time from a single read
+        transaction: memory use does not depend on the size of the
+        table, and the rows are a consistent snapshot even while
+        reviews are being recorded.
+
+        Args:
+            table: 'schedules', 'reviews' or 'meta'
+            include_archive: Also stream archived reviews
+        """
+        if table not in self.TABLE_COLUMNS:
+            raise ValueError(f"Unknown table: {table}")
+        columns = ', '.join(self.TABLE_COLUMNS[table])
+        with self._reading() as cursor:
+            # Plain tuples: no per-row sqlite3.Row to build and convert
+            cursor.row_factory = None
+            query = f"SELECT {columns} FROM main.{table}"
+            if table == 'reviews' and include_archive and self._attach_archive(cursor.connection):
+                query += f" UNION ALL SELECT {columns} FROM history.reviews a WHERE {self.NOT_LIVE}"
+            cursor.execute(query)
+            while True:
+                rows = cursor.fetchmany(self.EXPORT_CHUNK)
+                if not rows:
+                    break
+                yield from rows
+
+    def import_rows(self, schedules: Iterable[tuple], reviews: Iterable[tuple],
+                    replace: bool = False,
+                    meta: Optional[Mapping[str, str]] = None) -> Tuple[int, int]:
+        """
+        Bulk-load rows in TABLE_COLUMNS order, in a single transaction
+
+        The indexes and rollup triggers of both tables are dropped for
+        the load and recreated afterwards, so each index is built once
+        from sorted data instead of being updated row by row; the
+        rollups are then rebuilt. Rows are consumed as they are
+        inserted, so iterators of any length can be passed.
+
+        Args:
+            schedules: Schedule rows
+            reviews: Review rows
+            replace: Delete every schedule and review first (a restore).
+                     Otherwise a schedule replaces one with the same hash
+                     and a review whose id exists is skipped, so
+                     importing the same export twice changes nothing.
+            meta: Settings of the exported collection. They replace the
+                  settings of an empty collection (or with `replace`);
+                  otherwise only settings missing here are added.
+
+        Returns:
+            (schedules, reviews) inserted
+
+        Raises:
+            ValueError: A numeric column received a value that is not a
+                        number, or `meta` names another card hash
+                        algorithm than this non-empty collection uses
+                        (nothing is imported)
+        """
+        with self._writing() as cursor:
+            cursor.execute("BEGIN IMMEDIATE")
+            if meta is not None:
+                self._import_meta(cursor, meta, replace)
+            cursor.execute("""
+                SELECT type, name, sql FROM sqlite_master
+                WHERE type IN ('index', 'trigger')
+                  AND tbl_name IN ('schedules', 'reviews')
+                  AND sql IS NOT NULL
+            """)
+            deferred = cursor.fetchall()
+            for row in deferred:
+                cursor.execute(f"DROP {row['type'].upper()} {row['name']}")
+            if replace:
+                cursor.execute("DELETE FROM reviews")
+                cursor.execute("DELETE FROM schedules")
+            loaded = []
+            for table, conflict, rows in (('schedules', 'OR REPLACE', schedules),
+                                          ('reviews', 'OR IGNORE', reviews)):
+                columns = self.TABLE_COLUMNS[table]
+                cursor.executemany(
+                    f"INSERT {conflict} INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    rows
+                )
+                loaded.append(cursor.rowcount)
+                # Numbers that arrived as text and did not convert
+                numeric = [column for column in columns if column not in ('card_hash', 'deck_name')]
+                cursor.execute(f"""
+                    SELECT 1 FROM {table}
+                    WHERE {' OR '.join(f"typeof({column}) = 'text'" for column in numeric)}
+                    LIMIT 1
+                """)
+                if cursor.fetchone() is not None:
+                    raise ValueError(f"Import has non-numeric values in {table}")
+            for row in deferred:
+                cursor.execute(row['sql'])
+            self._rebuild_rollups(cursor)
+        return loaded[0], loaded[1]
+
+    @staticmethod
+    def _import_meta(cursor: sqlite3.Cursor, meta: Mapping[str, str], replace: bool):
+        """Merge an export's settings (see import_rows)"""
+        cursor.execute("SELECT key, value FROM meta")
+        current = dict(cursor.fetchall())
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM schedules) OR EXISTS (SELECT 1 FROM reviews)")
+        if not replace and cursor.fetchone()[0]:
+            ours = current.get('hash_algorithm', DEFAULT_ALGORITHM)
+            theirs = meta.get('hash_algorithm', DEFAULT_ALGORITHM)
+            if ours != theirs:
+                raise ValueError(
+                    f"The export hashes cards with {theirs} but this collection uses {ours}: "
+                    f"import into an empty collection, or rehash one of them first"
+                )
+            meta = {key: value for key, value in meta.items() if key not in current}
+        else:
+            # Restoring: the imported hashes were made with the export's algorithm
+            meta = {'hash_algorithm': DEFAULT_ALGORITHM, **meta}
+        cursor.executemany("""
+            INSERT INTO meta (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """, meta.items())
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Read a collection setting"""
+        with self._reading() as cursor:
+            cursor.execute("SELECT value FROM meta WHERE key = ?", (key,))
+            row = cursor.fetchone()
+        return row['value'] if row else default
+
+    def set_meta(self, key: str, value: str):
+        """Write a collection setting"""
+        with self._writing() as cursor:
+            cursor.execute("""
+                INSERT INTO meta (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, (key, value))
+
+    def rehash_cards(self, mapping: Iterable[Tuple[str, str]], algorithm: str) -> int:
+        """
+        Move schedules and review history to new card hashes
+
+        Rewrites card_hash in schedules, reviews and the archive tables and
+        records the new algorithm in one transaction: either the whole
+        collection switches algorithm or nothing changes.
+
+        Reviews moved to the archive database (see archive_reviews()) are
+        rewritten too, within the same transaction.
+
+        Archived cards missing from the mapping keep their old hash; the
+        old algorithm is listed under ARCHIVED_ALGORITHMS_META_KEY so that
+        the app can match them again when their text comes back.
+
+        Args:
+            mapping: (old_hash, new_hash) pairs
+            algorithm: Name of the algorithm the new hashes were made with
+
+        Returns:
+            Number of schedules moved
+        """
+        tables = ['schedules', 'reviews', 'archived_schedules', 'archived_reviews']
+        with self._write_lock:
+            # Attached outside the transaction; a database cannot be attached inside one
+            if self._attach_archive(self.conn):
+                tables.append('history.reviews')
+            with self._writing() as cursor:
+                cursor.execute("""
+                    CREATE TEMP TABLE IF NOT EXISTS rehash_map (
+                        old_hash TEXT PRIMARY KEY,
+                        new_hash TEXT NOT NULL
+                    )
+                """)
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO rehash_map (old_hash, new_hash) VALUES (?, ?)",
+                    mapping
+                )
+                moved = 0
+                for table in tables:
+                    cursor.execute(f"""
+                        UPDATE {table}
+                        SET card_hash = (SELECT new_hash FROM rehash_map WHERE old_hash = {table}.card_hash)
+                        WHERE card_hash IN (SELECT old_hash FROM rehash_map)
+                    """)
+                    if table == 'schedules':
+                        moved = cursor.rowcount
+
+                cursor.execute("""
+                    SELECT 1 FROM archived_schedules
+                    WHERE card_hash NOT IN (SELECT new_hash FROM rehash_map)
+                    LIMIT 1
+                """)
+                unmatched = cursor.fetchone() is not None
+                cursor.execute("SELECT key, value FROM meta WHERE key IN ('hash_algorithm', ?)",
+                               (ARCHIVED_ALGORITHMS_META_KEY,))
+                meta = dict(cursor.fetchall())
+                archived = archived_algorithms(
+                    meta.get(ARCHIVED_ALGORITHMS_META_KEY),
+                    meta.get('hash_algorithm', DEFAULT_ALGORITHM), algorithm, unmatched)
+                cursor.executemany("""
+                    INSERT INTO meta (key, value) VALUES (?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """, [('hash_algorithm', algorithm), (ARCHIVED_ALGORITHMS_META_KEY, archived)])
+                cursor.execute("DELETE FROM rehash_map")
+
+        return moved
+
+    def reconcile(self, card_hashes: Iterable[str], archive: bool = True,
+                  dry_run: bool = False) -> dict:
+        """
+        Archive or drop schedules whose card is no longer in any deck
+
+        The loaded hashes are diffed against `schedules` in one
+        set-based query, and every orphan is handled in a single
+        transaction, reviews included. Archived cards leave the stats
+        and due queue; bootstrap_schedules() restores them if their
+        text comes back.
+
+        Args:
+            card_hashes: Hashes of every card currently loaded
+            archive: Move orphans to the archive tables (False = delete them)
+            dry_run: Only report what would be done
+
+        Returns:
+            Dict with the orphaned 'schedules' and 'reviews' counts and
+            orphaned schedules per deck ('by_deck')
+        """
+        with self._writing() as cursor:
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS live_cards (card_hash TEXT PRIMARY KEY)")
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS orphan_cards (card_hash TEXT PRIMARY KEY)")
+            cursor.executemany(
+                "INSERT OR IGNORE INTO live_cards (card_hash) VALUES (?)",
+                ((card_hash,) for card_hash in card_hashes)
+            )
+            cursor.execute("""
+                INSERT INTO orphan_cards
+                SELECT s.card_hash
+                FROM schedules s
+                LEFT JOIN live_cards l ON l.card_hash = s.card_hash
+                WHERE l.card_hash IS NULL
+            """)
+            cursor.execute("""
+                SELECT deck_name, COUNT(*) AS count
+                FROM schedules
+                WHERE card_hash IN (SELECT card_hash FROM orphan_cards)
+                GROUP BY deck_name
+                ORDER BY deck_name
+            """)
+            by_deck = {row['deck_name']: row['count'] for row in cursor.fetchall()}
+            cursor.execute("""
+                SELECT COUNT(*) FROM reviews
+                WHERE card_hash IN (SELECT card_hash FROM orphan_cards)
+            """)
+            reviews = cursor.fetchone()[0]
+
+            if by_deck and not dry_run:
+                now = to_epoch(datetime.now())
+                if archive:
+                    cursor.execute("""
+                        INSERT OR REPLACE INTO archived_reviews
+                        SELECT id, card_hash, rating, state, review_time, scheduled_days, elapsed_days
+                        FROM reviews
+                        WHERE card_hash IN (SELECT card_hash FROM orphan_cards)
+                    """)
+                    cursor.execute("""
+                        INSERT OR REPLACE INTO archived_schedules
+                        SELECT card_hash, deck_name, state, stability, difficulty,
+                               elapsed_days, scheduled_days, reps, lapses,
+                               last_review, due, created_at, updated_at, ?
+                        FROM schedules
+                        WHERE card_hash IN (SELECT card_hash FROM orphan_cards)
+                    """, (now,))
+                # Reviews first: the rollup trigger looks up their deck in schedules
+                cursor.execute("DELETE FROM reviews WHERE card_hash IN (SELECT card_hash FROM orphan_cards)")
+                cursor.execute("DELETE FROM schedules WHERE card_hash IN (SELECT card_hash FROM orphan_cards)")
+
+            cursor.execute("DELETE FROM live_cards")
+            cursor.execute("DELETE FROM orphan_cards")
+
+        return {
+            'schedules': sum(by_deck.values()),
+            'reviews': reviews,
+            'by_deck': by_deck,
+        }
+
     def delete_card(self, card_hash: str):
         """Delete card and its review history"""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM schedules WHERE card_hash = ?", (card_hash,))
-        cursor.execute("DELETE FROM reviews WHERE card_hash = ?", (card_hash,))
-        self.conn.commit()
+        with self._writing() as cursor:
+            # Reviews first: the rollup trigger looks up their deck in schedules
+            cursor.execute("DELETE FROM reviews WHERE card_hash = ?", (card_hash,))
+            cursor.execute("DELETE FROM schedules WHERE card_hash = ?", (card_hash,))
     
     def close(self):
-        """Close database connection"""
-        self.conn.close()
\ No newline at end of file
+        """Close the writer and every pooled read connection"""
+        with self._pool_lock:
+            readers, self._readers, self._idle_readers = self._readers, [], []
+        for conn in readers:
+            conn.close()
+        self.conn.close()
+
+
+def open_storage(url: str, group_commit: Optional[float] = None) -> Storage:
+    """
+    Open a storage backend by URL
+
+    - `memory://`: MemoryStorage, nothing persisted
+    - `sqlite:///path/to/file.db`, or a plain path: CardStorage
+
+    Args:
+        url: Backend URL
+        group_commit: See CardStorage (ignored by backends without commits)
+
+    Raises:
+        ValueError: Unknown URL scheme
+    """
+    scheme, sep, rest = url.partition('://')
+    if not sep:
+        return CardStorage(url, group_commit=group_commit)
+    if scheme == 'memory':
+        from .memory_storage import MemoryStorage
+        return MemoryStorage()
+    if scheme == 'sqlite':
+        # sqlite:///rel.db and sqlite:////abs.db, as in SQLAlchemy
+        return CardStorage(rest[1:] if rest.startswith('/') else rest, group_commit=group_commit)
+    raise ValueError(f"Unknown storage URL scheme: {scheme}")
+
+
+def read_meta(db_path: str, key: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Read one meta value without opening the collection for writing
+
+    CardStorage() migrates the schema on open; this reads through a
+    read-only connection instead, so the file is never changed.
+
+    Returns:
+        The value, or `default` if it is unset or the schema predates meta
+    """
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    except sqlite3.OperationalError:
+        # No meta table yet
+        row = None
+    finally:
+        conn.close()
+    return row[0] if row else default
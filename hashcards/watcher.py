@@ -0,0 +1,276 @@
+"""
+Deck Watcher - Notice edits to deck files while a session is running
+Uses inotify on Linux and falls back to polling an mtime index elsewhere
+
+Bursts of events (editors often write a temp file, rename it, then
+touch it again) are debounced into a single callback listing only the
+deck files that changed.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+# Sentinel passed instead of a path set when the whole tree must be rescanned
+RESCAN_ALL = None
+
+
+def _is_deck_path(rel_path: str) -> bool:
+    """True for .md files outside hidden directories"""
+    return rel_path.endswith('.md') and not any(
+        part.startswith('.') for part in rel_path.split('/'))
+
+
+class PollingBackend:
+    """
+    Portable change detection by polling stat metadata
+
+    Keeps an mtime index of every deck file plus the mtime of every
+    directory; a directory is only re-listed when its own mtime changes,
+    so an idle poll costs one stat per directory and file.
+    """
+
+    def __init__(self, cards_dir: Path, interval: float = 1.0):
+        self.cards_dir = Path(cards_dir)
+        self.interval = interval
+        self._stop = threading.Event()
+        # dir rel_path -> (mtime_ns, subdir rel_paths, deck rel_paths)
+        self._dirs: Dict[str, Tuple[int, List[str], List[str]]] = {}
+        # deck rel_path -> (mtime_ns, size)
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self._scan()
+
+    def _scan(self) -> Set[str]:
+        """Update the index and return deck paths that changed"""
+        changed: Set[str] = set()
+        seen_dirs: Set[str] = set()
+        seen_files: Set[str] = set()
+        pending = ['']
+        while pending:
+            rel_dir = pending.pop()
+            abs_dir = self.cards_dir / rel_dir if rel_dir else self.cards_dir
+            try:
+                mtime_ns = abs_dir.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+            seen_dirs.add(rel_dir)
+            cached = self._dirs.get(rel_dir)
+            if cached is None or cached[0] != mtime_ns:
+                subdirs, decks = [], []
+                try:
+                    with os.scandir(abs_dir) as entries:
+                        for entry in entries:
+                            if entry.name.startswith('.'):
+                                continue
+                            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(rel)
+                            elif entry.name.endswith('.md'):
+                                decks.append(rel)
+                except FileNotFoundError:
+                    continue
+                cached = (mtime_ns, subdirs, decks)
+                self._dirs[rel_dir] = cached
+            pending.extend(cached[1])
+
+            for rel in cached[2]:
+                try:
+                    st = (self.cards_dir / rel).stat()
+                except FileNotFoundError:
+                    continue
+                seen_files.add(rel)
+                signature = (st.st_mtime_ns, st.st_size)
+                if self._files.get(rel) != signature:
+                    self._files[rel] = signature
+                    changed.add(rel)
+
+        for rel in [r for r in self._files if r not in seen_files]:
+            del self._files[rel]
+            changed.add(rel)
+        for rel in [d for d in self._dirs if d not in seen_dirs]:
+            del self._dirs[rel]
+        return changed
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """Block up to `timeout` seconds and return changed deck paths"""
+        self._stop.wait(min(timeout, self.interval))
+        if self._stop.is_set():
+            return set()
+        return self._scan()
+
+    def close(self):
+        self._stop.set()
+
+
+class InotifyBackend:
+    """
+    Linux inotify change detection via libc (no extra dependencies)
+
+    One watch per directory; new directories are watched as they
+    appear and trigger a full rescan since their files were never seen.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, cards_dir: Path):
+        self.cards_dir = Path(cards_dir)
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: Dict[int, str] = {}
+        self._add_tree('')
+
+    def _add_tree(self, rel_dir: str):
+        """Watch a directory and every non-hidden directory below it"""
+        abs_dir = self.cards_dir / rel_dir if rel_dir else self.cards_dir
+        for root, dirs, _ in os.walk(abs_dir):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(root), self.WATCH_MASK)
+            if wd >= 0:
+                rel = Path(root).relative_to(self.cards_dir).as_posix()
+                self._watches[wd] = '' if rel == '.' else rel
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """Block up to `timeout` seconds and return changed deck paths"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed: Set[str] = set()
+        rescan = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                rescan = True
+                continue
+            if mask & self.IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            rel_dir = self._watches.get(wd)
+            if rel_dir is None or not name:
+                continue
+            rel = f"{rel_dir}/{name}" if rel_dir else name
+            if mask & self.IN_ISDIR:
+                if name.startswith('.'):
+                    continue
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._add_tree(rel)
+                rescan = True
+            elif _is_deck_path(rel):
+                changed.add(rel)
+
+        return RESCAN_ALL if rescan else changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class DeckWatcher:
+    """
+    Background thread that reports changed deck files
+
+    The callback receives a set of relative deck paths, or RESCAN_ALL
+    (None) when the change cannot be narrowed down to files.
+    """
+
+    def __init__(self, cards_dir: str, on_change: Callable[[Optional[Set[str]]], None],
+                 debounce: float = 0.5, poll_interval: float = 1.0,
+                 use_inotify: bool = True):
+        """
+        Initialize watcher
+
+        Args:
+            cards_dir: Directory containing .md card files
+            on_change: Called from the watcher thread with the changed paths
+            debounce: Quiet period (seconds) that ends a burst of events
+            poll_interval: Seconds between scans when polling
+            use_inotify: Prefer inotify when the platform supports it
+        """
+        self.cards_dir = Path(cards_dir)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.backend = None
+        if use_inotify:
+            try:
+                self.backend = InotifyBackend(self.cards_dir)
+            except (OSError, AttributeError):
+                self.backend = None
+        if self.backend is None:
+            self.backend = PollingBackend(self.cards_dir, poll_interval)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start watching in a daemon thread"""
+        self._thread = threading.Thread(target=self._run, name="hashcards-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching and release the backend"""
+        self._stop.set()
+        if isinstance(self.backend, PollingBackend):
+            # Wakes a sleeping poll immediately
+            self.backend.close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.backend.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            changed = self.backend.wait(1.0)
+            if changed is not RESCAN_ALL and not changed:
+                continue
+
+            # Debounce: keep collecting until the tree is quiet
+            while not self._stop.is_set():
+                more = self.backend.wait(self.debounce)
+                if more is not RESCAN_ALL and not more:
+                    break
+                if changed is RESCAN_ALL or more is RESCAN_ALL:
+                    changed = RESCAN_ALL
+                else:
+                    changed |= more
+
+            if self._stop.is_set():
+                return
+            try:
+                self.on_change(changed)
+            except Exception as exc:
+                print(f"hashcards: reload failed: {exc}", file=sys.stderr)
@@ -5,13 +5,20 @@ Minimalist interface focused on the review experience
 
 from flask import Flask, render_template, request, jsonify, redirect, url_for
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 from datetime import date
+import json
 import os
+import threading
 
+from ..backup import DEFAULT_KEEP, PeriodicBackup
+from ..due_queue import DueQueue
+from ..hasher import DEFAULT_ALGORITHM, CardHasher
+from ..loader import DeckLoader
+from ..watcher import DeckWatcher
 from ..parser import CardParser, Card
-from ..scheduler import FSRSScheduler, Rating
-from ..storage import CardStorage
+from ..scheduler import WEIGHTS_META_KEY, FSRSScheduler, Rating
+from ..storage import ARCHIVED_ALGORITHMS_META_KEY, CardStorage, open_storage
 
 
 class HashcardsApp:
@@ -24,24 +31,44 @@ class HashcardsApp:
     - Progressive enhancement (works without JS)
     """
     
-    def __init__(self, cards_dir: str, db_path: Optional[str] = None):
+    def __init__(self, cards_dir: str, db_path: Optional[str] = None, jobs: int = 1,
+                 group_commit: Optional[float] = None, order: str = 'due',
+                 load_balance: bool = False):
         """
         Initialize application
         
         Args:
             cards_dir: Directory containing .md card files
-            db_path: Path to SQLite database (default: .hashcards.db in cards_dir)
+            db_path: Path to SQLite database, or a storage URL such as
+                     memory:// (default: .hashcards.db in cards_dir; see open_storage)
+            jobs: Worker processes for parsing decks (1 = serial, 0 = one per CPU)
+            group_commit: Batch concurrent reviews into shared commits (see CardStorage)
+            order: Study order, 'due' or 'retrievability' (see DueQueue)
+            load_balance: Move each interval to the least loaded day nearby,
+                          flattening daily review peaks (see FSRSScheduler)
         """
         self.cards_dir = Path(cards_dir)
         
         if db_path is None:
             db_path = str(self.cards_dir / ".hashcards.db")
         
-        self.storage = CardStorage(db_path)
-        self.scheduler = FSRSScheduler()
+        self.storage = open_storage(db_path, group_commit=group_commit)
+        # Weights fitted to this collection by `hashcards optimize`, if any
+        weights = self.storage.get_meta(WEIGHTS_META_KEY)
+        self.scheduler = FSRSScheduler.with_weights(
+            json.loads(weights) if weights else None,
+            due_counts=self.storage.get_due_counts if load_balance else None)
         
-        # Cache cards in memory for fast access
+        # Cache cards in memory for fast access, and their schedules in study order
         self.cards_cache = {}
+        self.queue = DueQueue(order, self.scheduler)
+        self.loader = DeckLoader(
+            str(self.cards_dir), jobs=jobs,
+            hash_algorithm=self.storage.get_meta('hash_algorithm', DEFAULT_ALGORITHM)
+        )
+        self.watcher = None
+        self.backups = None
+        self._reload_lock = threading.Lock()
         self._load_all_cards()
         
         # Create Flask app
@@ -49,24 +76,118 @@ class HashcardsApp:
         self.app.secret_key = os.urandom(24)
         self._register_routes()
     
-    def _load_all_cards(self):
-        """Load all cards from Markdown files (recursive)"""
-        self.cards_cache.clear()
-
-        for md_file in self.cards_dir.rglob("*.md"):
-            # Skip hidden directories (e.g. .planning/, .claude/)
-            if any(part.startswith('.') for part in md_file.relative_to(self.cards_dir).parts):
-                continue
-            # Deck name = relative path without extension, using forward slashes always
-            deck_name = md_file.relative_to(self.cards_dir).with_suffix('').as_posix()
-            cards = CardParser.parse_file(str(md_file), deck_name=deck_name)
-            for card in cards:
-                card_hash = card.get_hash()
-                self.cards_cache[card_hash] = card
-
-                if not self.storage.get_schedule(card_hash):
-                    schedule = self.scheduler.init_card(card_hash)
-                    self.storage.save_schedule(schedule, card.deck_name)
+    def _load_all_cards(self, paths: Optional[Iterable[str]] = None):
+        """
+        Load cards from Markdown files (recursive)
+
+        Only new, changed or deleted files are re-parsed; the cache
+        is patched with the resulting delta instead of being rebuilt.
+
+        The patched cache is a copy swapped in with one assignment, so
+        requests already holding the old dict keep a consistent snapshot.
+
+        Args:
+            paths: Relative deck paths known to have changed (None = scan everything)
+        """
+        with self._reload_lock:
+            delta = self.loader.refresh(paths)
+            if not delta:
+                return
+
+            self._match_archived(delta.updated)
+            # Schedules first, so a card is never visible without one
+            self.storage.bootstrap_schedules(
+                ((card_hash, card.deck_name) for card_hash, card in delta.updated.items()),
+                self.scheduler.init_card
+            )
+            cards_cache = dict(self.cards_cache)
+            delta.apply(cards_cache)
+            if paths is None or delta.removed:
+                # Archived before publishing, so no orphan is ever due
+                self.storage.reconcile(cards_cache)
+            # Queued cards are always cached: removals before the swap, additions after
+            self.queue.remove(delta.removed)
+            self.cards_cache = cards_cache
+            if len(self.queue):
+                schedules = self.storage.get_schedules(delta.updated).values()
+            else:
+                # First load: one scan beats looking every card up
+                schedules = (s for s in self.storage.iter_schedules() if s.card_hash in delta.updated)
+            self.queue.put_many((schedule, delta.updated[schedule.card_hash].deck_name)
+                                for schedule in schedules)
+
+    def _match_archived(self, cards: dict):
+        """
+        Move archived cards still hashed with an earlier algorithm (left
+        out of a rehash) to their current hash, so loading restores them
+        """
+        legacy = self.storage.get_meta(ARCHIVED_ALGORITHMS_META_KEY)
+        if not legacy or not cards:
+            return
+        for algorithm in legacy.split(','):
+            old_hashes = CardHasher.hash_cards((card.raw_text for card in cards.values()), algorithm)
+            self.storage.rehash_cards(zip(old_hashes, cards), self.loader.hash_algorithm)
+
+    def reload_schedules(self):
+        """Re-read the schedules of all loaded cards (after the database was changed elsewhere)"""
+        with self._reload_lock:
+            cards_cache = self.cards_cache
+            self.queue.load((schedule, cards_cache[schedule.card_hash].deck_name)
+                            for schedule in self.storage.iter_schedules()
+                            if schedule.card_hash in cards_cache)
+
+    def reconcile(self, archive: bool = True, dry_run: bool = False) -> dict:
+        """Archive or drop schedules of cards missing from the decks (see Storage.reconcile)"""
+        with self._reload_lock:
+            return self.storage.reconcile(self.cards_cache, archive=archive, dry_run=dry_run)
+
+    def start_watcher(self, debounce: float = 0.5, poll_interval: float = 1.0,
+                      use_inotify: bool = True):
+        """
+        Reload edited decks automatically while the app is running
+
+        Args:
+            debounce: Quiet period (seconds) that ends a burst of saves
+            poll_interval: Seconds between scans when inotify is unavailable
+            use_inotify: Prefer inotify when the platform supports it
+        """
+        if self.watcher is None:
+            self.watcher = DeckWatcher(
+                str(self.cards_dir), self._load_all_cards,
+                debounce=debounce, poll_interval=poll_interval, use_inotify=use_inotify
+            )
+            self.watcher.start()
+
+    def stop_watcher(self):
+        """Stop automatic reloading"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def start_backups(self, interval: float, backup_dir: Optional[str] = None,
+                      keep: int = DEFAULT_KEEP):
+        """
+        Snapshot the database periodically while the app is running
+
+        Args:
+            interval: Seconds between snapshots
+            backup_dir: Directory for snapshots (default: next to the database)
+            keep: Snapshots to keep
+
+        Raises:
+            ValueError: The storage backend is not SQLite
+        """
+        if not isinstance(self.storage, CardStorage):
+            raise ValueError("Backups need the SQLite storage backend")
+        if self.backups is None:
+            self.backups = PeriodicBackup(self.storage, interval, backup_dir=backup_dir, keep=keep)
+            self.backups.start()
+
+    def stop_backups(self):
+        """Stop periodic backups"""
+        if self.backups is not None:
+            self.backups.stop()
+            self.backups = None
     
     def _register_routes(self):
         """Register Flask routes"""
@@ -82,19 +203,20 @@ class HashcardsApp:
         @self.app.route('/study/<path:deck_name>')
         def study(deck_name: Optional[str] = None):
             """Study session"""
-            due_hashes = self.storage.get_due_cards(deck_name, limit=1)
-            
-            if not due_hashes:
+            card_hash = self.queue.next(deck_name)
+            while card_hash and card_hash not in self.cards_cache:
+                # Loads keep the queue to cached cards; a stale entry must be
+                # dropped, or it would stay at the top and block the deck
+                with self._reload_lock:
+                    if card_hash not in self.cards_cache:
+                        self.queue.remove([card_hash])
+                card_hash = self.queue.next(deck_name)
+            card = self.cards_cache.get(card_hash) if card_hash else None
+
+            if not card:
                 return render_template('no_cards.html', deck_name=deck_name)
             
-            card_hash = due_hashes[0]
-            card = self.cards_cache.get(card_hash)
-            schedule = self.storage.get_schedule(card_hash)
-            
-            if not card:
-                # Card file was deleted - remove from DB
-                self.storage.delete_card(card_hash)
-                return redirect(url_for('study', deck_name=deck_name))
+            schedule = self.queue.get(card_hash)
             
             return render_template(
                 'study.html',
@@ -111,15 +233,19 @@ class HashcardsApp:
             rating = int(request.form.get('rating'))
             deck_name = request.form.get('deck_name')
             
-            schedule = self.storage.get_schedule(card_hash)
-            if schedule:
-                # Process review
+            # No reload lock: loads drop a card from the queue before the
+            # cache, so a queued card is cached, and concurrent reviews can
+            # share a group commit
+            schedule = self.queue.get(card_hash)
+            card = self.cards_cache.get(card_hash)
+            if schedule and card:
+                # Process review (skipped if the card was edited away meanwhile)
                 new_schedule, log = self.scheduler.review_card(schedule, Rating(rating))
-                
-                # Save to database
-                card = self.cards_cache.get(card_hash)
-                self.storage.save_schedule(new_schedule, card.deck_name)
-                self.storage.log_review(log)
+
+                # Save to database, then requeue unless a load removed or
+                # replaced the card in between
+                self.storage.record_review(new_schedule, card.deck_name, log)
+                self.queue.requeue(schedule, new_schedule, card.deck_name)
             
             # Continue to next card
             return redirect(url_for('study', deck_name=deck_name))
@@ -131,10 +257,28 @@ class HashcardsApp:
             stats = self.storage.get_stats(deck_name)
             return jsonify(stats)
         
+        @self.app.route('/api/forecast')
+        def api_forecast():
+            """Reviews expected per day and per deck (see forecast.py)"""
+            from ..forecast import forecast
+
+            days = min(max(request.args.get('days', 30, type=int), 1), 365)
+            new_per_day = max(request.args.get('new_per_day', 20, type=int), 0)
+            add_cards = min(max(request.args.get('add_cards', 0, type=int), 0), 100000)
+            # The schedules table holds exactly the loaded cards after a load;
+            # other backends are read for the cached cards
+            cards = None if isinstance(self.storage, CardStorage) else {
+                card_hash: card.deck_name for card_hash, card in self.cards_cache.items()}
+            result = forecast(self.storage, days=days, new_per_day=new_per_day,
+                              add_cards=add_cards, add_deck=request.args.get('add_deck', '(new deck)'),
+                              cards=cards, seed=0, params=self.scheduler.params)
+            return jsonify(result.to_dict())
+        
         @self.app.route('/api/reload')
         def api_reload():
-            """Reload cards from files"""
+            """Reload cards from files, and schedules from the database"""
             self._load_all_cards()
+            self.reload_schedules()
             return jsonify({'status': 'ok', 'cards_loaded': len(self.cards_cache)})
         
         @self.app.route('/browse')
@@ -146,21 +290,19 @@ class HashcardsApp:
             else:
                 cards = list(self.cards_cache.values())
             
-            # Add schedule info
-            cards_with_schedule = []
-            for card in cards:
-                schedule = self.storage.get_schedule(card.get_hash())
-                cards_with_schedule.append({
-                    'card': card,
-                    'schedule': schedule
-                })
+            # Add schedule info, fetched in bulk
+            schedules = self.storage.get_schedules(card.get_hash() for card in cards)
+            cards_with_schedule = [
+                {'card': card, 'schedule': schedules.get(card.get_hash())}
+                for card in cards
+            ]
             
             return render_template('browse.html', cards=cards_with_schedule, deck_name=deck_name)
 
         @self.app.route('/stats')
         def stats():
             """Statistics dashboard"""
-            history = self.storage.get_review_history(days=365)
+            history = self.storage.get_review_history(days=365, include_archive=True)
             deck_stats = self.storage.get_deck_stats()
             overall = self.storage.get_stats()
             return render_template(
@@ -217,7 +359,7 @@ class HashcardsApp:
                 target.parent.mkdir(parents=True, exist_ok=True)
                 with open(target, 'a', encoding='utf-8') as f:
                     f.write("\n" + content + "\n")
-                self._load_all_cards()
+                self._load_all_cards([target.relative_to(self.cards_dir).as_posix()])
 
             return redirect(url_for('index'))
 
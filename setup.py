@@ -30,7 +30,11 @@ setup(
     python_requires=">=3.8",
     install_requires=[
         "flask>=2.3.0",
+        "numpy>=1.22",
     ],
+    extras_require={
+        "parquet": ["pyarrow>=10.0"],
+    },
     entry_points={
         "console_scripts": [
             "hashcards=hashcards.cli:main",
@@ -0,0 +1,41 @@
+"""Fixtures shared by the test modules"""
+import pytest
+from pathlib import Path
+from hashcards.storage import CardStorage
+from hashcards.memory_storage import MemoryStorage
+
+
+@pytest.fixture
+def card_file():
+    """Write a deck file, creating its directories: card_file(directory, filename, content)"""
+    def make_card_file(directory: Path, filename: str, content: str) -> Path:
+        path = directory / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        return path
+    return make_card_file
+
+
+@pytest.fixture
+def make_sqlite_storage(tmp_path):
+    """
+    Open SQLite collections in the test's directory, closed afterwards:
+    make_sqlite_storage(name=".test.db", **CardStorage options)
+    """
+    opened = []
+
+    def make(name: str = ".test.db", **kwargs) -> CardStorage:
+        storage = CardStorage(str(tmp_path / name), **kwargs)
+        opened.append(storage)
+        return storage
+    yield make
+    for storage in opened:
+        storage.close()
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def storage(request, make_sqlite_storage):
+    """An empty collection, once per storage backend"""
+    if request.param == "memory":
+        return MemoryStorage()
+    return make_sqlite_storage()
@@ -0,0 +1,100 @@
+"""Tests for online backups"""
+import sqlite3
+import threading
+import time
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from hashcards.backup import create_snapshot, list_snapshots, verify_backup
+from hashcards.storage import CardStorage
+from hashcards.scheduler import FSRSScheduler, Rating
+
+
+def seed_cards(storage: CardStorage, count: int):
+    scheduler = FSRSScheduler()
+    storage.bootstrap_schedules(((f"h{i}", "deck") for i in range(count)), scheduler.init_card)
+
+
+def test_snapshot_is_consistent_while_reviews_commit(make_sqlite_storage, tmp_path):
+    storage = make_sqlite_storage()
+    seed_cards(storage, 2000)
+    scheduler = FSRSScheduler()
+    stop = threading.Event()
+    reviewed = []
+
+    def review_loop():
+        i = 0
+        while not stop.is_set():
+            schedule, log = scheduler.review_card(storage.get_schedule(f"h{i % 2000}"), Rating.GOOD)
+            storage.record_review(schedule, "deck", log)
+            reviewed.append(i)
+            i += 1
+
+    writer = threading.Thread(target=review_loop)
+    writer.start()
+    try:
+        # One page per step: many steps, each racing the writer
+        with patch.object(CardStorage, 'BACKUP_PAGES', 1), patch.object(CardStorage, 'BACKUP_SLEEP', 0):
+            path = create_snapshot(storage, str(tmp_path / "backups"))
+    finally:
+        stop.set()
+        writer.join()
+
+    assert reviewed
+    assert verify_backup(str(path)) == []
+    copy = sqlite3.connect(str(path))
+    reviews = copy.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+    # Rollups match the rows: the copy is one point in time
+    assert copy.execute("SELECT COALESCE(SUM(count), 0) FROM review_rollup").fetchone()[0] == reviews
+    assert copy.execute("SELECT SUM(total) FROM deck_rollup").fetchone()[0] == 2000
+    assert copy.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+    copy.close()
+
+
+def test_rotation_keeps_newest_snapshots_with_their_archives(make_sqlite_storage, tmp_path):
+    storage = make_sqlite_storage()
+    seed_cards(storage, 10)
+    backup_dir = str(tmp_path / "backups")
+    storage.archive_reviews(older_than_days=0)
+
+    paths = [create_snapshot(storage, backup_dir, keep=2) for _ in range(4)]
+
+    assert list_snapshots(backup_dir) == paths[2:]
+    assert sorted(p.name for p in Path(backup_dir).iterdir()) == sorted(
+        name for p in paths[2:] for name in (p.name, p.with_suffix('.archive.db').name))
+    # A snapshot opens as a collection of its own
+    copy = CardStorage(str(paths[-1]))
+    assert copy.get_stats()['total_cards'] == 10
+    assert copy.archive_path == str(paths[-1].with_suffix('.archive.db'))
+    copy.close()
+
+
+def test_failed_verification_discards_the_copy(make_sqlite_storage, tmp_path):
+    garbage = tmp_path / "garbage.db"
+    garbage.write_bytes(b"SQLite format 3\x00" + b"\xff" * 4096)
+    assert verify_backup(str(garbage))
+
+    storage = make_sqlite_storage()
+    backup_dir = tmp_path / "backups"
+    with patch('hashcards.backup.verify_backup', return_value=["page 2: corrupt"]):
+        with pytest.raises(RuntimeError):
+            create_snapshot(storage, str(backup_dir))
+    assert list(backup_dir.iterdir()) == []
+
+
+def test_app_backs_up_periodically(card_file, tmp_path):
+    card_file(tmp_path, "deck.md", "Q: Backed up?\nA: Yes\n")
+
+    from hashcards.web.app import HashcardsApp
+    app = HashcardsApp(str(tmp_path), db_path=str(tmp_path / ".test.db"))
+    app.start_backups(interval=0.05, backup_dir=str(tmp_path / "backups"), keep=2)
+    deadline = time.monotonic() + 5
+    while len(list_snapshots(str(tmp_path / "backups"))) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    app.stop_backups()
+
+    assert len(list_snapshots(str(tmp_path / "backups"))) == 2
+    assert not list((tmp_path / "backups").glob(".partial-*"))
+
+    with pytest.raises(ValueError):
+        HashcardsApp(str(tmp_path), db_path="memory://").start_backups(interval=60)
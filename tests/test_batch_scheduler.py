@@ -0,0 +1,115 @@
+"""Tests for the vectorized FSRS engine"""
+import random
+import time
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from hashcards.batch_scheduler import BatchScheduler, ScheduleBatch
+from hashcards.scheduler import CardSchedule, FSRSScheduler, Rating, State
+from hashcards.storage import CardStorage
+
+
+def make_schedules(count: int, now: datetime, seed: int = 3):
+    """Schedules in every state, reviewed up to two years ago"""
+    rng = random.Random(seed)
+    schedules = []
+    for i in range(count):
+        state = rng.choice(list(State))
+        reviewed = state != State.NEW
+        schedules.append(CardSchedule(
+            card_hash=f"h{i}", state=state,
+            stability=rng.uniform(0.1, 400) if reviewed else 0.0,
+            difficulty=rng.uniform(1, 10) if reviewed else 5.0,
+            elapsed_days=rng.randrange(100), scheduled_days=rng.randrange(100),
+            reps=rng.randrange(1, 30) if reviewed else 0, lapses=rng.randrange(5),
+            last_review=now - timedelta(seconds=rng.randrange(2 * 365 * 86400)) if reviewed else None,
+            due=now - timedelta(seconds=rng.randrange(86400))
+        ))
+    return schedules
+
+
+def test_batch_review_matches_scalar_review_exactly():
+    now = datetime(2024, 5, 17, 9, 30, 0)
+    schedules = make_schedules(5000, now)
+    ratings = [Rating(random.Random(i).randrange(1, 5)) for i in range(len(schedules))]
+
+    scalar = FSRSScheduler()
+    expected = [scalar.review_card(s, r, now=now)[0] for s, r in zip(schedules, ratings)]
+    result = BatchScheduler(exact=True).review(ScheduleBatch.from_schedules(schedules), np.array(ratings),
+                                               now=now)
+
+    assert result.to_schedules() == expected
+    # Bit-for-bit, not just after the round trip through Python floats
+    assert result.stability.tolist() == [s.stability for s in expected]
+    assert result.due.tolist() == [s.due.timestamp() for s in expected]
+
+    # The default, NumPy's own exp/pow: the same schedules up to rounding
+    fast = BatchScheduler().review(ScheduleBatch.from_schedules(schedules), np.array(ratings), now=now)
+    np.testing.assert_allclose(fast.stability, result.stability, rtol=1e-12)
+    assert fast.scheduled_days.tolist() == result.scheduled_days.tolist()
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    """Run in a time zone with daylight saving time"""
+    if not hasattr(time, 'tzset'):
+        pytest.skip("time zones cannot be switched on this platform")
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_batch_review_matches_scalar_review_across_dst(new_york):
+    # Last reviewed before the clocks went back: 20 calendar days, 20 days + 1 hour of seconds
+    now = datetime(2024, 11, 10, 9, 0, 0)
+    card = CardSchedule(card_hash="c", state=State.REVIEW, stability=30.0, difficulty=5.0,
+                        elapsed_days=0, scheduled_days=20, reps=3, lapses=0,
+                        last_review=datetime(2024, 10, 20, 9, 30, 0), due=now)
+    schedules = [card] + make_schedules(3000, now)
+    ratings = [Rating(random.Random(i).randrange(1, 5)) for i in range(len(schedules))]
+
+    scalar = FSRSScheduler()
+    expected = [scalar.review_card(s, r, now=now)[0] for s, r in zip(schedules, ratings)]
+    result = BatchScheduler(exact=True).review(ScheduleBatch.from_schedules(schedules), np.array(ratings),
+                                               now=now)
+
+    assert expected[0].elapsed_days == result.elapsed_days[0] == 20
+    assert result.to_schedules() == expected
+    # Due dates a whole number of calendar days ahead, across the spring change too
+    spring = datetime(2025, 3, 1, 9, 30, 0)
+    reviewed = BatchScheduler(exact=True).review(ScheduleBatch.from_schedules([card]),
+                                                 np.array([Rating.GOOD]), now=spring)
+    assert reviewed.to_schedules() == [scalar.review_card(card, Rating.GOOD, now=spring)[0]]
+    assert reviewed.to_schedules()[0].due.time() == spring.time()
+
+
+def test_retrievability_and_intervals_match_scalar():
+    now = datetime(2024, 5, 17, 9, 30, 0)
+    schedules = [s for s in make_schedules(2000, now) if s.state != State.NEW]
+    scalar = FSRSScheduler()
+    batch = ScheduleBatch.from_schedules(schedules)
+    engine = BatchScheduler(exact=True)
+
+    retrievability = engine.collection_retrievability(batch, now=now.timestamp())
+    assert retrievability.tolist() == [
+        scalar._calculate_retrievability(s.stability, (now - s.last_review).days) for s in schedules]
+    assert engine.next_interval(batch.stability).tolist() == [
+        scalar._next_interval(s.stability) for s in schedules]
+
+
+def test_batch_from_storage_rows():
+    storage = CardStorage(":memory:")
+    scheduler = FSRSScheduler()
+    storage.bootstrap_schedules([("a", "deck"), ("b", "deck")], scheduler.init_card)
+    schedule, log = scheduler.review_card(storage.get_schedule("b"), Rating.GOOD)
+    storage.record_review(schedule, "deck", log)
+
+    batch = ScheduleBatch.from_rows(storage.iter_rows('schedules'))
+
+    assert sorted(batch.to_schedules(), key=lambda s: s.card_hash) == [
+        storage.get_schedule("a"), storage.get_schedule("b")]
+    assert np.isnan(BatchScheduler().collection_retrievability(batch)).tolist() == [
+        h == "a" for h in batch.card_hash]
+    assert len(ScheduleBatch.from_rows([])) == 0
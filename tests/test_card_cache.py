@@ -0,0 +1,77 @@
+"""Tests for the on-disk parsed-card cache"""
+import argparse
+import pytest
+from unittest.mock import patch
+from hashcards.cache import CardCache
+from hashcards.hasher import CardHasher
+from hashcards.loader import DeckLoader
+from hashcards.parser import Card, CardParser
+
+
+DECK = "Q: What is 2+2?\nA: 4\n\nC: Paris is in [France].\n"
+
+
+def test_warm_start_does_not_parse_or_hash(card_file, tmp_path):
+    card_file(tmp_path, "a.md", DECK)
+    card_file(tmp_path, "sub/b.md", "Q: B?\nA: 2\n")
+    cold = {}
+    DeckLoader(str(tmp_path)).refresh().apply(cold)
+
+    warm = {}
+    with patch.object(CardParser, 'iter_buffer_cards', side_effect=AssertionError("parsed")), \
+            patch.object(CardParser, 'map_file', side_effect=AssertionError("read")), \
+            patch.object(CardHasher, 'hash_card', side_effect=AssertionError("hashed")), \
+            patch.object(CardHasher, 'hash_file', side_effect=AssertionError("hashed")):
+        delta = DeckLoader(str(tmp_path)).refresh()
+    delta.apply(warm)
+
+    assert delta.cache_hits == 2
+    assert list(warm) == list(cold)
+    assert list(warm.values()) == list(cold.values())
+
+
+def test_validate_warms_the_cache_for_the_collection_algorithm(card_file, tmp_path, make_sqlite_storage):
+    card_file(tmp_path, "a.md", DECK)
+    storage = make_sqlite_storage(".hashcards.db")
+    storage.set_meta('hash_algorithm', 'blake2b')
+    storage.close()
+
+    from hashcards.cli import cmd_validate
+    cmd_validate(argparse.Namespace(cards_dir=str(tmp_path), jobs=1))
+    with patch.object(CardParser, 'iter_buffer_cards', side_effect=AssertionError("parsed")):
+        delta = DeckLoader(str(tmp_path), hash_algorithm='blake2b').refresh()
+    assert delta.cache_hits == 1
+
+
+def test_identical_files_share_an_entry_but_keep_their_deck_names(card_file, tmp_path):
+    card_file(tmp_path, "a.md", DECK)
+    card_file(tmp_path, "b.md", DECK)
+    loader = DeckLoader(str(tmp_path))
+    loader.refresh()
+
+    assert len(list((tmp_path / ".hashcards" / "cards").iterdir())) == 1
+    assert {c.deck_name for c in loader.file_cards("b.md")} == {"b"}
+
+
+def test_version_mismatch_and_corrupt_entries_are_misses(tmp_path):
+    cache = CardCache(str(tmp_path))
+    parsed = CardParser.parse_content(DECK, "d")
+    cards = list(zip(Card.hash_all(parsed, "sha256"), parsed))
+    cache.put("abc", cards)
+    assert [c for _, c in cache.get("abc", "d")] == [c for _, c in cards]
+
+    other = CardCache(str(tmp_path))
+    other.version = other.version + ("changed",)
+    assert other.get("abc", "d") is None
+
+    (tmp_path / "abc.cards").write_bytes(b"\x00truncated")
+    assert cache.get("abc", "d") is None
+
+
+def test_prune_removes_entries_of_deleted_decks(card_file, tmp_path):
+    card_file(tmp_path, "a.md", DECK)
+    gone = card_file(tmp_path, "b.md", "Q: B?\nA: 2\n")
+    DeckLoader(str(tmp_path)).refresh()
+    gone.unlink()
+    DeckLoader(str(tmp_path)).refresh()
+    assert len(list((tmp_path / ".hashcards" / "cards").glob("*.cards"))) == 1
@@ -0,0 +1,55 @@
+"""Tests for CLI startup cost"""
+import argparse
+import subprocess
+import sys
+import pytest
+from pathlib import Path
+from hashcards.loader import DeckLoader
+from hashcards.storage import CardStorage
+
+# Seconds from importing the CLI to printing stats; ~0.1s locally, with
+# headroom for slow CI machines
+STATS_STARTUP_BUDGET = 0.5
+
+RUN_STATS = """
+import sys, time
+start = time.perf_counter()
+from hashcards.cli import main
+sys.argv = ['hashcards', 'stats', sys.argv[1]]
+main()
+print('elapsed', time.perf_counter() - start)
+print('heavy', sorted(m for m in ('flask', 'jinja2', 'openai', 'multiprocessing') if m in sys.modules))
+"""
+
+
+def make_collection(directory: Path):
+    (directory / "deck.md").write_text("Q: A?\nA: 1\n")
+    CardStorage(str(directory / ".hashcards.db")).close()
+
+
+def test_stats_does_not_import_web_stack_and_starts_within_budget(tmp_path):
+    make_collection(tmp_path)
+    result = subprocess.run([sys.executable, "-c", RUN_STATS, str(tmp_path)],
+                            capture_output=True, text=True, check=True)
+
+    lines = dict(line.split(' ', 1) for line in result.stdout.splitlines()
+                 if line.startswith(('elapsed', 'heavy')))
+    assert lines['heavy'] == '[]'
+    assert float(lines['elapsed']) < STATS_STARTUP_BUDGET
+
+
+def test_stats_counts_deck_cards_only_from_a_warm_cache(capsys, tmp_path):
+    make_collection(tmp_path)
+    from hashcards.cli import cmd_stats
+
+    cmd_stats(argparse.Namespace(cards_dir=str(tmp_path)))
+    assert "Cards in decks" not in capsys.readouterr().out
+    assert not (tmp_path / ".hashcards").exists()
+
+    DeckLoader(str(tmp_path)).refresh()
+    cmd_stats(argparse.Namespace(cards_dir=str(tmp_path)))
+    assert "Cards in decks:   1" in capsys.readouterr().out
+
+    (tmp_path / "deck.md").write_text("Q: A?\nA: 1\n\nQ: B?\nA: 2\n")
+    cmd_stats(argparse.Namespace(cards_dir=str(tmp_path)))
+    assert "Cards in decks" not in capsys.readouterr().out
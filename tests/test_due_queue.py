@@ -0,0 +1,175 @@
+"""Tests for the in-process due-card queue"""
+import random
+import threading
+import pytest
+from dataclasses import replace
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from hashcards.due_queue import COMPACT_SLACK, DueQueue
+from hashcards.memory_storage import MemoryStorage
+from hashcards.scheduler import CardSchedule, Rating, State
+from hashcards.storage import CardStorage
+
+
+def make_schedule(card_hash: str, due: datetime, state: State = State.REVIEW,
+                  stability: float = 10.0, last_review: datetime = None) -> CardSchedule:
+    return CardSchedule(
+        card_hash=card_hash, state=state, stability=stability, difficulty=5.0,
+        elapsed_days=0, scheduled_days=1, reps=1, lapses=0,
+        last_review=last_review or due - timedelta(days=1), due=due
+    )
+
+
+def drain(queue: DueQueue, decks: dict, deck_name=None, now=None) -> list:
+    """Study every due card in order, rescheduling each a year ahead"""
+    studied = []
+    while True:
+        card_hash = queue.next(deck_name, now=now)
+        if card_hash is None:
+            return studied
+        studied.append(card_hash)
+        schedule = queue.get(card_hash)
+        queue.put(replace(schedule, due=schedule.due + timedelta(days=365)), decks[card_hash])
+
+
+def test_queue_matches_storage_due_order():
+    rng = random.Random(3)
+    now = datetime.now().replace(microsecond=0)
+    storage = MemoryStorage()
+    queue = DueQueue()
+    decks = {}
+    for i in range(300):
+        # Well clear of `now`, which storage reads from the clock
+        offset = rng.choice([-1, 1]) * rng.randint(120, 5000)
+        schedule = make_schedule(f"h{i:03d}", now + timedelta(seconds=offset))
+        decks[schedule.card_hash] = rng.choice(["a", "b", "c"])
+        storage.save_schedule(schedule, decks[schedule.card_hash])
+        queue.put(schedule, decks[schedule.card_hash])
+    due = storage.get_due_cards()
+    all_by_due = sorted(decks, key=lambda h: (storage.get_schedule(h).due, h))
+
+    assert queue.next("b", now=now) == storage.get_due_cards("b", limit=1)[0]
+    assert drain(queue, decks, "b", now=now) == storage.get_due_cards("b")
+    assert drain(queue, decks, now=now) == [h for h in due if decks[h] != "b"]
+    # Time passes: the other cards come due, in order
+    later = now + timedelta(seconds=6000)
+    assert drain(queue, decks, now=later) == [h for h in all_by_due if h not in due]
+    assert len(queue) == 300
+
+
+def test_retrievability_order_and_requeue():
+    now = datetime(2024, 3, 1, 12)
+    queue = DueQueue(order='retrievability')
+    queue.put_many([
+        (make_schedule("new", now - timedelta(days=3), state=State.NEW, stability=0.0), "d"),
+        (make_schedule("strong", now, stability=100.0, last_review=now - timedelta(days=10)), "d"),
+        (make_schedule("weak", now, stability=2.0, last_review=now - timedelta(days=10)), "d"),
+        (make_schedule("learning", now, state=State.LEARNING), "e"),
+        (make_schedule("later", now + timedelta(hours=2), stability=0.5,
+                       last_review=now - timedelta(days=10)), "d"),
+    ], now=now)
+
+    decks = {"new": "d", "strong": "d", "weak": "d", "learning": "e", "later": "d"}
+    assert drain(queue, decks, "d", now=now) == ["weak", "strong", "new"]
+    assert queue.next(now=now) == "learning"
+    # A review puts the card back with its new due time
+    queue.put(replace(queue.get("learning"), due=now + timedelta(minutes=10)), "e")
+    assert queue.next(now=now) is None
+    # Learning steps first
+    assert queue.next(now=now + timedelta(hours=3)) == "learning"
+    queue.remove(["learning"])
+    assert queue.next(now=now + timedelta(hours=3)) == "later"
+
+    with pytest.raises(ValueError):
+        DueQueue(order='random')
+
+
+def test_stale_entries_of_decks_never_studied_alone_are_compacted():
+    now = datetime(2024, 3, 1, 12)
+    queue = DueQueue()
+    queue.put_many([(make_schedule(f"h{i}", now - timedelta(minutes=i)), f"d{i % 5}")
+                    for i in range(100)], now=now)
+
+    # Study all decks together, each card due again right away
+    for _ in range(5000):
+        card_hash = queue.next(now=now)
+        previous = queue.get(card_hash)
+        assert queue.requeue(previous, replace(previous, due=now), f"d{int(card_hash[1:]) % 5}")
+    entries = len(queue._waiting) + sum(len(heap) for heap in queue._ready.values())
+    assert entries <= 4 * len(queue) + COMPACT_SLACK
+
+    decks = {f"h{i}": f"d{i % 5}" for i in range(100)}
+    assert sorted(drain(queue, decks, "d3", now=now)) == sorted(h for h, d in decks.items() if d == "d3")
+
+
+def test_study_and_review_use_the_queue_not_the_database(card_file, tmp_path):
+    card_file(tmp_path, "deck.md", "Q: First?\nA: 1\n\nQ: Second?\nA: 2\n")
+    card_file(tmp_path, "other.md", "Q: Other?\nA: 3\n")
+
+    from hashcards.web.app import HashcardsApp
+    app = HashcardsApp(str(tmp_path), db_path=str(tmp_path / ".test.db"))
+    client = app.app.test_client()
+    with patch.object(CardStorage, 'get_due_cards', side_effect=AssertionError("due query")), \
+            patch.object(CardStorage, 'get_schedule', side_effect=AssertionError("schedule query")):
+        seen = []
+        for _ in range(2):
+            resp = client.get('/study/deck')
+            card_hash = resp.data.split(b'name="card_hash" value="')[1].split(b'"')[0].decode()
+            seen.append(card_hash)
+            client.post('/review', data={'card_hash': card_hash, 'rating': Rating.GOOD,
+                                         'deck_name': 'deck'})
+        assert b"No cards due" in client.get('/study/deck').data
+        assert b"Other?" in client.get('/study').data
+
+    assert len(set(seen)) == 2
+    storage = app.storage
+    assert all(storage.get_schedule(h).state == State.REVIEW for h in seen)
+    assert app.queue.get(seen[0]).reps == storage.get_schedule(seen[0]).reps == 1
+
+    # Changes made behind the app's back show up after a reload
+    storage.save_schedule(replace(storage.get_schedule(seen[0]), due=datetime.now()), "deck")
+    assert app.queue.next('deck') is None
+    client.get('/api/reload')
+    assert app.queue.next('deck') == seen[0]
+
+
+def test_study_drops_queue_entries_of_uncached_cards(card_file, tmp_path):
+    card_file(tmp_path, "deck.md", "Q: Real?\nA: Yes\n")
+
+    from hashcards.web.app import HashcardsApp
+    app = HashcardsApp(str(tmp_path), db_path="memory://")
+    # As left by a review that raced a reload removing its card
+    app.queue.put(make_schedule("ghost", datetime(2000, 1, 1)), "deck")
+
+    resp = app.app.test_client().get('/study/deck')
+    assert b"Real?" in resp.data
+    assert app.queue.get("ghost") is None
+    client = app.app.test_client()
+    client.post('/review', data={'card_hash': 'ghost', 'rating': Rating.GOOD, 'deck_name': 'deck'})
+    assert app.queue.get("ghost") is None
+
+
+def test_review_racing_a_load_does_not_requeue_a_removed_card(card_file, tmp_path):
+    deck = card_file(tmp_path, "deck.md", "Q: Gone?\nA: Soon\n")
+
+    from hashcards.web.app import HashcardsApp
+    app = HashcardsApp(str(tmp_path), db_path="memory://")
+    card_hash = app.queue.next('deck')
+    record_review = app.storage.record_review
+
+    def edited_while_saving(*args):
+        # The load runs in its own thread: the review must not hold the reload lock
+        deck.write_text("Q: New?\nA: Card\n")
+        loader = threading.Thread(target=app._load_all_cards)
+        loader.start()
+        loader.join(timeout=10)
+        assert not loader.is_alive()
+        record_review(*args)
+
+    with patch.object(app.storage, 'record_review', side_effect=edited_while_saving):
+        resp = app.app.test_client().post('/review', data={'card_hash': card_hash,
+                                                           'rating': Rating.GOOD, 'deck_name': 'deck'})
+    assert resp.status_code == 302
+    assert app.queue.get(card_hash) is None
+    assert card_hash not in app.cards_cache
+    assert app.cards_cache[app.queue.next('deck')].question == "New?"
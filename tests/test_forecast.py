@@ -0,0 +1,85 @@
+"""Tests for the review-workload forecast"""
+import json
+import pytest
+from datetime import datetime, timedelta
+from hashcards.batch_scheduler import ScheduleBatch
+from hashcards.forecast import RatingMix, add_new_cards, forecast, simulate
+from hashcards.scheduler import CardSchedule, FSRSScheduler, Rating, State
+
+# Every card recalled with GOOD, never sent back to a learning step
+ALWAYS_GOOD = RatingMix(learn_again=0.0, recalled=(0.0, 1.0, 0.0))
+
+
+def mature_card(card_hash: str, now: datetime, due_in_days: int) -> CardSchedule:
+    """A review card so stable its next interval is beyond any forecast"""
+    return CardSchedule(
+        card_hash=card_hash, state=State.REVIEW, stability=20000.0, difficulty=5.0,
+        elapsed_days=0, scheduled_days=10, reps=5, lapses=0,
+        last_review=now - timedelta(days=10), due=now + timedelta(days=due_in_days)
+    )
+
+
+def test_cards_are_counted_on_their_due_day():
+    now = datetime(2024, 5, 17, 9, 30)
+    schedules = [mature_card("a", now, -3), mature_card("b", now, 2), mature_card("c", now, 2),
+                 mature_card("d", now, 40)]
+    batch = ScheduleBatch.from_schedules(schedules)
+
+    result = simulate(batch, ["x", "x", "y", "y"], days=7, runs=3, seed=1, start=now,
+                      mix=ALWAYS_GOOD)
+
+    assert result.days[0] == "2024-05-17"
+    assert result.reviews == [1, 0, 2, 0, 0, 0, 0]
+    assert result.by_deck == {"x": [1, 0, 1, 0, 0, 0, 0], "y": [0, 0, 1, 0, 0, 0, 0]}
+
+
+def test_new_cards_are_introduced_per_deck_per_day():
+    now = datetime(2024, 5, 17, 9, 30)
+    scheduler = FSRSScheduler()
+    batch = ScheduleBatch.from_schedules([scheduler.init_card(f"h{i}") for i in range(30)])
+    batch, decks = add_new_cards(batch, ["old"] * 30, 50, "added", now=now)
+
+    result = simulate(batch, decks, days=2, runs=2, new_per_day=10, start=now, mix=ALWAYS_GOOD)
+    assert result.by_deck == {"added": [10, 10], "old": [10, 10]}
+
+    # Failed first reviews come back the same day
+    again = simulate(batch, decks, days=1, runs=4, new_per_day=10, start=now, seed=3,
+                     mix=RatingMix(learn_again=0.5))
+    assert again.reviews[0] > 20
+    assert simulate(batch, decks, days=2, new_per_day=0, start=now).reviews == [0, 0]
+
+
+def test_rating_mix_comes_from_history_once_there_is_enough():
+    assert RatingMix.from_counts({}) == RatingMix()
+    counts = {(State.NEW, Rating.AGAIN): 30, (State.NEW, Rating.GOOD): 70,
+              (State.REVIEW, Rating.HARD): 30, (State.REVIEW, Rating.GOOD): 100}
+    mix = RatingMix.from_counts(counts)
+    assert mix.learn_again == 0.3
+    # Recalled ratings of every state
+    assert mix.recalled == (0.15, 0.85, 0.0)
+
+
+def test_rating_counts_by_state(storage):
+    scheduler = FSRSScheduler()
+    storage.bootstrap_schedules([("a", "deck"), ("b", "deck")], scheduler.init_card)
+    for card_hash, rating in (("a", Rating.AGAIN), ("a", Rating.GOOD), ("b", Rating.GOOD)):
+        schedule, log = scheduler.review_card(storage.get_schedule(card_hash), rating)
+        storage.record_review(schedule, "deck", log)
+
+    assert storage.get_rating_counts() == {
+        (State.NEW, Rating.AGAIN): 1, (State.LEARNING, Rating.GOOD): 1, (State.NEW, Rating.GOOD): 1}
+
+
+def test_forecast_from_storage_and_api(card_file, tmp_path):
+    card_file(tmp_path, "deck.md", "Q: One?\nA: 1\n\nQ: Two?\nA: 2\n")
+
+    from hashcards.web.app import HashcardsApp
+    app = HashcardsApp(str(tmp_path), db_path=str(tmp_path / ".test.db"))
+    result = forecast(app.storage, days=5, add_cards=40, add_deck="extra", seed=1)
+    assert set(result.by_deck) == {"deck", "extra"}
+    assert sum(result.by_deck["extra"]) >= 5 * 20
+
+    resp = app.app.test_client().get('/api/forecast?days=3&add_cards=10')
+    data = json.loads(resp.data)
+    assert len(data['days']) == len(data['reviews']) == 3
+    assert set(data['by_deck']) == {"deck", "(new deck)"}
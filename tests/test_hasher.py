@@ -0,0 +1,53 @@
+"""Tests for batched, pluggable card hashing and hash migration"""
+import pytest
+from hashcards.hasher import CardHasher
+from hashcards.loader import DeckLoader
+from hashcards.scheduler import FSRSScheduler, Rating
+
+TEXTS = ["Q: What is 2+2?\nA: 4", "C:  Paris  is in\t[France]. ", "Q: Ünïcödé?　\nA: yes"]
+
+
+@pytest.mark.parametrize("algorithm", ["sha256", "blake2b"])
+def test_batch_matches_single_card_hashing(algorithm):
+    batch = CardHasher.hash_cards(TEXTS, algorithm)
+    assert batch == [CardHasher.hash_card(t, algorithm) for t in TEXTS]
+    assert all(len(h) == 16 for h in batch)
+
+
+@pytest.mark.parametrize("text", ["Q: a\nA: b", "Q: a \nA: b", "\nQ: a", "Q: a\n", "Q:\ta",
+                                  "Q: a\r\nA: b", "Q: a\u3000b", "Q: a\xa0b", "Q: a\x1cb", "", " "])
+def test_normalization_fast_path_matches_split_and_join(text):
+    expected = CardHasher.hash_cards([" ".join(text.split())])
+    assert CardHasher.hash_cards([text]) == [CardHasher.hash_card(text)] == expected
+
+
+def test_algorithms_differ_and_unknown_is_rejected():
+    assert CardHasher.hash_card(TEXTS[0]) == CardHasher.hash_card(TEXTS[0], "sha256")
+    assert CardHasher.hash_card(TEXTS[0], "blake2b") != CardHasher.hash_card(TEXTS[0])
+    with pytest.raises(ValueError):
+        CardHasher.hash_cards(TEXTS, "md4")
+
+
+def test_rehash_keeps_schedules_and_history(tmp_path, make_sqlite_storage):
+    (tmp_path / "deck.md").write_text("Q: A?\nA: 1\n\nQ: B?\nA: 2\n")
+    storage = make_sqlite_storage(".hashcards.db")
+    scheduler = FSRSScheduler()
+
+    old = DeckLoader(str(tmp_path)).refresh().updated
+    storage.bootstrap_schedules(((h, c.deck_name) for h, c in old.items()), scheduler.init_card)
+    first = next(iter(old))
+    reviewed, log = scheduler.review_card(storage.get_schedule(first), Rating.GOOD)
+    storage.save_schedule(reviewed, "deck")
+    storage.log_review(log)
+
+    new = DeckLoader(str(tmp_path), hash_algorithm="blake2b").refresh().updated
+    mapping = zip(old, CardHasher.hash_cards((c.raw_text for c in old.values()), "blake2b"))
+    assert storage.rehash_cards(mapping, "blake2b") == 2
+
+    assert storage.get_meta("hash_algorithm") == "blake2b"
+    assert storage.get_schedule(first) is None
+    moved = storage.get_schedule(CardHasher.hash_card(old[first].raw_text, "blake2b"))
+    assert moved.reps == reviewed.reps
+    rows = storage.conn.execute("SELECT card_hash FROM reviews").fetchall()
+    assert [r['card_hash'] for r in rows] == [moved.card_hash]
+    assert {row[0] for row in storage.conn.execute("SELECT card_hash FROM schedules")} == set(new)
@@ -0,0 +1,35 @@
+"""Tests for load-balanced review intervals"""
+from collections import Counter
+from datetime import datetime, timedelta
+from hashcards.memory_storage import MemoryStorage
+from hashcards.scheduler import FSRSScheduler, Rating
+
+
+def learn_together(storage, scheduler: FSRSScheduler, cards: int, now: datetime) -> Counter:
+    """Learn `cards` new cards at once; returns cards due per day"""
+    storage.bootstrap_schedules([(f"h{i}", "deck") for i in range(cards)], scheduler.init_card)
+    for i in range(cards):
+        schedule, log = scheduler.review_card(storage.get_schedule(f"h{i}"), Rating.EASY, now=now)
+        storage.record_review(schedule, "deck", log)
+    return Counter(schedule.due.date() for schedule in storage.iter_schedules())
+
+
+def test_cards_learned_together_spread_over_the_fuzz_window(make_sqlite_storage):
+    now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    storage = make_sqlite_storage()
+    balanced = FSRSScheduler(due_counts=storage.get_due_counts)
+    by_day = learn_together(storage, balanced, 60, now)
+
+    # EASY on a new card: 5.8 days ideal, 4 to 7 days allowed
+    low, high = balanced._fuzz_range(FSRSScheduler.DEFAULT_PARAMS['w'][3])
+    assert (low, high) == (4, 7)
+    assert sorted(by_day) == [now.date() + timedelta(days=d) for d in range(low, high + 1)]
+    assert max(by_day.values()) - min(by_day.values()) <= 1
+    assert storage.get_due_counts(now.date(), 10) == [by_day.get(now.date() + timedelta(days=d), 0)
+                                                      for d in range(10)]
+
+    # Off by default: every card lands on the ideal day
+    plain = learn_together(MemoryStorage(), FSRSScheduler(), 60, now)
+    assert plain == {now.date() + timedelta(days=6): 60}
+    # Short intervals are never moved
+    assert FSRSScheduler(due_counts=lambda start, days: [0] * days)._next_interval(2.0, now) == 2
@@ -0,0 +1,98 @@
+"""Tests for manifest-driven incremental deck loading"""
+import os
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from hashcards.loader import DeckLoader
+from hashcards.manifest import DeckManifest
+from hashcards.parser import CardParser
+
+
+def bump_mtime(path: Path):
+    """Force a visible mtime change regardless of filesystem granularity"""
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+
+
+def test_refresh_only_reparses_changed_files(card_file, tmp_path):
+    card_file(tmp_path, "a.md", "Q: A?\nA: 1\n")
+    b = card_file(tmp_path, "b.md", "Q: B?\nA: 2\n")
+    loader = DeckLoader(str(tmp_path))
+    cache = {}
+    loader.refresh().apply(cache)
+    assert len(cache) == 2
+
+    b.write_text("Q: B?\nA: 2\n\nQ: B2?\nA: 3\n")
+    bump_mtime(b)
+    with patch.object(CardParser, 'iter_buffer_cards', wraps=CardParser.iter_buffer_cards) as spy, \
+            patch.object(CardParser, 'map_file', wraps=CardParser.map_file) as mapped:
+        delta = loader.refresh()
+    assert delta.files_parsed == ["b.md"]
+    assert spy.call_count == 1
+    # Digest and cards come from a single mapping of the file
+    assert mapped.call_count == 1
+    delta.apply(cache)
+    assert len(cache) == 3
+
+
+def test_refresh_removes_cards_of_deleted_files(card_file, tmp_path):
+    card_file(tmp_path, "keep.md", "Q: Keep?\nA: Yes\n")
+    gone = card_file(tmp_path, "sub/gone.md", "Q: Gone?\nA: Yes\n")
+    loader = DeckLoader(str(tmp_path))
+    cache = {}
+    loader.refresh().apply(cache)
+
+    gone.unlink()
+    delta = loader.refresh()
+    delta.apply(cache)
+    assert delta.files_removed == ["sub/gone.md"]
+    assert [c.deck_name for c in cache.values()] == ["keep"]
+
+
+def test_touched_file_is_not_reparsed(card_file, tmp_path):
+    a = card_file(tmp_path, "a.md", "Q: A?\nA: 1\n")
+    loader = DeckLoader(str(tmp_path))
+    loader.refresh()
+
+    bump_mtime(a)
+    delta = loader.refresh()
+    assert delta.files_parsed == []
+    assert not delta.updated and not delta.removed
+
+
+def test_duplicate_card_first_path_wins_and_survives_deletion(card_file, tmp_path):
+    card_file(tmp_path, "a.md", "Q: Same?\nA: Yes\n")
+    b = card_file(tmp_path, "b.md", "Q: Same?\nA: Yes\n")
+    loader = DeckLoader(str(tmp_path))
+    cache = {}
+    loader.refresh().apply(cache)
+    assert [c.deck_name for c in cache.values()] == ["a"]
+
+    (tmp_path / "a.md").unlink()
+    loader.refresh().apply(cache)
+    assert [c.deck_name for c in cache.values()] == ["b"]
+
+
+def test_manifest_is_persisted(card_file, tmp_path):
+    card_file(tmp_path, "a.md", "Q: A?\nA: 1\n")
+    DeckLoader(str(tmp_path)).refresh()
+
+    manifest = DeckManifest(str(tmp_path / ".hashcards" / "manifest.json"))
+    entry = manifest.get("a.md")
+    assert entry is not None
+    assert entry.size == (tmp_path / "a.md").stat().st_size
+
+
+def test_parallel_load_matches_serial_load(card_file, tmp_path):
+    for i in range(12):
+        card_file(tmp_path, f"d{i % 3}/deck{i}.md",
+                  f"Q: Shared?\nA: Yes\n\nQ: Own {i}?\nA: {i}\n\nC: Cloze [{i}].\n")
+
+    serial, parallel = {}, {}
+    DeckLoader(str(tmp_path), manifest_path=str(tmp_path / "serial.json")).refresh().apply(serial)
+    DeckLoader(str(tmp_path), manifest_path=str(tmp_path / "parallel.json"),
+               jobs=3).refresh().apply(parallel)
+
+    assert list(serial) == list(parallel)
+    assert [c.deck_name for c in serial.values()] == [c.deck_name for c in parallel.values()]
+    assert len(serial) == 1 + 12 * 2
@@ -0,0 +1,64 @@
+"""Tests for backend selection and in-memory/SQLite parity"""
+import random
+import pytest
+from datetime import datetime, timedelta
+from hashcards.memory_storage import MemoryStorage
+from hashcards.storage import CardStorage, open_storage
+from hashcards.scheduler import CardSchedule, State
+
+
+def test_open_storage_selects_backend_by_url(tmp_path):
+    db_path = str(tmp_path / "cards.db")
+    assert isinstance(open_storage("memory://"), MemoryStorage)
+    for url in (db_path, f"sqlite:///{db_path}"):
+        storage = open_storage(url)
+        assert isinstance(storage, CardStorage)
+        assert storage.db_path == db_path
+        storage.close()
+    with pytest.raises(ValueError):
+        open_storage("postgres://localhost/cards")
+
+
+def test_due_order_and_deck_stats_match_sqlite(make_sqlite_storage):
+    rng = random.Random(7)
+    now = datetime.now()
+    backends = [make_sqlite_storage(), MemoryStorage()]
+    for i in range(300):
+        schedule = CardSchedule(
+            card_hash=f"h{i:03d}", state=rng.choice(list(State)),
+            stability=rng.uniform(0.5, 30), difficulty=rng.uniform(1, 10),
+            elapsed_days=0, scheduled_days=1, reps=1, lapses=rng.randrange(3),
+            last_review=None,
+            # Whole-minute offsets, so many cards share a due time
+            due=now + timedelta(minutes=rng.randrange(-50, 50))
+        )
+        deck = rng.choice(["a", "b", "c"])
+        for storage in backends:
+            storage.save_schedule(schedule, deck)
+    for storage in backends:
+        storage.delete_card("h000")
+        storage.save_schedule(storage.get_schedule("h001"), "c")
+
+    sqlite, memory = backends
+    assert memory.get_due_cards() == sqlite.get_due_cards()
+    assert memory.get_due_cards("b", limit=7) == sqlite.get_due_cards("b", limit=7)
+    assert memory.get_stats("a") == sqlite.get_stats("a")
+    assert sorted(memory.iter_schedules(), key=lambda s: s.card_hash) == \
+        sorted(sqlite.iter_schedules(), key=lambda s: s.card_hash) == \
+        list(sqlite.get_schedules(f"h{i:03d}" for i in range(1, 300)).values())
+    assert memory.get_deck_stats() == sqlite.get_deck_stats()
+    start = now.date() - timedelta(days=1)
+    assert memory.get_due_counts(start, 3) == sqlite.get_due_counts(start, 3)
+    assert sum(sqlite.get_due_counts(start, 3)) == \
+        sum(1 for s in sqlite.iter_schedules() if s.state != State.NEW)
+
+
+def test_app_runs_on_memory_backend(card_file, tmp_path):
+    card_file(tmp_path, "deck.md", "Q: In memory?\nA: Yes\n")
+
+    from hashcards.web.app import HashcardsApp
+    app = HashcardsApp(str(tmp_path), db_path="memory://")
+
+    resp = app.app.test_client().get('/study')
+    assert b"In memory?" in resp.data
+    assert not (tmp_path / ".hashcards.db").exists()
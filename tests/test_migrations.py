@@ -0,0 +1,82 @@
+"""Tests for versioned schema migrations"""
+import argparse
+import sqlite3
+import pytest
+from datetime import datetime, timedelta
+from pathlib import Path
+from hashcards.migrations import SCHEMA_VERSION, _v1_initial_schema
+from hashcards.storage import CardStorage
+
+
+def make_legacy_db(path: Path, due: datetime, reviewed: datetime):
+    """A database as written before versioning: ISO TEXT timestamps, user_version 0"""
+    conn = sqlite3.connect(str(path))
+    _v1_initial_schema(conn.cursor())
+    conn.execute("""
+        INSERT INTO schedules VALUES ('h1', 'deck', 2, 3.0, 5.0, 1, 4, 2, 0, ?, ?, ?, ?)
+    """, (reviewed.isoformat(), due.isoformat(), reviewed.isoformat(), reviewed.isoformat()))
+    conn.execute("""
+        INSERT INTO reviews (card_hash, rating, state, review_time, scheduled_days, elapsed_days)
+        VALUES ('h1', 3, 2, ?, 4, 1)
+    """, (reviewed.isoformat(),))
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_database_is_migrated_in_place(tmp_path):
+    db_path = tmp_path / ".hashcards.db"
+    reviewed = datetime.now().replace(microsecond=0)
+    due = reviewed - timedelta(hours=1)
+    make_legacy_db(db_path, due, reviewed)
+
+    storage = CardStorage(str(db_path))
+    assert storage.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+    schedule = storage.get_schedule("h1")
+    assert (schedule.due, schedule.last_review, schedule.reps) == (due, reviewed, 2)
+    assert storage.get_due_cards("deck") == ["h1"]
+    assert storage.get_stats()['reviews_today'] == 1
+    assert storage.get_review_history(days=1) == {reviewed.date().isoformat(): 1}
+    assert storage.conn.execute("SELECT typeof(review_time) FROM reviews").fetchone()[0] == 'integer'
+    storage.set_meta('hash_algorithm', 'sha256')
+    assert storage.get_meta('hash_algorithm') == 'sha256'
+    storage.close()
+
+    # Reopening does not migrate again
+    storage = CardStorage(str(db_path))
+    assert storage.get_schedule("h1").due == due
+    storage.close()
+
+
+def test_deck_due_query_is_an_index_only_range_scan(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    plan = storage.conn.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT card_hash FROM schedules WHERE deck_name = ? AND due <= ? ORDER BY due
+    """, ("deck", 0)).fetchall()
+    details = " ".join(row[-1] for row in plan)
+    assert "COVERING INDEX idx_schedules_deck_due (deck_name=? AND due<?)" in details
+    assert "TEMP B-TREE" not in details
+
+
+def test_newer_schema_is_refused(tmp_path):
+    db_path = tmp_path / ".hashcards.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    conn.close()
+    with pytest.raises(RuntimeError):
+        CardStorage(str(db_path))
+
+
+def test_validate_reads_a_legacy_database_without_migrating_it(tmp_path):
+    (tmp_path / "deck.md").write_text("Q: A?\nA: 1\n")
+    db_path = tmp_path / ".hashcards.db"
+    make_legacy_db(db_path, datetime(2024, 1, 2), datetime(2024, 1, 1))
+    db_bytes = db_path.read_bytes()
+    conn = sqlite3.connect(str(db_path))
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'meta'").fetchall()
+    conn.close()
+
+    from hashcards.cli import cmd_validate
+    cmd_validate(argparse.Namespace(cards_dir=str(tmp_path), jobs=1))
+    assert db_path.read_bytes() == db_bytes
@@ -0,0 +1,109 @@
+"""Tests for fitting FSRS weights to the review history"""
+import json
+import math
+import random
+import pytest
+from datetime import datetime, timedelta
+from hashcards.optimizer import (FITTED_THROUGH_META_KEY, fit, load_history, log_loss,
+                                 optimize, saved_weights)
+from hashcards.scheduler import WEIGHTS_META_KEY, FSRSScheduler, Rating, State
+from hashcards.storage import CardStorage
+
+# Learners whose first reviews hold much longer than the default weights expect
+TRUE_WEIGHTS = list(FSRSScheduler.DEFAULT_PARAMS['w'])
+TRUE_WEIGHTS[2], TRUE_WEIGHTS[8], TRUE_WEIGHTS[10] = 8.0, 1.0, 1.5
+
+
+def record_history(storage: CardStorage, weights, cards: int, days: int, seed: int = 1,
+                   start: datetime = datetime(2024, 1, 1), prefix: str = "c") -> list:
+    """
+    Review `cards` new cards daily for `days` days, recalled with the
+    retrievability `weights` predict
+
+    Returns:
+        Log-loss of each review made in the review state, computed with
+        the scalar scheduler
+    """
+    rng = random.Random(seed)
+    scheduler = FSRSScheduler.with_weights(weights)
+    schedules = [scheduler.init_card(f"{prefix}{i}") for i in range(cards)]
+    for schedule in schedules:
+        schedule.due = start
+    losses = []
+    for day in range(days):
+        now = start + timedelta(days=day, hours=9)
+        for i, schedule in enumerate(schedules):
+            # Learning steps come back within the hour
+            while schedule.due <= now + timedelta(hours=1):
+                now = max(now, schedule.due)
+                if schedule.state == State.REVIEW:
+                    p = scheduler._calculate_retrievability(
+                        schedule.stability, (now - schedule.last_review).days)
+                    recalled = rng.random() < p
+                    losses.append(-math.log(p if recalled else 1 - p))
+                else:
+                    recalled = rng.random() < 0.8
+                schedule, log = scheduler.review_card(
+                    schedule, Rating.GOOD if recalled else Rating.AGAIN, now=now)
+                storage.record_review(schedule, "deck", log)
+            schedules[i] = schedule
+    return losses
+
+
+def test_replay_matches_the_scalar_scheduler(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    losses = record_history(storage, TRUE_WEIGHTS, cards=50, days=120)
+    history = load_history(storage)
+
+    loss, count = log_loss(history, TRUE_WEIGHTS)
+    assert count == len(losses)
+    assert loss == pytest.approx(sum(losses) / len(losses), rel=1e-9)
+    assert history.cards == 50
+    assert history.length.sum() == len(history) > count
+
+
+def test_fit_recovers_the_loss_of_the_true_weights(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    record_history(storage, TRUE_WEIGHTS, cards=300, days=200)
+    history = load_history(storage)
+    true_loss, _ = log_loss(history, TRUE_WEIGHTS)
+
+    result = fit(history, seed=0)
+
+    assert result.improved
+    assert result.loss_before == pytest.approx(log_loss(history, FSRSScheduler.DEFAULT_PARAMS['w'])[0])
+    assert result.loss_after < true_loss + 0.005
+    # Easy first reviews: a longer initial stability for GOOD
+    assert result.weights[2] > FSRSScheduler.DEFAULT_PARAMS['w'][2]
+    assert result.weights[7] == FSRSScheduler.DEFAULT_PARAMS['w'][7]
+
+
+def test_optimize_saves_weights_and_refits_new_reviews_only(card_file, tmp_path, make_sqlite_storage):
+    card_file(tmp_path, "deck.md", "Q: Fitted?\nA: Yes\n")
+    storage = make_sqlite_storage()
+    record_history(storage, TRUE_WEIGHTS, cards=300, days=150)
+
+    first = optimize(storage, seed=0)
+    assert not first.incremental
+    assert saved_weights(storage) == first.weights
+    assert float(storage.get_meta(FITTED_THROUGH_META_KEY)) == first.fitted_through
+    # Nothing new to fit on
+    with pytest.raises(ValueError):
+        optimize(storage)
+
+    record_history(storage, TRUE_WEIGHTS, cards=300, days=60, seed=2,
+                   start=datetime(2024, 6, 1), prefix="n")
+    second = optimize(storage, seed=0, save=False)
+    assert second.incremental
+    assert second.loss_before == pytest.approx(
+        log_loss(load_history(storage), first.weights, since=first.fitted_through)[0])
+    assert second.reviews < len(load_history(storage))
+    assert saved_weights(storage) == first.weights
+    storage.close()
+
+    from hashcards.web.app import HashcardsApp
+    app = HashcardsApp(str(tmp_path), db_path=str(tmp_path / ".test.db"))
+    assert app.scheduler.w == first.weights
+    assert json.loads(app.storage.get_meta(WEIGHTS_META_KEY)) == first.weights
+    assert HashcardsApp(str(tmp_path), db_path="memory://").scheduler.w == \
+        FSRSScheduler.DEFAULT_PARAMS['w']
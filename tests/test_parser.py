@@ -0,0 +1,103 @@
+"""Tests for the single-pass card parser"""
+import io
+import time
+import pytest
+from hashcards.parser import Card, CardParser, CardType
+from hashcards.hasher import CardHasher
+
+DECK = """# Heading
+
+Q: What is 2+2?
+A: 4
+
+C: The capital of France is [Paris].
+
+Q: Multi-line
+question?
+
+A: Yes
+
+Q: Formula?
+A:
+E = mc^2
+
+C: No deletions here.
+C:
+Wrapped [cloze] text.
+"""
+
+
+def test_cards_are_yielded_in_document_order():
+    cards = CardParser.parse_content(DECK, "deck")
+    assert [(c.card_type, c.line_number) for c in cards] == [
+        (CardType.QA, 3),
+        (CardType.CLOZE, 6),
+        (CardType.QA, 8),
+        (CardType.QA, 13),
+        (CardType.CLOZE, 18),
+    ]
+
+
+def test_card_fields_and_hashes():
+    cards = CardParser.parse_content(DECK, "deck")
+    assert cards[0].content == {"question": "What is 2+2?", "answer": "4"}
+    assert cards[1].content["deletions"] == ["Paris"]
+    assert cards[2].content["question"] == "Multi-line\nquestion?"
+    assert cards[3].content["answer"] == "E = mc^2"
+    assert cards[4].content["text"] == "Wrapped [cloze] text."
+    with pytest.raises(ValueError):
+        cards[0].get_hash()
+    Card.hash_all(cards, "blake2b")
+    assert cards[0].get_hash() == CardHasher.hash_card("Q: What is 2+2?\nA: 4", "blake2b")
+    assert cards[2].get_hash() == CardHasher.hash_card("Q: Multi-line\nquestion?\n\nA: Yes", "blake2b")
+
+
+def test_unmatched_question_is_abandoned_by_next_question():
+    cards = CardParser.parse_content("Q: lost\nQ: kept\nA: answer\n")
+    assert len(cards) == 1
+    assert cards[0].content["question"] == "kept"
+    assert cards[0].line_number == 2
+
+
+def test_iter_cards_accepts_streams_and_paths(tmp_path):
+    stream_cards = list(CardParser.iter_cards(io.StringIO(DECK), deck_name="s"))
+    assert len(stream_cards) == 5
+    assert all(c.deck_name == "s" for c in stream_cards)
+
+    path = tmp_path / "physics.md"
+    path.write_text(DECK, encoding='utf-8')
+    it = CardParser.iter_cards(path)
+    first = next(it)
+    assert first.deck_name == "physics"
+    assert len([first] + list(it)) == 5
+
+
+def test_pathological_unmatched_questions_parse_in_linear_time():
+    content = "\n".join(f"Q: dangling {i}?" for i in range(50_000)) + "\nA: end\n"
+    start = time.perf_counter()
+    cards = CardParser.parse_content(content)
+    elapsed = time.perf_counter() - start
+    assert len(cards) == 1
+    assert elapsed < 2.0
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"])
+def test_mapped_bytes_parse_like_text(newline, tmp_path):
+    content = DECK.replace("\n", newline) + "Q:\u00a0\nnbsp question\nA: \u3000全角\n"
+    path = tmp_path / "deck.md"
+    path.write_bytes(content.encode('utf-8'))
+    text_cards = CardParser.parse_content(content.replace("\r\n", "\n").replace("\r", "\n"), "d")
+    with CardParser.map_file(path) as buf:
+        byte_cards = list(CardParser.iter_buffer_cards(buf, "d"))
+        assert CardHasher.hash_buffer(buf) == CardHasher.hash_file(path)
+
+    assert Card.hash_all(byte_cards, "sha256") == Card.hash_all(text_cards, "sha256")
+    assert [c.line_number for c in byte_cards] == [c.line_number for c in text_cards]
+
+
+def test_empty_file_maps_to_no_cards(tmp_path):
+    path = tmp_path / "empty.md"
+    path.write_bytes(b"")
+    with CardParser.map_file(path) as buf:
+        assert list(CardParser.iter_buffer_cards(buf, "empty")) == []
+        assert CardHasher.hash_buffer(buf) == CardHasher.hash_file(path)
@@ -0,0 +1,122 @@
+"""Tests for set-based orphan reconciliation"""
+import argparse
+import pytest
+from unittest.mock import patch
+from hashcards.hasher import CardHasher
+from hashcards.storage import ARCHIVED_ALGORITHMS_META_KEY, CardStorage, Storage
+from hashcards.scheduler import FSRSScheduler, Rating
+
+
+def seed_reviewed(storage: Storage, hashes, deck_name="deck"):
+    """A schedule plus one review for each hash"""
+    scheduler = FSRSScheduler()
+    storage.bootstrap_schedules(((h, deck_name) for h in hashes), scheduler.init_card)
+    for h in hashes:
+        schedule, log = scheduler.review_card(storage.get_schedule(h), Rating.GOOD)
+        storage.record_review(schedule, deck_name, log)
+
+
+def test_dry_run_reports_without_changing_anything(storage):
+    seed_reviewed(storage, ["keep", "gone1", "gone2"])
+
+    report = storage.reconcile(["keep"], dry_run=True)
+
+    assert report == {'schedules': 2, 'reviews': 2, 'by_deck': {'deck': 2}}
+    assert storage.get_stats()['total_cards'] == 3
+    assert storage.get_schedule("gone1") is not None
+
+
+def test_archived_cards_leave_stats_and_come_back_with_history(storage):
+    seed_reviewed(storage, ["keep", "gone"])
+    reps = storage.get_schedule("gone").reps
+
+    report = storage.reconcile(["keep"])
+    assert report['schedules'] == 1 and report['reviews'] == 1
+    assert storage.get_schedule("gone") is None
+    assert storage.get_stats()['total_cards'] == 1
+    assert storage.get_stats()['reviews_today'] == 1
+
+    # The card's text returns, now in another deck
+    restored = storage.bootstrap_schedules([("gone", "moved")], FSRSScheduler().init_card)
+    assert restored == 1
+    schedule = storage.get_schedule("gone")
+    assert schedule.reps == reps
+    assert storage.get_stats('moved')['total_cards'] == 1
+    assert storage.get_stats()['reviews_today'] == 2
+    # Restored once: archiving again and restoring does not duplicate history
+    storage.reconcile(["keep"])
+    storage.bootstrap_schedules([("gone", "moved")], FSRSScheduler().init_card)
+    assert len(list(storage.iter_reviews())) == 2
+
+
+def test_rehash_moves_archived_cards_too(storage):
+    seed_reviewed(storage, ["keep", "gone", "lost"])
+    reps = storage.get_schedule("gone").reps
+    storage.reconcile(["keep"])
+
+    # "lost" is in no deck at rehash time: it keeps its hash, and the old algorithm is noted
+    assert storage.rehash_cards([("keep", "keep2"), ("gone", "gone2")], "blake2b") == 1
+    assert storage.get_meta(ARCHIVED_ALGORITHMS_META_KEY) == "sha256"
+
+    storage.bootstrap_schedules([("gone2", "deck")], FSRSScheduler().init_card)
+    assert storage.get_schedule("gone2").reps == reps
+    assert sorted(log.card_hash for log in storage.iter_reviews()) == ["gone2", "keep2"]
+    storage.bootstrap_schedules([("gone", "deck")], FSRSScheduler().init_card)
+    assert storage.get_schedule("gone").reps == 0
+
+    storage.rehash_cards([("lost", "lost2")], "blake2b")
+    assert storage.get_meta(ARCHIVED_ALGORITHMS_META_KEY) == ""
+
+
+def test_card_archived_during_a_rehash_keeps_its_history_when_restored(card_file, tmp_path):
+    card_file(tmp_path, "keep.md", "Q: Keep?\nA: Yes\n")
+    gone = card_file(tmp_path, "gone.md", "Q: Gone?\nA: Yes\n")
+
+    from hashcards.cli import cmd_rehash
+    from hashcards.web.app import HashcardsApp
+    app = HashcardsApp(str(tmp_path))
+    [gone_hash] = [h for h, card in app.cards_cache.items() if card.deck_name == "gone"]
+    schedule, log = app.scheduler.review_card(app.storage.get_schedule(gone_hash), Rating.GOOD)
+    app.storage.record_review(schedule, "gone", log)
+    app.storage.close()
+
+    text = gone.read_text()
+    gone.unlink()
+    HashcardsApp(str(tmp_path)).storage.close()
+    cmd_rehash(argparse.Namespace(cards_dir=str(tmp_path), algorithm="blake2b", jobs=1))
+    card_file(tmp_path, "gone.md", text)
+
+    app = HashcardsApp(str(tmp_path))
+    new_hash = CardHasher.hash_card(text.strip(), "blake2b")
+    assert app.cards_cache[new_hash].deck_name == "gone"
+    assert app.storage.get_schedule(new_hash).reps == schedule.reps
+    assert [log.card_hash for log in app.storage.iter_reviews()] == [new_hash]
+    app.storage.close()
+
+
+def test_drop_deletes_orphans_for_good(storage):
+    seed_reviewed(storage, ["keep", "gone"])
+
+    storage.reconcile(["keep"], archive=False)
+    storage.bootstrap_schedules([("gone", "deck")], FSRSScheduler().init_card)
+
+    assert storage.get_schedule("gone").reps == 0
+    assert [log.card_hash for log in storage.iter_reviews()] == ["keep"]
+
+
+def test_app_archives_orphans_on_load_instead_of_while_studying(card_file, tmp_path):
+    card_file(tmp_path, "keep.md", "Q: Keep?\nA: Yes\n")
+    gone = card_file(tmp_path, "gone.md", "Q: Gone 1?\nA: Yes\n\nQ: Gone 2?\nA: Yes\n")
+
+    from hashcards.web.app import HashcardsApp
+    db_path = str(tmp_path / ".test.db")
+    HashcardsApp(str(tmp_path), db_path=db_path).storage.close()
+
+    gone.unlink()
+    app = HashcardsApp(str(tmp_path), db_path=db_path)
+    assert app.storage.get_stats()['total_cards'] == 1
+
+    with patch.object(CardStorage, 'delete_card', side_effect=AssertionError("per-card delete")):
+        resp = app.app.test_client().get('/study')
+    assert resp.status_code == 200
+    assert b"Keep?" in resp.data
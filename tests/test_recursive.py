@@ -61,3 +61,19 @@ def test_app_skips_hidden_directories():
         deck_names = {c.deck_name for c in app.cards_cache.values()}
         assert "visible" in deck_names
         assert ".hidden/secret" not in deck_names
+
+
+def test_browse_fetches_schedules_in_bulk():
+    from unittest.mock import patch
+    from hashcards.storage import CardStorage
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_card_file(root, "a.md", "".join(f"Q: A{i}?\nA: {i}\n\n" for i in range(20)))
+
+        from hashcards.web.app import HashcardsApp
+        app = HashcardsApp(str(root), db_path=str(root / ".test.db"))
+        client = app.app.test_client()
+        with patch.object(CardStorage, 'get_schedule', side_effect=AssertionError("N+1")):
+            resp = client.get('/browse/a')
+        assert resp.status_code == 200
+        assert b'A19?' in resp.data
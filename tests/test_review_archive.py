@@ -0,0 +1,75 @@
+"""Tests for review-log archival and compaction"""
+import os
+import sqlite3
+import pytest
+from datetime import date, datetime, timedelta
+from hashcards.storage import CardStorage
+from hashcards.scheduler import FSRSScheduler, Rating
+
+
+def seed_reviews(storage: CardStorage, days_ago):
+    """One review of card h<i> for each entry of `days_ago`"""
+    scheduler = FSRSScheduler()
+    storage.bootstrap_schedules(((f"h{i}", "deck") for i in range(len(days_ago))), scheduler.init_card)
+    for i, age in enumerate(days_ago):
+        schedule, log = scheduler.review_card(storage.get_schedule(f"h{i}"), Rating.GOOD)
+        log.review_time = datetime.now() - timedelta(days=age)
+        storage.record_review(schedule, "deck", log)
+
+
+def test_archive_moves_old_reviews_and_reads_span_both(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    seed_reviews(storage, [0, 1, 40, 41, 400])
+
+    assert storage.archive_reviews(older_than_days=30) == 3
+    assert os.path.exists(storage.archive_path)
+    assert storage.conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0] == 2
+    assert storage.conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+    live = storage.get_review_history(days=60)
+    assert sum(live.values()) == 2
+    spanning = storage.get_review_history(days=60, include_archive=True)
+    assert sum(spanning.values()) == 4
+    assert spanning[(date.today() - timedelta(days=40)).isoformat()] == 1
+
+    assert len(list(storage.iter_reviews())) == 2
+    logs = list(storage.iter_reviews(include_archive=True))
+    assert [log.card_hash for log in logs] == ["h4", "h3", "h2", "h1", "h0"]
+
+    # Nothing left to move; archived rows are not duplicated
+    assert storage.archive_reviews(older_than_days=30) == 0
+    assert len(list(storage.iter_reviews(include_archive=True))) == 5
+
+
+def test_rehash_rewrites_archived_reviews(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    seed_reviews(storage, [0, 40, 400])
+    storage.archive_reviews(older_than_days=30)
+    storage.close()
+
+    # A fresh connection: the archive is not attached yet
+    storage = make_sqlite_storage()
+    assert storage.rehash_cards([(f"h{i}", f"n{i}") for i in range(3)], "blake2b") == 3
+    rows = list(storage.iter_rows('reviews', include_archive=True))
+    assert sorted(row[1] for row in rows) == ["n0", "n1", "n2"]
+
+
+def test_compact_converts_old_files_to_incremental_vacuum(tmp_path, make_sqlite_storage):
+    db_path = tmp_path / ".test.db"
+    # A file from before incremental auto-vacuum was enabled
+    sqlite3.connect(str(db_path)).execute("CREATE TABLE placeholder (x)").connection.close()
+    storage = make_sqlite_storage()
+    assert storage.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+
+    seed_reviews(storage, [100] * 200)
+    storage.archive_reviews(older_than_days=30)
+    assert storage.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert storage.conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+
+def test_in_memory_storage_has_no_archive():
+    storage = CardStorage(":memory:")
+    seed_reviews(storage, [100])
+    with pytest.raises(ValueError):
+        storage.archive_reviews(older_than_days=30)
+    assert len(list(storage.iter_reviews(include_archive=True))) == 1
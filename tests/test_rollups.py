@@ -0,0 +1,93 @@
+"""Tests for trigger-maintained stats rollups"""
+import time
+import pytest
+from datetime import date, datetime, timedelta
+from hashcards.storage import CardStorage
+from hashcards.scheduler import FSRSScheduler, Rating, State
+
+
+def rollup_rows(storage: CardStorage):
+    deck = storage.conn.execute("SELECT * FROM deck_rollup ORDER BY deck_name").fetchall()
+    review = storage.conn.execute("SELECT * FROM review_rollup ORDER BY 1, 2, 3, 4").fetchall()
+    due = storage.conn.execute("SELECT * FROM due_rollup WHERE count != 0 ORDER BY day").fetchall()
+    # Difficulty sums are floats updated incrementally
+    return ([tuple(r[:6]) + (pytest.approx(r[6]), r[7]) for r in deck],
+            [tuple(r) for r in review], [tuple(r) for r in due])
+
+
+def test_triggers_keep_rollups_equal_to_a_rebuild(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    scheduler = FSRSScheduler()
+    storage.bootstrap_schedules(
+        [(f"h{i}", "math" if i % 2 else "art") for i in range(10)], scheduler.init_card)
+
+    yesterday = datetime.now() - timedelta(days=1)
+    for i, rating in enumerate([Rating.AGAIN, Rating.GOOD, Rating.EASY, Rating.HARD] * 2):
+        schedule, log = scheduler.review_card(storage.get_schedule(f"h{i}"), rating)
+        if i < 3:
+            log.review_time = yesterday
+        storage.record_review(schedule, "math" if i % 2 else "art", log)
+    storage.delete_card("h0")
+    storage.rehash_cards([("h1", "x1")], "sha256")
+    storage.conn.execute("""
+        INSERT OR REPLACE INTO schedules
+        SELECT 'h2', deck_name, 2, stability, 9.0, elapsed_days, scheduled_days,
+               reps, 4, last_review, due, created_at, updated_at
+        FROM schedules WHERE card_hash = 'h2'
+    """)
+    storage.conn.commit()
+
+    maintained = rollup_rows(storage)
+    storage.rebuild_rollups()
+    assert rollup_rows(storage) == maintained
+
+
+def test_stats_read_from_rollups(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    scheduler = FSRSScheduler()
+    storage.bootstrap_schedules([("a", "math"), ("b", "math"), ("c", "art")], scheduler.init_card)
+    schedule, log = scheduler.review_card(storage.get_schedule("a"), Rating.AGAIN)
+    storage.record_review(schedule, "math", log)
+
+    # Rollups are the source: changing them is visible in every stats call
+    storage.conn.execute("UPDATE deck_rollup SET total = total + 100, new = new + 100 WHERE deck_name = 'art'")
+    storage.conn.execute("UPDATE review_rollup SET count = count + 5")
+    storage.conn.commit()
+
+    stats = storage.get_stats()
+    assert stats['total_cards'] == 103
+    assert stats['by_state'] == {'NEW': 102, 'LEARNING': 1}
+    assert stats['reviews_today'] == 6
+    assert storage.get_stats("math")['total_cards'] == 2
+    assert storage.get_review_history(days=1) == {datetime.now().date().isoformat(): 6}
+    assert [d['total'] for d in storage.get_deck_stats()] == [101, 2]
+
+
+@pytest.fixture
+def set_timezone(monkeypatch):
+    """Switch the process's local time zone: set_timezone(name)"""
+    if not hasattr(time, 'tzset'):
+        pytest.skip("time zones cannot be switched on this platform")
+
+    def switch(name: str):
+        monkeypatch.setenv('TZ', name)
+        time.tzset()
+    yield switch
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_rollups_are_regrouped_when_opened_in_another_time_zone(make_sqlite_storage, set_timezone):
+    set_timezone('UTC')
+    storage = make_sqlite_storage()
+    schedule = FSRSScheduler().init_card("a")
+    schedule.state = State.REVIEW
+    # 02:00 UTC on June 2nd is 22:00 on June 1st in New York
+    schedule.due = datetime(2024, 6, 2, 2, 0)
+    storage.save_schedule(schedule, "math")
+    assert storage.get_due_counts(date(2024, 6, 1), 2) == [0, 1]
+    storage.close()
+
+    set_timezone('America/New_York')
+    storage = make_sqlite_storage()
+    assert storage.get_due_counts(date(2024, 6, 1), 2) == [1, 0]
@@ -0,0 +1,52 @@
+"""Tests for bulk schedule bootstrapping"""
+import pytest
+from hashcards.storage import CardStorage
+from hashcards.scheduler import FSRSScheduler, Rating, State
+
+
+def test_bootstrap_creates_missing_schedules_only(storage):
+    scheduler = FSRSScheduler()
+
+    reviewed, _ = scheduler.review_card(scheduler.init_card("h1"), Rating.GOOD)
+    storage.save_schedule(reviewed, "deck")
+
+    created = storage.bootstrap_schedules(
+        [("h1", "deck"), ("h2", "deck"), ("h3", "other")],
+        scheduler.init_card
+    )
+
+    assert created == 2
+    assert storage.get_schedule("h1").state == State.REVIEW
+    assert storage.get_schedule("h2").state == State.NEW
+    assert storage.get_stats()['total_cards'] == 3
+
+
+def test_bootstrap_first_deck_wins_for_duplicate_hashes(storage):
+    created = storage.bootstrap_schedules(
+        [("dup", "first"), ("dup", "second")],
+        FSRSScheduler().init_card
+    )
+
+    assert created == 1
+    decks = {d['deck_name'] for d in storage.get_deck_stats()}
+    assert decks == {"first"}
+
+
+def test_bootstrap_is_idempotent(storage):
+    cards = [(f"h{i}", "deck") for i in range(500)]
+    init_card = FSRSScheduler().init_card
+
+    assert storage.bootstrap_schedules(cards, init_card) == 500
+    assert storage.bootstrap_schedules(cards, init_card) == 0
+    assert storage.get_stats()['total_cards'] == 500
+
+
+def test_get_schedules_matches_single_lookups_across_chunks(storage):
+    hashes = [f"h{i}" for i in range(CardStorage.QUERY_CHUNK * 2 + 7)]
+    storage.bootstrap_schedules([(h, "deck") for h in hashes], FSRSScheduler().init_card)
+
+    schedules = storage.get_schedules(hashes + ["missing", "h0"])
+
+    assert set(schedules) == set(hashes)
+    assert schedules["h3"] == storage.get_schedule("h3")
+    assert storage.get_schedules([]) == {}
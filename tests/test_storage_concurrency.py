@@ -0,0 +1,61 @@
+"""Tests for sharing CardStorage between threads"""
+import threading
+import pytest
+from hashcards.storage import CardStorage
+from hashcards.scheduler import FSRSScheduler, Rating
+
+
+def test_concurrent_reviews_and_reads(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    scheduler = FSRSScheduler()
+    threads, per_thread = 16, 25
+    storage.bootstrap_schedules([(f"h{i}", "deck") for i in range(threads)], scheduler.init_card)
+    errors = []
+
+    def review(i: int):
+        try:
+            for _ in range(per_thread):
+                schedule = storage.get_schedule(f"h{i}")
+                new_schedule, log = scheduler.review_card(schedule, Rating.GOOD)
+                storage.save_schedule(new_schedule, "deck")
+                storage.log_review(log)
+                storage.get_stats()
+                storage.get_review_history(days=7)
+        except Exception as exc:
+            errors.append(exc)
+
+    workers = [threading.Thread(target=review, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    assert storage.get_stats()['reviews_today'] == threads * per_thread
+    assert {storage.get_schedule(f"h{i}").reps for i in range(threads)} == {per_thread}
+
+
+def test_reads_proceed_during_an_open_write_transaction(make_sqlite_storage):
+    storage = make_sqlite_storage()
+    storage.bootstrap_schedules([("h1", "deck")], FSRSScheduler().init_card)
+
+    storage.conn.execute("DELETE FROM schedules")  # Uncommitted
+    results = []
+    reader = threading.Thread(target=lambda: results.append(storage.get_stats()['total_cards']))
+    reader.start()
+    reader.join(timeout=2)
+
+    assert not reader.is_alive()
+    assert results == [1]  # Last committed state
+    storage.conn.rollback()
+
+
+def test_in_memory_database_is_shared_by_all_threads():
+    storage = CardStorage(":memory:")
+    storage.bootstrap_schedules([("h1", "deck")], FSRSScheduler().init_card)
+    results = []
+    reader = threading.Thread(target=lambda: results.append(storage.get_schedule("h1")))
+    reader.start()
+    reader.join()
+    assert results[0].card_hash == "h1"
+    storage.close()
@@ -0,0 +1,112 @@
+"""Tests for atomic and group-committed review recording"""
+import threading
+import pytest
+from unittest.mock import patch
+from hashcards.scheduler import FSRSScheduler, Rating, State
+
+
+def test_record_review_writes_schedule_and_log_together(storage):
+    scheduler = FSRSScheduler()
+    storage.bootstrap_schedules([("h1", "deck")], scheduler.init_card)
+
+    schedule, log = scheduler.review_card(storage.get_schedule("h1"), Rating.GOOD)
+    storage.record_review(schedule, "deck", log)
+    assert storage.get_schedule("h1").reps == 1
+    assert storage.get_stats()['reviews_today'] == 1
+
+    # A failing log insert must not leave the schedule half-updated
+    schedule, log = scheduler.review_card(storage.get_schedule("h1"), Rating.GOOD)
+    log.rating = None
+    with pytest.raises(Exception):
+        storage.record_review(schedule, "deck", log)
+    assert storage.get_schedule("h1").reps == 1
+    assert storage.get_stats()['reviews_today'] == 1
+
+
+def test_group_commit_batches_concurrent_reviews(make_sqlite_storage):
+    storage = make_sqlite_storage(group_commit=0.05)
+    scheduler = FSRSScheduler()
+    threads = 12
+    storage.bootstrap_schedules([(f"h{i}", "deck") for i in range(threads)], scheduler.init_card)
+    start = threading.Barrier(threads)
+    batches = []
+    commit = storage._commit_reviews
+
+    def counting_commit(batch):
+        batches.append(len(batch))
+        commit(batch)
+
+    def review(i: int):
+        schedule, log = scheduler.review_card(storage.get_schedule(f"h{i}"), Rating.GOOD)
+        start.wait()
+        storage.record_review(schedule, "deck", log)
+
+    with patch.object(storage, '_commit_reviews', side_effect=counting_commit):
+        workers = [threading.Thread(target=review, args=(i,)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    assert sum(batches) == threads
+    assert len(batches) < threads
+    assert {storage.get_schedule(f"h{i}").reps for i in range(threads)} == {1}
+
+
+def test_group_commit_failure_reaches_every_reviewer_in_the_batch(make_sqlite_storage):
+    storage = make_sqlite_storage(group_commit=0.05)
+    scheduler = FSRSScheduler()
+    storage.bootstrap_schedules([("h1", "deck"), ("h2", "deck")], scheduler.init_card)
+    start = threading.Barrier(2)
+    errors = []
+
+    def review(card_hash: str):
+        schedule, log = scheduler.review_card(storage.get_schedule(card_hash), Rating.GOOD)
+        log.rating = None
+        start.wait()
+        try:
+            storage.record_review(schedule, "deck", log)
+        except Exception as exc:
+            errors.append(exc)
+
+    workers = [threading.Thread(target=review, args=(h,)) for h in ("h1", "h2")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(errors) == 2
+    assert storage.get_stats()['by_state'] == {State.NEW.name: 2}
+
+
+def test_concurrent_web_reviews_share_a_group_commit(card_file, tmp_path):
+    card_file(tmp_path, "deck.md", "Q: One?\nA: 1\n\nQ: Two?\nA: 2\n")
+
+    from hashcards.web.app import HashcardsApp
+    app = HashcardsApp(str(tmp_path), db_path=str(tmp_path / ".test.db"), group_commit=0.2)
+    start = threading.Barrier(2)
+    batches, statuses = [], []
+    commit = app.storage._commit_reviews
+
+    def counting_commit(batch):
+        batches.append(len(batch))
+        commit(batch)
+
+    def review(card_hash: str):
+        client = app.app.test_client()
+        start.wait()
+        resp = client.post('/review', data={'card_hash': card_hash, 'rating': Rating.GOOD,
+                                            'deck_name': 'deck'})
+        statuses.append(resp.status_code)
+
+    with patch.object(app.storage, '_commit_reviews', side_effect=counting_commit):
+        workers = [threading.Thread(target=review, args=(h,)) for h in app.cards_cache]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    assert statuses == [302, 302]
+    assert batches == [2]
+    assert {app.storage.get_schedule(h).reps for h in app.cards_cache} == {1}
+    app.storage.close()
@@ -2,46 +2,36 @@
 import tempfile
 import pytest
 from datetime import datetime, timedelta
-from hashcards.storage import CardStorage
-from hashcards.scheduler import FSRSScheduler, Rating, State
+from hashcards.storage import Storage, open_storage
+from hashcards.scheduler import CardSchedule, Rating, ReviewLog, State
 
+BACKENDS = ["sqlite", "memory"]
 
-def make_storage(tmp_path) -> CardStorage:
-    return CardStorage(str(tmp_path / ".test.db"))
 
+def make_storage(tmp_path, backend: str = "sqlite") -> Storage:
+    return open_storage("memory://" if backend == "memory" else str(tmp_path / ".test.db"))
 
-def seed_card(storage: CardStorage, card_hash: str, deck: str, state: State,
+
+def seed_card(storage: Storage, card_hash: str, deck: str, state: State,
               difficulty: float = 5.0, lapses: int = 0):
-    """Insert a minimal schedule row directly for testing."""
-    import sqlite3
-    from datetime import datetime
-    now = datetime.now().isoformat()
-    due = datetime.now().isoformat()
-    conn = storage.conn
-    conn.execute("""
-        INSERT OR REPLACE INTO schedules
-            (card_hash, deck_name, state, stability, difficulty,
-             elapsed_days, scheduled_days, reps, lapses, last_review, due,
-             created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (card_hash, deck, int(state), 1.0, difficulty,
-          0, 1, 1, lapses, None, due, now, now))
-    conn.commit()
-
-
-def seed_review(storage: CardStorage, card_hash: str, review_time: datetime):
-    """Insert a review row for testing."""
-    storage.conn.execute("""
-        INSERT INTO reviews (card_hash, rating, state, review_time, scheduled_days, elapsed_days)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (card_hash, 3, 2, review_time.isoformat(), 1, 0))
-    storage.conn.commit()
-
-
-def test_get_review_history_returns_daily_counts():
+    """Save a minimal, due schedule for testing."""
+    storage.save_schedule(CardSchedule(
+        card_hash=card_hash, state=state, stability=1.0, difficulty=difficulty,
+        elapsed_days=0, scheduled_days=1, reps=1, lapses=lapses,
+        last_review=None, due=datetime.now()
+    ), deck)
+
+
+def seed_review(storage: Storage, card_hash: str, review_time: datetime):
+    """Log a review for testing."""
+    storage.log_review(ReviewLog(card_hash, Rating.GOOD, State.REVIEW, review_time, 1, 0))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_get_review_history_returns_daily_counts(backend):
     with tempfile.TemporaryDirectory() as tmp:
         from pathlib import Path
-        storage = make_storage(Path(tmp))
+        storage = make_storage(Path(tmp), backend)
         now = datetime.now()
         seed_card(storage, "abc", "deck1", State.REVIEW)
         seed_review(storage, "abc", now)
@@ -56,19 +46,21 @@ def test_get_review_history_returns_daily_counts():
         assert history[yesterday_str] == 1
 
 
-def test_get_review_history_fills_zero_days():
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_get_review_history_fills_zero_days(backend):
     with tempfile.TemporaryDirectory() as tmp:
         from pathlib import Path
-        storage = make_storage(Path(tmp))
+        storage = make_storage(Path(tmp), backend)
         history = storage.get_review_history(days=7)
         assert len(history) == 7
         assert all(v == 0 for v in history.values())
 
 
-def test_get_deck_stats_returns_per_deck_aggregates():
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_get_deck_stats_returns_per_deck_aggregates(backend):
     with tempfile.TemporaryDirectory() as tmp:
         from pathlib import Path
-        storage = make_storage(Path(tmp))
+        storage = make_storage(Path(tmp), backend)
         seed_card(storage, "h1", "math", State.NEW, difficulty=3.0)
         seed_card(storage, "h2", "math", State.REVIEW, difficulty=7.0)
         seed_card(storage, "h3", "science", State.LEARNING, difficulty=5.0, lapses=1)
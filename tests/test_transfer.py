@@ -0,0 +1,114 @@
+"""Tests for streaming export and import"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from hashcards.storage import CardStorage
+from hashcards.scheduler import WEIGHTS_META_KEY, FSRSScheduler, Rating
+from hashcards.transfer import export_collection, import_collection
+
+
+def seed_collection(storage: CardStorage, cards: int = 30):
+    """Schedules in two decks, each card reviewed twice"""
+    scheduler = FSRSScheduler()
+    storage.bootstrap_schedules(((f"h{i}", f"deck{i % 2}") for i in range(cards)), scheduler.init_card)
+    for i in range(cards):
+        for days_ago in (3, 0):
+            schedule, log = scheduler.review_card(storage.get_schedule(f"h{i}"), Rating.GOOD)
+            log.review_time = datetime.now() - timedelta(days=days_ago)
+            storage.record_review(schedule, f"deck{i % 2}", log)
+
+
+def snapshot(storage: CardStorage):
+    return (sorted(storage.iter_rows('schedules')), sorted(storage.iter_rows('reviews')),
+            storage.get_deck_stats(), storage.get_review_history(days=7))
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_export_import_round_trip(fmt, make_sqlite_storage, tmp_path):
+    source = make_sqlite_storage("source.db")
+    seed_collection(source)
+    # Small fetches exercise the chunked cursor
+    with patch.object(CardStorage, 'EXPORT_CHUNK', 7):
+        counts = export_collection(source, str(tmp_path / "export"), fmt)
+    assert counts == {'schedules': 30, 'reviews': 60}
+
+    target = make_sqlite_storage("target.db")
+    assert import_collection(target, str(tmp_path / "export")) == (30, 60)
+    assert snapshot(target) == snapshot(source)
+    assert target.get_due_cards() == source.get_due_cards()
+
+    # Importing again changes nothing
+    assert import_collection(target, str(tmp_path / "export"))[1] == 0
+    assert snapshot(target) == snapshot(source)
+
+
+def test_import_replace_restores_indexes_and_triggers(make_sqlite_storage, tmp_path):
+    source = make_sqlite_storage("source.db")
+    seed_collection(source, cards=10)
+    export_collection(source, str(tmp_path / "export"))
+
+    target = make_sqlite_storage("target.db")
+    seed_collection(target, cards=50)
+    schema = target.conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall()
+
+    import_collection(target, str(tmp_path / "export"), replace=True)
+    assert target.conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall() == schema
+    assert target.get_stats()['total_cards'] == 10
+
+    # Triggers are back: new reviews keep the rollups current
+    scheduler = FSRSScheduler()
+    schedule, log = scheduler.review_card(target.get_schedule("h0"), Rating.GOOD)
+    target.record_review(schedule, "deck0", log)
+    assert target.get_stats()['reviews_today'] == 11
+
+
+def test_parquet_round_trip(make_sqlite_storage, tmp_path):
+    pytest.importorskip("pyarrow")
+    source = make_sqlite_storage("source.db")
+    seed_collection(source, cards=5)
+    export_collection(source, str(tmp_path / "export"), "parquet")
+
+    target = make_sqlite_storage("target.db")
+    import_collection(target, str(tmp_path / "export"))
+    assert snapshot(target) == snapshot(source)
+
+
+def test_import_rejects_malformed_rows_atomically(make_sqlite_storage, tmp_path):
+    source = make_sqlite_storage("source.db")
+    seed_collection(source, cards=3)
+    export_collection(source, str(tmp_path / "export"), "csv")
+    reviews = tmp_path / "export" / "reviews.csv"
+    reviews.write_text(reviews.read_text().replace(",3,", ",three,", 1))
+
+    target = make_sqlite_storage("target.db")
+    schema = target.conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall()
+    with pytest.raises(ValueError):
+        import_collection(target, str(tmp_path / "export"))
+    assert target.conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall() == schema
+    assert target.get_stats()['total_cards'] == 0
+    assert list(target.iter_rows('reviews')) == []
+
+
+def test_settings_travel_with_the_export(make_sqlite_storage, tmp_path):
+    source = make_sqlite_storage("source.db")
+    seed_collection(source, cards=3)
+    source.rehash_cards([(f"h{i}", f"b{i}") for i in range(3)], "blake2b")
+    source.set_meta(WEIGHTS_META_KEY, "[1.0]")
+    export_collection(source, str(tmp_path / "export"))
+
+    target = make_sqlite_storage("target.db")
+    assert import_collection(target, str(tmp_path / "export")) == (3, 6)
+    assert target.get_meta("hash_algorithm") == "blake2b"
+    assert target.get_meta(WEIGHTS_META_KEY) == "[1.0]"
+
+    # Cards keyed by another algorithm would never match a deck again
+    other = make_sqlite_storage("other.db")
+    seed_collection(other, cards=2)
+    other.set_meta(WEIGHTS_META_KEY, "[2.0]")
+    with pytest.raises(ValueError, match="blake2b"):
+        import_collection(other, str(tmp_path / "export"))
+    assert other.get_stats()['total_cards'] == 2
+    # A restore replaces the collection, settings included
+    import_collection(other, str(tmp_path / "export"), replace=True)
+    assert other.get_meta("hash_algorithm") == "blake2b"
+    assert other.get_meta(WEIGHTS_META_KEY) == "[1.0]"
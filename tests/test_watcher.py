@@ -0,0 +1,92 @@
+"""Tests for live deck reloading"""
+import os
+import time
+import pytest
+from pathlib import Path
+from hashcards.watcher import DeckWatcher, InotifyBackend, PollingBackend
+
+
+def bump_mtime(path: Path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_polling_backend_reports_only_changed_decks(card_file, tmp_path):
+    a = card_file(tmp_path, "a.md", "Q: A?\nA: 1\n")
+    card_file(tmp_path, "sub/b.md", "Q: B?\nA: 2\n")
+    card_file(tmp_path, ".hidden/c.md", "Q: C?\nA: 3\n")
+    backend = PollingBackend(tmp_path, interval=0.01)
+
+    assert backend.wait(0.01) == set()
+    a.write_text("Q: A?\nA: one\n")
+    bump_mtime(a)
+    card_file(tmp_path, "sub/new.md", "Q: N?\nA: 4\n")
+    (tmp_path / "sub" / "b.md").unlink()
+    card_file(tmp_path, ".hidden/d.md", "Q: D?\nA: 5\n")
+    assert backend.wait(0.01) == {"a.md", "sub/new.md", "sub/b.md"}
+
+
+def test_inotify_backend_reports_changed_decks(card_file, tmp_path):
+    card_file(tmp_path, "sub/a.md", "Q: A?\nA: 1\n")
+    try:
+        backend = InotifyBackend(tmp_path)
+    except (OSError, AttributeError):
+        pytest.skip("inotify not available")
+    try:
+        (tmp_path / "sub" / "a.md").write_text("Q: A?\nA: 2\n")
+        (tmp_path / "notes.txt").write_text("ignored")
+        changed = set()
+        assert wait_for(lambda: changed.update(backend.wait(0.05) or set()) or "sub/a.md" in changed)
+        assert changed == {"sub/a.md"}
+    finally:
+        backend.close()
+
+
+def test_watcher_debounces_bursts_into_one_callback(card_file, tmp_path):
+    a = card_file(tmp_path, "a.md", "Q: A?\nA: 1\n")
+    calls = []
+    watcher = DeckWatcher(str(tmp_path), calls.append, debounce=0.2,
+                          poll_interval=0.05, use_inotify=False)
+    watcher.start()
+    try:
+        for i in range(5):
+            a.write_text(f"Q: A?\nA: {i}\n")
+            bump_mtime(a)
+            time.sleep(0.03)
+        assert wait_for(lambda: calls)
+        time.sleep(0.3)
+    finally:
+        watcher.stop()
+    assert calls == [{"a.md"}]
+
+
+def test_app_watch_mode_applies_edits(card_file, tmp_path):
+    from hashcards.web.app import HashcardsApp
+    card_file(tmp_path, "keep.md", "Q: Keep?\nA: Yes\n")
+    edited = card_file(tmp_path, "edit.md", "Q: Old?\nA: Yes\n")
+    app = HashcardsApp(str(tmp_path), db_path=str(tmp_path / ".test.db"))
+    snapshot = app.cards_cache
+    app.start_watcher(debounce=0.05, poll_interval=0.05, use_inotify=False)
+    try:
+        edited.write_text("Q: New?\nA: Yes\n")
+        bump_mtime(edited)
+        assert wait_for(lambda: any(c.content["question"] == "New?"
+                                    for c in app.cards_cache.values()))
+    finally:
+        app.stop_watcher()
+
+    questions = sorted(c.content["question"] for c in app.cards_cache.values())
+    assert questions == ["Keep?", "New?"]
+    # The dict handed out before the reload was never mutated
+    assert sorted(c.content["question"] for c in snapshot.values()) == ["Keep?", "Old?"]
+    new_hash = next(h for h, c in app.cards_cache.items() if c.content["question"] == "New?")
+    assert app.storage.get_schedule(new_hash) is not None